@@ -29,6 +29,140 @@ CHROMADB_API_KEY = os.getenv("CHROMADB_API_KEY", "")
 CHROMADB_TENANT = os.getenv("CHROMADB_TENANT", "")
 CHROMADB_DB_NAME = os.getenv("CHROMADB_DB_NAME", "Astrolozee")
 COLLECTION_NAME = os.getenv("CHROMA_COLLECTION", "knowledge_base")
+CHROMADB_HOST = os.getenv("CHROMADB_HOST", "api.trychroma.com")
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Async retrieval: shared keep-alive pools, concurrency caps and timeouts
+CHROMA_MAX_CONCURRENCY = int(os.getenv("CHROMA_MAX_CONCURRENCY", "32"))
+CHROMA_TIMEOUT_SECONDS = float(os.getenv("CHROMA_TIMEOUT_SECONDS", "10"))
+CHROMA_HTTP_MAX_CONNECTIONS = int(os.getenv("CHROMA_HTTP_MAX_CONNECTIONS", "64"))
+CHROMA_HTTP_KEEPALIVE_SECONDS = float(os.getenv("CHROMA_HTTP_KEEPALIVE_SECONDS", "60"))
+EMBED_MAX_CONCURRENCY = int(os.getenv("EMBED_MAX_CONCURRENCY", "32"))
+EMBED_TIMEOUT_SECONDS = float(os.getenv("EMBED_TIMEOUT_SECONDS", "10"))
+
+# Query-embedding cache: model + normalized-text hash -> float32 vector,
+# in-process LRU + shared SQLite so restarts are warm (empty path = memory only)
+EMBED_CACHE_SIZE = int(os.getenv("EMBED_CACHE_SIZE", "5000"))
+EMBED_CACHE_PATH = os.getenv("EMBED_CACHE_PATH", os.path.join(BASE_DIR, "data", "cache", "embeddings.sqlite"))
+EMBED_CACHE_MAX_ENTRIES = int(os.getenv("EMBED_CACHE_MAX_ENTRIES", "200000"))
+
+# Retrieval backend: "chroma" queries Chroma Cloud; "local" searches an in-process mirror of
+# the collection (python -m src.database.local_index sync), refreshed every
+# VECTOR_INDEX_REFRESH_SECONDS (0 = only by the CLI / cron)
+RETRIEVAL_BACKEND = os.getenv("RETRIEVAL_BACKEND", "chroma").lower()
+VECTOR_INDEX_DIR = os.getenv("VECTOR_INDEX_DIR", os.path.join(BASE_DIR, "data", "vector_index"))
+VECTOR_INDEX_REFRESH_SECONDS = int(os.getenv("VECTOR_INDEX_REFRESH_SECONDS", "600"))
+# Approximate scan of the mirror: "none" (exact float32), "int8" or "binary"; the best
+# top_k * VECTOR_INDEX_RESCORE_FACTOR candidates are rescored at full precision.
+# Compare recall with: python -m src.database.local_index recall
+VECTOR_INDEX_QUANTIZATION = os.getenv("VECTOR_INDEX_QUANTIZATION", "none").lower()
+if VECTOR_INDEX_QUANTIZATION not in ("none", "int8", "binary"):
+    print(f"ERROR: VECTOR_INDEX_QUANTIZATION must be none, int8 or binary, not {VECTOR_INDEX_QUANTIZATION!r}")
+    sys.exit(1)
+VECTOR_INDEX_RESCORE_FACTOR = int(os.getenv("VECTOR_INDEX_RESCORE_FACTOR", "10"))
+
+# Hybrid retrieval (opt-in; syncs the local mirror it reads from): BM25 over the mirror's
+# documents and titles, fused with the dense hits by reciprocal rank
+# (score = sum of 1 / (HYBRID_RRF_K + rank)); each side contributes HYBRID_CANDIDATES.
+# With LEXICAL_SKIP_EMBEDDING, the lexical search runs first and, when every one of the
+# top-K hits matches at least LEXICAL_SKIP_COVERAGE of the query's IDF weight, the
+# embedding call is skipped; otherwise both searches run concurrently.
+HYBRID_RETRIEVAL = os.getenv("HYBRID_RETRIEVAL", "false").lower() == "true"
+HYBRID_RRF_K = int(os.getenv("HYBRID_RRF_K", "60"))
+HYBRID_CANDIDATES = int(os.getenv("HYBRID_CANDIDATES", "20"))
+BM25_K1 = float(os.getenv("BM25_K1", "1.2"))
+BM25_B = float(os.getenv("BM25_B", "0.75"))
+LEXICAL_SKIP_EMBEDDING = os.getenv("LEXICAL_SKIP_EMBEDDING", "false").lower() == "true"
+LEXICAL_SKIP_COVERAGE = float(os.getenv("LEXICAL_SKIP_COVERAGE", "1.0"))
+
+# Metadata pre-filtering: restrict retrieval to documents whose category (get_category, lowercased)
+# and religion metadata match the question; if a filtered search returns fewer than
+# RETRIEVAL_MIN_FILTERED_HITS hits (capped at TOP_K), the rest come from the full collection.
+# Off by default: only useful once documents carry these (lowercase) metadata fields.
+RETRIEVAL_METADATA_FILTER = os.getenv("RETRIEVAL_METADATA_FILTER", "false").lower() == "true"
+RETRIEVAL_CATEGORY_FIELD = os.getenv("RETRIEVAL_CATEGORY_FIELD", "category")
+RETRIEVAL_RELIGION_FIELD = os.getenv("RETRIEVAL_RELIGION_FIELD", "religion")
+RETRIEVAL_MIN_FILTERED_HITS = int(os.getenv("RETRIEVAL_MIN_FILTERED_HITS", "3"))
+
+# Semantic answer cache (per process, per religion): a question with no context or session
+# history whose embedding has cosine similarity >= ANSWER_CACHE_THRESHOLD to a previously
+# answered one gets the stored answer without retrieval or an LLM call.
+ANSWER_CACHE_ENABLED = os.getenv("ANSWER_CACHE_ENABLED", "true").lower() == "true"
+ANSWER_CACHE_THRESHOLD = float(os.getenv("ANSWER_CACHE_THRESHOLD", "0.95"))
+ANSWER_CACHE_TTL_SECONDS = int(os.getenv("ANSWER_CACHE_TTL_SECONDS", str(24 * 3600)))
+ANSWER_CACHE_MAX_ENTRIES = int(os.getenv("ANSWER_CACHE_MAX_ENTRIES", "2000"))  # per religion
+
+# Geocoding: offline gazetteer first, Nominatim only as a fallback
+GAZETTEER_CSV = os.getenv("GAZETTEER_CSV", os.path.join(BASE_DIR, "data", "gazetteer", "places.csv"))
+GAZETTEER_INDEX_DIR = os.getenv("GAZETTEER_INDEX_DIR", os.path.join(BASE_DIR, "data", "gazetteer", "index"))
+GEOCODE_NOMINATIM_FALLBACK = os.getenv("GEOCODE_NOMINATIM_FALLBACK", "true").lower() == "true"
+
+# Geocode cache: in-process LRU + SQLite file shared by all workers (empty path = memory only)
+GEOCODE_CACHE_SIZE = int(os.getenv("GEOCODE_CACHE_SIZE", "10000"))
+GEOCODE_CACHE_TTL_SECONDS = int(os.getenv("GEOCODE_CACHE_TTL_SECONDS", str(30 * 24 * 3600)))
+GEOCODE_CACHE_PATH = os.getenv("GEOCODE_CACHE_PATH", os.path.join(BASE_DIR, "data", "cache", "geocode.sqlite"))
+GEOCODE_CACHE_MAX_ENTRIES = int(os.getenv("GEOCODE_CACHE_MAX_ENTRIES", "200000"))
+
+# Async kundli path: native async geocoding + dedicated bounded ephemeris executor
+NOMINATIM_URL = os.getenv("NOMINATIM_URL", "https://nominatim.openstreetmap.org/search")
+GEOCODE_MAX_CONCURRENCY = int(os.getenv("GEOCODE_MAX_CONCURRENCY", "4"))
+GEOCODE_TIMEOUT_SECONDS = float(os.getenv("GEOCODE_TIMEOUT_SECONDS", "5"))
+KUNDLI_EXECUTOR_WORKERS = int(os.getenv("KUNDLI_EXECUTOR_WORKERS", "4"))
+KUNDLI_MAX_CONCURRENCY = int(os.getenv("KUNDLI_MAX_CONCURRENCY", "32"))  # charts in flight per worker
+KUNDLI_DEADLINE_SECONDS = float(os.getenv("KUNDLI_DEADLINE_SECONDS", "15"))
+
+# Aspects: orb used for every major aspect unless a request overrides it (minor aspects keep
+# their own 2-3 degree orbs from src/services/aspects.py)
+ASPECT_DEFAULT_ORB = float(os.getenv("ASPECT_DEFAULT_ORB", "5"))
+
+# Precomputed ephemeris table (python -m src.services.ephemeris_table build); opt-in
+EPHEMERIS_TABLE_PATH = os.getenv("EPHEMERIS_TABLE_PATH", os.path.join(BASE_DIR, "data", "ephemeris", "planets_1900_2100.npy"))
+USE_EPHEMERIS_TABLE = os.getenv("USE_EPHEMERIS_TABLE", "false").lower() == "true"
+
+# Chart cache: keyed on rounded (JD, lat, lon), in-process LRU + shared SQLite (empty path = memory only)
+CHART_CACHE_SIZE = int(os.getenv("CHART_CACHE_SIZE", "4096"))
+CHART_CACHE_PATH = os.getenv("CHART_CACHE_PATH", os.path.join(BASE_DIR, "data", "cache", "charts.sqlite"))
+CHART_CACHE_MAX_ENTRIES = int(os.getenv("CHART_CACHE_MAX_ENTRIES", "500000"))
+
+# Transit time series (/transits)
+TRANSIT_MAX_STEPS = int(os.getenv("TRANSIT_MAX_STEPS", "200000"))
+
+# Event search (/events): per-year results cached in-process + shared SQLite
+EVENTS_MAX_YEARS = int(os.getenv("EVENTS_MAX_YEARS", "50"))
+EVENTS_CACHE_SIZE = int(os.getenv("EVENTS_CACHE_SIZE", "4096"))
+EVENTS_CACHE_PATH = os.getenv("EVENTS_CACHE_PATH", os.path.join(BASE_DIR, "data", "cache", "events.sqlite"))
+EVENTS_CACHE_MAX_ENTRIES = int(os.getenv("EVENTS_CACHE_MAX_ENTRIES", "100000"))
+
+# Compatibility matching (/match): stored candidate sets of sidereal Moon longitudes
+MATCH_CANDIDATES_DIR = os.getenv("MATCH_CANDIDATES_DIR", os.path.join(BASE_DIR, "data", "match"))
+MATCH_MAX_CANDIDATES = int(os.getenv("MATCH_MAX_CANDIDATES", "500000"))
+
+# Birth-time rectification (/rectify): async jobs, state in shared SQLite (empty path = in-process only)
+RECTIFY_MAX_SAMPLES = int(os.getenv("RECTIFY_MAX_SAMPLES", "20000"))
+RECTIFY_ORB = float(os.getenv("RECTIFY_ORB", "3"))
+RECTIFY_JOBS_PATH = os.getenv("RECTIFY_JOBS_PATH", os.path.join(BASE_DIR, "data", "cache", "rectify_jobs.sqlite"))
+RECTIFY_JOB_TTL_SECONDS = int(os.getenv("RECTIFY_JOB_TTL_SECONDS", str(24 * 3600)))
+# A running job rewrites its record this often; one silent for 3 beats is reported as failed
+RECTIFY_HEARTBEAT_SECONDS = float(os.getenv("RECTIFY_HEARTBEAT_SECONDS", "10"))
+
+# Muhurta search (/muhurta): longest date range per request
+MUHURTA_MAX_DAYS = int(os.getenv("MUHURTA_MAX_DAYS", "366"))
+
+# Daily panchang (/panchang): nightly precomputed table for a city grid
+# (python -m src.services.panchang build); other places are computed on request
+PANCHANG_CITIES = os.getenv(
+    "PANCHANG_CITIES",
+    "Delhi,Mumbai,Kolkata,Chennai,Bengaluru,Hyderabad,Ahmedabad,Pune,Jaipur,Lucknow,Varanasi,Ujjain",
+)
+PANCHANG_HORIZON_DAYS = int(os.getenv("PANCHANG_HORIZON_DAYS", "400"))
+PANCHANG_TABLE_DIR = os.getenv("PANCHANG_TABLE_DIR", os.path.join(BASE_DIR, "data", "panchang"))
+PANCHANG_AYANAMSA = os.getenv("PANCHANG_AYANAMSA", "lahiri")
+PANCHANG_CACHE_SIZE = int(os.getenv("PANCHANG_CACHE_SIZE", "4096"))
+
+# Kundli batch generation (process pool for Swiss Ephemeris work)
+KUNDLI_BATCH_WORKERS = int(os.getenv("KUNDLI_BATCH_WORKERS", str(os.cpu_count() or 1)))
+KUNDLI_BATCH_MAX_ITEMS = int(os.getenv("KUNDLI_BATCH_MAX_ITEMS", "500"))
 
 
 
@@ -1,9 +1,22 @@
 
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from src.routes.api_routes import router as ai_router
+from src.services.kundli_async import close_http_client
+from src.services.kundli_batch import shutdown_process_pool
+from src.database.chroma_db import close_chroma_clients, start_local_index_refresh
 
 
-app = FastAPI(title="Astrolozee AI Microservice")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    start_local_index_refresh()
+    yield
+    await close_http_client()
+    await close_chroma_clients()
+    shutdown_process_pool()
+
+
+app = FastAPI(title="Astrolozee AI Microservice", lifespan=lifespan)
 
 app.include_router(ai_router, prefix="/astro", tags=["AI"])
 
@@ -1,9 +1,48 @@
-import chromadb
 import asyncio
-from typing import  List, Dict, Any
-from config import CHROMADB_API_KEY, CHROMADB_TENANT, CHROMADB_DB_NAME, COLLECTION_NAME , TOP_K , EMBED_MODEL, OPENAI_API_KEY
+import hashlib
+import re
+import unicodedata
+from typing import List, Dict, Any, Optional, Sequence
+
+import chromadb
+import httpx
+import numpy as np
+from chromadb.config import Settings
+from langchain_openai import OpenAIEmbeddings
+
+from config import (
+    CHROMADB_API_KEY,
+    CHROMADB_TENANT,
+    CHROMADB_DB_NAME,
+    CHROMADB_HOST,
+    COLLECTION_NAME,
+    TOP_K,
+    EMBED_MODEL,
+    OPENAI_API_KEY,
+    CHROMA_MAX_CONCURRENCY,
+    CHROMA_TIMEOUT_SECONDS,
+    CHROMA_HTTP_MAX_CONNECTIONS,
+    CHROMA_HTTP_KEEPALIVE_SECONDS,
+    EMBED_MAX_CONCURRENCY,
+    EMBED_TIMEOUT_SECONDS,
+    EMBED_CACHE_SIZE,
+    EMBED_CACHE_PATH,
+    EMBED_CACHE_MAX_ENTRIES,
+    RETRIEVAL_BACKEND,
+    VECTOR_INDEX_REFRESH_SECONDS,
+    HYBRID_RETRIEVAL,
+    HYBRID_RRF_K,
+    HYBRID_CANDIDATES,
+    LEXICAL_SKIP_EMBEDDING,
+    LEXICAL_SKIP_COVERAGE,
+    RETRIEVAL_CATEGORY_FIELD,
+    RETRIEVAL_RELIGION_FIELD,
+    RETRIEVAL_MIN_FILTERED_HITS,
+)
+from src.database.lexical_index import get_lexical_index
+from src.database.local_index import get_local_index, refresh_periodically
+from src.utils.cache import LRUCache, SQLiteCache, TieredCache
 from src.utils.helper import normalize_metadata
-from langchain_openai import ChatOpenAI, OpenAIEmbeddings
 
 
 # ---- Validations ----
@@ -13,41 +52,296 @@ if not OPENAI_API_KEY:
 if not CHROMADB_API_KEY or not CHROMADB_TENANT:
     raise RuntimeError("Missing ChromaDB Cloud credentials.")
 
-# -- Global clients initialized once --
+# -- Global clients, shared by all requests --
+# Both sides are natively async: no executor thread is held while waiting on the network.
 
-chromadb_client = chromadb.CloudClient(
-    api_key=CHROMADB_API_KEY,
-    tenant=CHROMADB_TENANT,
-    database=CHROMADB_DB_NAME,
+_embed_http_client = httpx.AsyncClient(
+    limits=httpx.Limits(
+        max_connections=EMBED_MAX_CONCURRENCY,
+        max_keepalive_connections=EMBED_MAX_CONCURRENCY,
+        keepalive_expiry=CHROMA_HTTP_KEEPALIVE_SECONDS,
+    ),
+    timeout=EMBED_TIMEOUT_SECONDS,
 )
 
-chromadb_collection = chromadb_client.get_or_create_collection(COLLECTION_NAME)
+embeddings = OpenAIEmbeddings(
+    model=EMBED_MODEL,
+    api_key=OPENAI_API_KEY,
+    request_timeout=EMBED_TIMEOUT_SECONDS,
+    http_async_client=_embed_http_client,
+)
 
+_embed_semaphore = asyncio.Semaphore(max(1, EMBED_MAX_CONCURRENCY))
+_chroma_semaphore = asyncio.Semaphore(max(1, CHROMA_MAX_CONCURRENCY))
 
-embeddings = OpenAIEmbeddings(model=EMBED_MODEL, api_key=OPENAI_API_KEY)
+_chroma_client = None
+_chroma_collection = None
+_collection_lock = asyncio.Lock()
+_index_refresh: Optional[asyncio.Task] = None
 
-async def chromadb_retrieve(question: str, top_k: int = TOP_K) -> List[Dict[str, Any]]:
-    try:
-        def sync_call():
-            q_vec = embeddings.embed_query(question)
 
-            results = chromadb_collection.query(
-                query_embeddings=[q_vec],
-                n_results=top_k,
-                include=["documents", "metadatas"],
+async def get_chroma_collection():
+    """The async collection handle, connected on first use (one keep-alive pool per process)."""
+    global _chroma_client, _chroma_collection
+    if _chroma_collection is None:
+        async with _collection_lock:
+            if _chroma_collection is None:
+                _chroma_client = await chromadb.AsyncHttpClient(
+                    host=CHROMADB_HOST,
+                    port=443,
+                    ssl=True,
+                    headers={"x-chroma-token": CHROMADB_API_KEY},
+                    tenant=CHROMADB_TENANT,
+                    database=CHROMADB_DB_NAME,
+                    settings=Settings(
+                        anonymized_telemetry=False,
+                        chroma_http_keepalive_secs=CHROMA_HTTP_KEEPALIVE_SECONDS,
+                        chroma_http_max_connections=CHROMA_HTTP_MAX_CONNECTIONS,
+                        chroma_http_max_keepalive_connections=CHROMA_HTTP_MAX_CONNECTIONS,
+                    ),
+                )
+                _chroma_collection = await _chroma_client.get_or_create_collection(COLLECTION_NAME)
+    return _chroma_collection
+
+
+def start_local_index_refresh() -> None:
+    """When the local backend or hybrid retrieval needs the mirror, keep it in sync from a
+    background task (app lifespan)."""
+    global _index_refresh
+    uses_mirror = RETRIEVAL_BACKEND == "local" or HYBRID_RETRIEVAL
+    if uses_mirror and VECTOR_INDEX_REFRESH_SECONDS > 0 and _index_refresh is None:
+        _index_refresh = asyncio.create_task(refresh_periodically(get_chroma_collection, VECTOR_INDEX_REFRESH_SECONDS))
+
+
+async def close_chroma_clients() -> None:
+    global _chroma_client, _chroma_collection, _index_refresh
+    if _index_refresh is not None:
+        _index_refresh.cancel()
+        _index_refresh = None
+    _chroma_client = _chroma_collection = None
+    await _embed_http_client.aclose()
+
+
+# ---- Embeddings ----
+# Cached as float32 arrays (6 KB per 1536-d vector) keyed on model + normalized text,
+# so repeated questions and re-sent session contexts skip the embedding API.
+def _pack_vector(vector) -> bytes:
+    return np.asarray(vector, dtype=np.float32).tobytes()
+
+
+def _unpack_vector(blob: bytes) -> np.ndarray:
+    return np.frombuffer(blob, dtype=np.float32)
+
+
+embedding_cache = TieredCache(
+    "embeddings",
+    LRUCache(EMBED_CACHE_SIZE),
+    SQLiteCache(
+        EMBED_CACHE_PATH,
+        max_entries=EMBED_CACHE_MAX_ENTRIES,
+        dumps=_pack_vector,
+        loads=_unpack_vector,
+        table="embeddings",
+    ) if EMBED_CACHE_PATH else None,
+)
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_text(text: str) -> str:
+    """Unicode-normalized text with whitespace runs collapsed, as used for cache keys."""
+    return _WHITESPACE.sub(" ", unicodedata.normalize("NFKC", text or "")).strip()
+
+
+def embedding_cache_key(text: str, model: str = EMBED_MODEL) -> str:
+    return f"{model}:{hashlib.sha256(normalize_text(text).encode('utf-8')).hexdigest()}"
+
+
+async def embed_texts(texts: Sequence[str]) -> List[np.ndarray]:
+    """Embeddings for `texts`, in order: cache hits first, everything else in one embedding call."""
+    keys = [embedding_cache_key(t) for t in texts]
+    found = await embedding_cache.aget_many(set(keys))
+    missing: Dict[str, str] = {}
+    for key, text in zip(keys, texts):
+        if key not in found:
+            missing.setdefault(key, normalize_text(text))
+    if missing:
+        async with _embed_semaphore:
+            vectors = await asyncio.wait_for(
+                embeddings.aembed_documents(list(missing.values())), EMBED_TIMEOUT_SECONDS
             )
+        computed = {key: np.asarray(v, dtype=np.float32) for key, v in zip(missing, vectors)}
+        await embedding_cache.aset_many(computed)
+        found.update(computed)
+    return [found[key] for key in keys]
+
+
+async def embed_query(text: str) -> np.ndarray:
+    return (await embed_texts([text]))[0]
+
 
-            docs_list = results.get("documents") or [[]]
-            metas_list = results.get("metadatas") or [[]]
-            docs0 = docs_list[0] if docs_list else []
-            metas0 = metas_list[0] if metas_list else []
+# ---- Query ----
+def _docs_from_results(results: Dict[str, Any], row: int = 0) -> List[Dict[str, Any]]:
+    ids_list = results.get("ids") or [[]]
+    docs_list = results.get("documents") or [[]]
+    metas_list = results.get("metadatas") or [[]]
+    ids0 = ids_list[row] if len(ids_list) > row else []
+    docs0 = docs_list[row] if len(docs_list) > row else []
+    metas0 = metas_list[row] if len(metas_list) > row else []
+    return [
+        {"id": doc_id, "text": doc_text, "metadata": normalize_metadata(meta)}
+        for doc_id, doc_text, meta in zip(ids0, docs0, metas0)
+    ]
 
-            out: List[Dict[str, Any]] = []
-            for doc_text, meta in zip(docs0, metas0):
-                out.append({"text": doc_text, "metadata": normalize_metadata(meta)})
-            return out
 
-        return await asyncio.to_thread(sync_call)
+def merge_results(rows: Sequence[List[Dict[str, Any]]]) -> List[Dict[str, Any]]:
+    """Concatenate per-query hits in query order, keeping the first hit of each document id."""
+    merged: Dict[str, Dict[str, Any]] = {}
+    for docs in rows:
+        for doc in docs:
+            merged.setdefault(doc["id"], doc)
+    return list(merged.values())
+
+
+async def query_collection(
+    query_vectors: Sequence[Sequence[float]],
+    top_k: int = TOP_K,
+    include: Sequence[str] = ("documents", "metadatas"),
+    where: Optional[Dict[str, Any]] = None,
+) -> Dict[str, Any]:
+    """One query for one or more vectors: the local mirror when RETRIEVAL_BACKEND is "local" and it
+    has been synced, else Chroma Cloud (bounded by the concurrency cap and timeout)."""
+    if RETRIEVAL_BACKEND == "local":
+        index = get_local_index()
+        if index is not None:
+            return index.search(query_vectors, top_k, include, where)
+    collection = await get_chroma_collection()
+    async with _chroma_semaphore:
+        return await asyncio.wait_for(
+            collection.query(
+                query_embeddings=[np.asarray(v, dtype=np.float32).tolist() for v in query_vectors],
+                n_results=top_k,
+                include=list(include),
+                where=where,
+            ),
+            CHROMA_TIMEOUT_SECONDS,
+        )
+
+
+# ---- Hybrid (BM25 + dense) ----
+def reciprocal_rank_fusion(
+    rankings: Sequence[List[Dict[str, Any]]], top_k: int, k: int = HYBRID_RRF_K
+) -> List[Dict[str, Any]]:
+    """Fuse ranked hit lists by summing 1 / (k + rank) per document id; ties keep first-seen order."""
+    scores: Dict[str, float] = {}
+    docs: Dict[str, Dict[str, Any]] = {}
+    for ranking in rankings:
+        for rank, doc in enumerate(ranking, start=1):
+            scores[doc["id"]] = scores.get(doc["id"], 0.0) + 1.0 / (k + rank)
+            docs.setdefault(doc["id"], doc)
+    ranked = sorted(scores, key=scores.__getitem__, reverse=True)
+    return [docs[doc_id] for doc_id in ranked[:top_k]]
+
+
+def _lexical_rows(index, texts: Sequence[str], n: int, where: Optional[Dict[str, Any]]) -> List[List[Dict[str, Any]]]:
+    rows = index.mirror.rows_where(where) if where and index.mirror is not None else None
+    return [index.search(text, n, rows) for text in texts]
+
+
+def _lexical_is_sufficient(rows: List[List[Dict[str, Any]]], top_k: int) -> bool:
+    return all(
+        len(hits) >= top_k and all(hit["coverage"] >= LEXICAL_SKIP_COVERAGE for hit in hits[:top_k])
+        for hits in rows
+    )
+
+
+def _lexical_docs(hits: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    return [{"id": h["id"], "text": h["text"], "metadata": normalize_metadata(h["metadata"])} for h in hits]
+
+
+async def _dense_rows(texts: Sequence[str], n: int, where: Optional[Dict[str, Any]]) -> List[List[Dict[str, Any]]]:
+    vectors = await embed_texts(texts)
+    results = await query_collection(vectors, n, where=where)
+    return [_docs_from_results(results, row) for row in range(len(texts))]
+
+
+async def _retrieve_rows(
+    texts: Sequence[str], top_k: int, where: Optional[Dict[str, Any]]
+) -> List[List[Dict[str, Any]]]:
+    lexical = get_lexical_index() if HYBRID_RETRIEVAL else None
+    if lexical is None:
+        return await _dense_rows(texts, top_k, where)
+
+    n = max(top_k, HYBRID_CANDIDATES)
+    lexical_search = asyncio.to_thread(_lexical_rows, lexical, texts, n, where)
+    if LEXICAL_SKIP_EMBEDDING:
+        lexical_rows = await lexical_search
+        if _lexical_is_sufficient(lexical_rows, top_k):
+            return [_lexical_docs(hits[:top_k]) for hits in lexical_rows]
+        dense_rows = await _dense_rows(texts, n, where)
+    else:
+        lexical_rows, dense_rows = await asyncio.gather(lexical_search, _dense_rows(texts, n, where))
+    return [
+        reciprocal_rank_fusion([dense, _lexical_docs(hits)], top_k)
+        for dense, hits in zip(dense_rows, lexical_rows)
+    ]
+
+
+async def retrieve_rows(
+    texts: Sequence[str], top_k: int = TOP_K, where: Optional[Dict[str, Any]] = None
+) -> List[List[Dict[str, Any]]]:
+    """Top-k hits per text. With hybrid retrieval and a synced mirror, BM25 and dense search run
+    concurrently and are fused by reciprocal rank; otherwise dense only.
+
+    With a `where` filter, any text whose filtered search returns fewer than
+    RETRIEVAL_MIN_FILTERED_HITS (capped at top_k) is topped up from the full collection.
+    """
+    rows = await _retrieve_rows(texts, top_k, where)
+    if not where:
+        return rows
+    min_hits = min(top_k, RETRIEVAL_MIN_FILTERED_HITS)
+    short = [i for i, hits in enumerate(rows) if len(hits) < min_hits]
+    if short:
+        fallback = await _retrieve_rows([texts[i] for i in short], top_k, None)
+        for i, extra in zip(short, fallback):
+            rows[i] = merge_results([rows[i], extra])[:top_k]
+    return rows
+
+
+def metadata_filter(category: Optional[str] = None, religion: Optional[str] = None) -> Optional[Dict[str, Any]]:
+    """Chroma `where` clause for a question's category (skipped for "General") and religion,
+    matched lowercase; None when there is nothing to filter on."""
+    clauses = []
+    if category and category.lower() != "general":
+        clauses.append({RETRIEVAL_CATEGORY_FIELD: category.lower()})
+    if religion:
+        clauses.append({RETRIEVAL_RELIGION_FIELD: religion.lower()})
+    if not clauses:
+        return None
+    return clauses[0] if len(clauses) == 1 else {"$and": clauses}
+
+
+async def chromadb_retrieve(
+    question: str, top_k: int = TOP_K, where: Optional[Dict[str, Any]] = None
+) -> List[Dict[str, Any]]:
+    try:
+        return (await retrieve_rows([question], top_k, where))[0]
+
+    except Exception as e:
+        raise RuntimeError(f"Chroma (cloud) retrieval failed: {e!r}")
+
+
+async def chromadb_retrieve_many(
+    texts: Sequence[str], top_k: int = TOP_K, where: Optional[Dict[str, Any]] = None
+) -> List[Dict[str, Any]]:
+    """Retrieve for several query texts (e.g. question + context) in one embedding call and one
+    multi-vector query (plus one BM25 search per text when hybrid); hits are merged and
+    deduplicated by document id. `where` pre-filters as in retrieve_rows."""
+    texts = [t for t in texts if t]
+    if not texts:
+        return []
+    try:
+        return merge_results(await retrieve_rows(texts, top_k, where))
 
     except Exception as e:
-        raise RuntimeError(f"Chroma (cloud) retrieval failed: {e}")
+        raise RuntimeError(f"Chroma (cloud) retrieval failed: {e!r}")
@@ -0,0 +1,147 @@
+# src/database/lexical_index.py
+"""BM25 inverted index over the local mirror of the knowledge base.
+
+Dense retrieval blurs exact astrological terms ("Rahu in 7th house",
+"Sade Sati", "Mangal dosha"); a lexical index matches them literally.
+It is built in memory from the documents and metadata titles of the
+local mirror (src/database/local_index.py) and rebuilt whenever a sync
+replaces the mirror, so it needs no storage of its own.
+
+Titles are counted _TITLE_WEIGHT times, a cheap stand-in for BM25F field
+weighting.
+"""
+import math
+import re
+import unicodedata
+from collections import Counter, defaultdict
+from threading import Lock
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from config import BM25_B, BM25_K1, VECTOR_INDEX_DIR
+from src.database.local_index import get_local_index
+
+_TITLE_WEIGHT = 2
+_TOKEN = re.compile(r"\w+")
+STOPWORDS = frozenset(
+    "a an and are as at be by can could do does for from has have how i if in into is it its "
+    "me my of on or our so that the their them there these this to was what when where which "
+    "who why will with would you your".split()
+)
+
+
+def tokenize(text: Optional[str]) -> List[str]:
+    """Lowercased, NFKC-normalized word tokens without stopwords ("7th" and "sade" survive)."""
+    if not text:
+        return []
+    return [t for t in _TOKEN.findall(unicodedata.normalize("NFKC", text).lower()) if t not in STOPWORDS]
+
+
+class BM25Index:
+    """Okapi BM25 over (document text + title); postings are numpy arrays per term."""
+
+    def __init__(
+        self,
+        ids: Sequence[str],
+        documents: Sequence[Optional[str]],
+        metadatas: Sequence[Optional[dict]],
+        k1: float = BM25_K1,
+        b: float = BM25_B,
+    ):
+        self.ids = list(ids)
+        self.documents = list(documents)
+        self.metadatas = list(metadatas)
+        self.k1, self.b = k1, b
+        self.mirror = None        # the LocalIndex this was built from (same row order)
+
+        postings: Dict[str, Tuple[List[int], List[int]]] = defaultdict(lambda: ([], []))
+        lengths = np.zeros(len(self.ids), dtype=np.float32)
+        for row, (doc, meta) in enumerate(zip(self.documents, self.metadatas)):
+            title = (meta or {}).get("title") if isinstance(meta, dict) else None
+            tokens = tokenize(doc) + tokenize(title if isinstance(title, str) else None) * _TITLE_WEIGHT
+            lengths[row] = len(tokens)
+            for term, tf in Counter(tokens).items():
+                postings[term][0].append(row)
+                postings[term][1].append(tf)
+
+        n = len(self.ids)
+        self.avg_length = float(lengths.mean()) if n else 0.0
+        # Per-document length normalization, precomputed: k1 * (1 - b + b * len / avg)
+        self._norm = k1 * (1 - b + b * lengths / max(self.avg_length, 1e-9))
+        self.postings = {
+            term: (np.asarray(rows, dtype=np.int32), np.asarray(tfs, dtype=np.float32))
+            for term, (rows, tfs) in postings.items()
+        }
+        self.idf = {
+            term: math.log(1 + (n - len(rows) + 0.5) / (len(rows) + 0.5))
+            for term, (rows, _) in self.postings.items()
+        }
+
+    @classmethod
+    def from_mirror(cls, local) -> "BM25Index":
+        index = cls(local.ids, local.documents, local.metadatas)
+        index.mirror = local
+        return index
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def search(self, query: str, top_k: int, rows: Optional[np.ndarray] = None) -> List[Dict[str, Any]]:
+        """Top-k documents by BM25 score, best first, each with its score and `coverage`:
+        the share of the query's IDF weight that the document matches (1.0 = every term).
+        `rows` restricts the search to a partition of the mirror (LocalIndex.rows_where)."""
+        terms = list(dict.fromkeys(tokenize(query)))
+        matched = [t for t in terms if t in self.postings]
+        if not matched or not top_k:
+            return []
+        # Unknown terms still count towards coverage, weighted as if they matched one document
+        unseen_idf = math.log(1 + (len(self) - 0.5) / 1.5)
+        total_idf = sum(self.idf.get(t, unseen_idf) for t in terms)
+
+        scores = np.zeros(len(self), dtype=np.float32)
+        covered = np.zeros(len(self), dtype=np.float32)
+        for term in matched:
+            term_rows, tfs = self.postings[term]
+            idf = self.idf[term]
+            scores[term_rows] += idf * tfs * (self.k1 + 1) / (tfs + self._norm[term_rows])
+            covered[term_rows] += idf
+
+        if rows is not None:
+            allowed = np.zeros(len(self), dtype=bool)
+            allowed[rows] = True
+            scores[~allowed] = 0.0
+        candidates = np.flatnonzero(scores)
+        k = min(top_k, len(candidates))
+        if k == 0:
+            return []
+        top = candidates[np.argpartition(-scores[candidates], k - 1)[:k]]
+        top = top[np.argsort(-scores[top], kind="stable")]
+        return [
+            {
+                "id": self.ids[i],
+                "text": self.documents[i],
+                "metadata": self.metadatas[i],
+                "score": float(scores[i]),
+                "coverage": float(covered[i] / total_idf),
+            }
+            for i in top.tolist()
+        ]
+
+
+_INDEX: Optional[BM25Index] = None
+_INDEX_MTIME: Optional[float] = None
+_INDEX_LOCK = Lock()
+
+
+def get_lexical_index(directory: str = VECTOR_INDEX_DIR) -> Optional[BM25Index]:
+    """BM25 index over the current mirror, rebuilt after a sync; None before the first sync."""
+    global _INDEX, _INDEX_MTIME
+    local = get_local_index(directory)
+    if local is None:
+        return None
+    with _INDEX_LOCK:
+        if _INDEX is None or _INDEX_MTIME != local.mtime:
+            _INDEX = BM25Index.from_mirror(local)
+            _INDEX_MTIME = local.mtime
+        return _INDEX
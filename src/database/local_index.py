@@ -0,0 +1,434 @@
+# src/database/local_index.py
+"""Local mirror of the Chroma collection for in-process retrieval.
+
+The knowledge base is small enough to hold in RAM, so instead of a WAN
+round trip per query the collection's ids, documents, metadatas and
+embeddings are mirrored into a directory:
+
+    embeddings.npy       float32 (N, D), memory-mapped by every worker
+    embeddings.int8.npy  int8 (N, D) codes, one scale per dimension in int8_scales.npy
+    embeddings.bin.npy   sign bits packed to uint8 (N, D / 8)
+    sq_norms.npy         float32 (N,) squared norms of the full-precision vectors
+    docs.json            ids, documents, metadatas and a content hash per id
+    meta.json            count, dim, distance space, last sync (written last)
+
+With VECTOR_INDEX_QUANTIZATION = "none" search is exact: one matrix-vector
+product over the mmap'd matrix and an argpartition, with distances in the
+collection's own space (l2, cosine or ip) so results match what Chroma
+would return. A `where` filter restricts the search to that partition
+of rows (computed once per filter and cached). With "int8" (4x smaller) or "binary" (32x smaller, Hamming
+distance) the quantized matrix is scanned instead and only the best
+top_k * VECTOR_INDEX_RESCORE_FACTOR candidates are rescored from the
+float32 file, so its pages stay on disk apart from the rows rescored.
+Workers reload when meta.json changes.
+
+Sync is incremental: ids, documents and metadatas are paged in, and
+embeddings are only fetched for ids that are new or whose content hash
+changed. Run it from cron or let the app refresh on a timer:
+    python -m src.database.local_index sync
+
+Recall@TOP_K of each quantization against exact search, to pick the
+trade-off for a deployment:
+    python -m src.database.local_index recall --queries 200
+"""
+import argparse
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import time
+from threading import Lock
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+from config import TOP_K, VECTOR_INDEX_DIR, VECTOR_INDEX_QUANTIZATION, VECTOR_INDEX_RESCORE_FACTOR
+
+_PAGE = 1000
+_EMBEDDING_PAGE = 300
+_SCAN_ROWS = 8192        # int8 rows widened to float32 per block
+_MAX_PARTITIONS = 256    # cached `where` partitions per loaded mirror
+QUANTIZATIONS = ("none", "int8", "binary")
+_QUANTIZED_FILES = ("embeddings.int8.npy", "int8_scales.npy", "embeddings.bin.npy", "sq_norms.npy")
+_FILES = ("embeddings.npy", *_QUANTIZED_FILES, "docs.json", "meta.json", "sync.lock")
+
+
+def _paths(directory: str) -> Dict[str, str]:
+    return {name: os.path.join(directory, name) for name in _FILES}
+
+
+def _content_hash(document: Optional[str], metadata: Optional[dict]) -> str:
+    payload = json.dumps([document, metadata], sort_keys=True, default=str)
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()
+
+
+def quantize(matrix: np.ndarray) -> Dict[str, np.ndarray]:
+    """int8 codes with a symmetric scale per dimension, plus packed sign bits."""
+    scales = np.abs(matrix).max(axis=0, initial=0.0) / 127.0
+    scales = np.where(scales > 0, scales, 1.0).astype(np.float32)
+    return {
+        "embeddings.int8.npy": np.clip(np.rint(matrix / scales), -127, 127).astype(np.int8),
+        "int8_scales.npy": scales,
+        "embeddings.bin.npy": np.packbits(matrix > 0, axis=1),
+        "sq_norms.npy": np.einsum("ij,ij->i", matrix, matrix).astype(np.float32),
+    }
+
+
+class LocalIndex:
+    """Read-only view of a synced mirror."""
+
+    def __init__(self, directory: str, quantization: str = VECTOR_INDEX_QUANTIZATION):
+        if quantization not in QUANTIZATIONS:
+            raise ValueError(f"Unknown quantization {quantization!r}; expected one of {QUANTIZATIONS}")
+        paths = _paths(directory)
+        with open(paths["meta.json"], encoding="utf-8") as f:
+            self.meta: Dict[str, Any] = json.load(f)
+        self.mtime = os.path.getmtime(paths["meta.json"])
+        with open(paths["docs.json"], encoding="utf-8") as f:
+            docs = json.load(f)
+        self.ids: List[str] = docs["ids"]
+        self.documents: List[Optional[str]] = docs["documents"]
+        self.metadatas: List[Optional[dict]] = docs["metadatas"]
+        self.hashes: List[str] = docs["hashes"]
+        self.embeddings = np.load(paths["embeddings.npy"], mmap_mode="r")
+        self.space: str = self.meta.get("space", "l2")
+        if not all(os.path.exists(paths[name]) for name in _QUANTIZED_FILES):
+            # Mirror synced before quantized files existed: exact search until the next sync.
+            quantization = "none"
+            self.sq_norms = np.einsum("ij,ij->i", self.embeddings, self.embeddings)
+        else:
+            self.sq_norms = np.load(paths["sq_norms.npy"])
+        self.quantization = quantization
+        if quantization == "int8":
+            self.codes = np.load(paths["embeddings.int8.npy"], mmap_mode="r")
+            self.scales = np.load(paths["int8_scales.npy"])
+        elif quantization == "binary":
+            self.codes = np.load(paths["embeddings.bin.npy"], mmap_mode="r")
+        self._partitions: Dict[str, np.ndarray] = {}
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def _to_distances(self, q: np.ndarray, dots: np.ndarray, sq_norms: np.ndarray) -> np.ndarray:
+        if self.space == "cosine":
+            denom = np.linalg.norm(q, axis=1)[:, None] * np.sqrt(sq_norms)
+            return 1.0 - dots / np.maximum(denom, 1e-12)
+        if self.space == "ip":
+            return 1.0 - dots
+        return np.einsum("ij,ij->i", q, q)[:, None] - 2 * dots + sq_norms
+
+    def rows_where(self, where: Dict[str, Any]) -> np.ndarray:
+        """Sorted row indices of the partition matching a Chroma-style `where`, cached per filter."""
+        key = json.dumps(where, sort_keys=True, default=str)
+        rows = self._partitions.get(key)
+        if rows is None:
+            rows = np.asarray(
+                [i for i, meta in enumerate(self.metadatas) if matches_where(meta, where)], dtype=np.intp
+            )
+            if len(self._partitions) >= _MAX_PARTITIONS:
+                self._partitions.clear()
+            self._partitions[key] = rows
+        return rows
+
+    def distances(self, vectors, rows: Optional[np.ndarray] = None) -> np.ndarray:
+        """(Q, N) exact distances from each query vector to every document (or to `rows`),
+        in the collection's space."""
+        q = np.atleast_2d(np.asarray(vectors, dtype=np.float32))
+        if rows is None:
+            return self._to_distances(q, q @ self.embeddings.T, self.sq_norms[None, :])
+        return self._to_distances(q, q @ self.embeddings[rows].T, self.sq_norms[rows][None, :])
+
+    def approximate_distances(self, vectors, rows: Optional[np.ndarray] = None) -> np.ndarray:
+        """(Q, N) distances from the quantized matrix (or its `rows`): int8 dot products in the
+        collection's space, or Hamming distance between sign bits for binary."""
+        q = np.atleast_2d(np.asarray(vectors, dtype=np.float32))
+        codes = self.codes if rows is None else self.codes[rows]
+        sq_norms = self.sq_norms if rows is None else self.sq_norms[rows]
+        if self.quantization == "binary":
+            bits = np.packbits(q > 0, axis=1)
+            return np.stack([np.bitwise_count(codes ^ b).sum(axis=1, dtype=np.int32) for b in bits])
+        scaled = q * self.scales
+        dots = np.empty((len(q), len(codes)), dtype=np.float32)
+        for start in range(0, len(codes), _SCAN_ROWS):
+            block = codes[start:start + _SCAN_ROWS].astype(np.float32)
+            dots[:, start:start + len(block)] = scaled @ block.T
+        return self._to_distances(q, dots, sq_norms[None, :])
+
+    def nearest(
+        self,
+        vectors,
+        top_k: int,
+        rescore_factor: int = VECTOR_INDEX_RESCORE_FACTOR,
+        rows: Optional[np.ndarray] = None,
+    ):
+        """Row indices and exact distances of the top_k neighbours of each query vector,
+        optionally restricted to a partition (`rows`)."""
+        q = np.atleast_2d(np.asarray(vectors, dtype=np.float32))
+        universe = np.arange(len(self)) if rows is None else rows
+        k = min(top_k, len(universe))
+        if k == 0:
+            return [(np.empty(0, dtype=np.intp), np.empty(0, dtype=np.float32)) for _ in q]
+        if self.quantization == "none":
+            return [_smallest(row, universe, k) for row in self.distances(q, rows)]
+        n_candidates = min(len(universe), max(k, k * rescore_factor))
+        out = []
+        for vec, approx in zip(q, self.approximate_distances(q, rows)):
+            candidates = universe[np.sort(np.argpartition(approx, n_candidates - 1)[:n_candidates])]
+            exact = self._to_distances(vec[None, :], vec @ self.embeddings[candidates].T, self.sq_norms[candidates])[0]
+            out.append(_smallest(exact, candidates, k))
+        return out
+
+    def search(
+        self,
+        vectors,
+        top_k: int,
+        include: Sequence[str] = ("documents", "metadatas"),
+        where: Optional[Dict[str, Any]] = None,
+    ) -> Dict[str, Any]:
+        """Nearest neighbours (within the `where` partition, if given), returned in the shape of a
+        Chroma query result."""
+        rows = self.rows_where(where) if where else None
+        out: Dict[str, Any] = {"ids": [], "documents": [], "metadatas": [], "distances": []}
+        for top, dist in self.nearest(vectors, top_k, rows=rows):
+            hits = top.tolist()
+            out["ids"].append([self.ids[i] for i in hits])
+            out["distances"].append(dist.tolist())
+            out["documents"].append([self.documents[i] for i in hits] if "documents" in include else None)
+            out["metadatas"].append([self.metadatas[i] for i in hits] if "metadatas" in include else None)
+        return out
+
+
+def matches_where(meta: Optional[dict], where: Dict[str, Any]) -> bool:
+    """Evaluate the subset of Chroma's `where` syntax used for retrieval filters: plain equality,
+    $eq, $ne, $in, $nin, $and and $or."""
+    meta = meta if isinstance(meta, dict) else {}
+    for key, condition in where.items():
+        if key == "$and":
+            if not all(matches_where(meta, c) for c in condition):
+                return False
+        elif key == "$or":
+            if not any(matches_where(meta, c) for c in condition):
+                return False
+        elif isinstance(condition, dict):
+            actual = meta.get(key)
+            for op, value in condition.items():
+                if op == "$eq":
+                    ok = actual == value
+                elif op == "$ne":
+                    ok = actual != value
+                elif op == "$in":
+                    ok = actual in value
+                elif op == "$nin":
+                    ok = actual not in value
+                else:
+                    raise ValueError(f"Unsupported where operator {op!r}")
+                if not ok:
+                    return False
+        elif meta.get(key) != condition:
+            return False
+    return True
+
+
+def _smallest(dist: np.ndarray, rows: np.ndarray, k: int):
+    top = np.argpartition(dist, k - 1)[:k]
+    top = top[np.argsort(dist[top], kind="stable")]
+    return rows[top], dist[top]
+
+
+_INDEX: Optional[LocalIndex] = None
+_INDEX_LOCK = Lock()
+
+
+def get_local_index(directory: str = VECTOR_INDEX_DIR) -> Optional[LocalIndex]:
+    """The current mirror, reloaded after a sync replaced it; None before the first sync."""
+    global _INDEX
+    try:
+        mtime = os.path.getmtime(_paths(directory)["meta.json"])
+    except OSError:
+        return None
+    with _INDEX_LOCK:
+        if _INDEX is None or _INDEX.mtime != mtime:
+            _INDEX = LocalIndex(directory)
+        return _INDEX
+
+
+# --------------------------
+# Sync
+# --------------------------
+async def _fetch_all(collection) -> Dict[str, List]:
+    ids: List[str] = []
+    documents: List[Optional[str]] = []
+    metadatas: List[Optional[dict]] = []
+    offset = 0
+    while True:
+        page = await collection.get(include=["documents", "metadatas"], limit=_PAGE, offset=offset)
+        ids += page["ids"]
+        documents += page.get("documents") or [None] * len(page["ids"])
+        metadatas += page.get("metadatas") or [None] * len(page["ids"])
+        if len(page["ids"]) < _PAGE:
+            return {"ids": ids, "documents": documents, "metadatas": metadatas}
+        offset += _PAGE
+
+
+async def _fetch_embeddings(collection, ids: Sequence[str]) -> Dict[str, np.ndarray]:
+    out: Dict[str, np.ndarray] = {}
+    for start in range(0, len(ids), _EMBEDDING_PAGE):
+        page = await collection.get(ids=list(ids[start:start + _EMBEDDING_PAGE]), include=["embeddings"])
+        for doc_id, vector in zip(page["ids"], page["embeddings"]):
+            out[doc_id] = np.asarray(vector, dtype=np.float32)
+    return out
+
+
+def _write(directory: str, remote: Dict[str, List], hashes: List[str], matrix: np.ndarray, space: str) -> None:
+    paths = _paths(directory)
+    arrays = {"embeddings.npy": matrix, **quantize(matrix)}
+    for name, array in arrays.items():
+        np.save(paths[name] + ".tmp.npy", array)
+    with open(paths["docs.json"] + ".tmp", "w", encoding="utf-8") as f:
+        json.dump({**remote, "hashes": hashes}, f)
+    with open(paths["meta.json"] + ".tmp", "w", encoding="utf-8") as f:
+        json.dump({"count": len(hashes), "dim": int(matrix.shape[1]), "space": space, "synced_at": time.time()}, f)
+    for name in arrays:
+        os.replace(paths[name] + ".tmp.npy", paths[name])
+    os.replace(paths["docs.json"] + ".tmp", paths["docs.json"])
+    os.replace(paths["meta.json"] + ".tmp", paths["meta.json"])
+
+
+def _try_lock(lock_file) -> bool:
+    """Non-blocking exclusive lock on an open file; released when the file is closed."""
+    try:
+        if fcntl is not None:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        else:
+            msvcrt.locking(lock_file.fileno(), msvcrt.LK_NBLCK, 1)
+    except OSError:
+        return False
+    return True
+
+
+async def sync_local_index(collection, directory: str = VECTOR_INDEX_DIR) -> Dict[str, Any]:
+    """Bring the mirror up to date with `collection` (an async Chroma collection).
+
+    Only one process syncs at a time (file lock); others return straight away
+    and pick up the result through `get_local_index`.
+    """
+    os.makedirs(directory, exist_ok=True)
+    with open(_paths(directory)["sync.lock"], "w") as lock:
+        if not _try_lock(lock):
+            return {"skipped": True}
+
+        local = get_local_index(directory)
+        remote = await _fetch_all(collection)
+        hashes = [_content_hash(d, m) for d, m in zip(remote["documents"], remote["metadatas"])]
+        known = {doc_id: i for i, doc_id in enumerate(local.ids)} if local is not None else {}
+        stale = [
+            doc_id for doc_id, h in zip(remote["ids"], hashes)
+            if doc_id not in known or local.hashes[known[doc_id]] != h
+        ]
+        removed = len(set(known) - set(remote["ids"]))
+        complete = all(os.path.exists(_paths(directory)[name]) for name in _QUANTIZED_FILES)
+        if local is not None and not stale and local.ids == remote["ids"] and complete:
+            return {"count": len(local), "fetched": 0, "removed": 0}
+
+        fetched = await _fetch_embeddings(collection, stale)
+        dim = next(iter(fetched.values())).shape[0] if fetched else (local.embeddings.shape[1] if local is not None else 0)
+        matrix = np.empty((len(remote["ids"]), dim), dtype=np.float32)
+        for row, doc_id in enumerate(remote["ids"]):
+            matrix[row] = fetched[doc_id] if doc_id in fetched else local.embeddings[known[doc_id]]
+        space = (getattr(collection, "metadata", None) or {}).get("hnsw:space", "l2")
+        _write(directory, remote, hashes, matrix, space)
+        logging.info(f"Local vector index synced: {len(hashes)} docs, {len(fetched)} embeddings fetched, {removed} removed")
+        return {"count": len(hashes), "fetched": len(fetched), "removed": removed}
+
+
+async def refresh_periodically(get_collection, interval: float, directory: str = VECTOR_INDEX_DIR) -> None:
+    """Background task: sync now, then every `interval` seconds; failures are logged and retried."""
+    while True:
+        try:
+            await sync_local_index(await get_collection(), directory)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logging.error(f"Local vector index sync failed: {e!r}")
+        await asyncio.sleep(interval)
+
+
+def recall_report(
+    directory: str = VECTOR_INDEX_DIR,
+    queries: int = 200,
+    top_k: int = TOP_K,
+    rescore_factors: Sequence[int] = (1, 2, 5, 10, 20),
+    seed: int = 0,
+) -> Dict[str, Any]:
+    """Recall@top_k of each quantization (per rescore factor) against exact search, with the
+    resident size of the scanned matrix and mean latency per query.
+
+    Queries are stored document vectors with a little noise added, so no query is trivially
+    its own nearest neighbour at distance zero.
+    """
+    exact = LocalIndex(directory, "none")
+    if not len(exact):
+        raise ValueError("Local index is empty; run sync first")
+    rng = np.random.default_rng(seed)
+    rows = rng.choice(len(exact), size=min(queries, len(exact)), replace=False)
+    base = np.asarray(exact.embeddings[np.sort(rows)], dtype=np.float32)
+    noise = rng.normal(size=base.shape).astype(np.float32)
+    q = base + 0.1 * noise * (np.linalg.norm(base, axis=1, keepdims=True) / np.sqrt(base.shape[1]))
+
+    start = time.perf_counter()
+    truth = [set(top.tolist()) for top, _ in exact.nearest(q, top_k)]
+    report: Dict[str, Any] = {
+        "documents": len(exact),
+        "dim": int(exact.embeddings.shape[1]),
+        "queries": len(q),
+        "top_k": top_k,
+        "none": {"bytes": int(exact.embeddings.nbytes), "recall": 1.0,
+                 "ms_per_query": round(1000 * (time.perf_counter() - start) / len(q), 3)},
+    }
+    for quantization in ("int8", "binary"):
+        index = LocalIndex(directory, quantization)
+        if index.quantization != quantization:
+            raise ValueError("Quantized files missing; re-run sync")
+        entry: Dict[str, Any] = {"bytes": int(index.codes.nbytes), "by_rescore_factor": {}}
+        for factor in rescore_factors:
+            start = time.perf_counter()
+            found = index.nearest(q, top_k, factor)
+            elapsed = time.perf_counter() - start
+            hits = sum(len(t & set(top.tolist())) for t, (top, _) in zip(truth, found))
+            entry["by_rescore_factor"][str(factor)] = {
+                "recall": round(hits / sum(len(t) for t in truth), 4),
+                "ms_per_query": round(1000 * elapsed / len(q), 3),
+            }
+        report[quantization] = entry
+    return report
+
+
+def _main() -> None:
+    parser = argparse.ArgumentParser(description="Sync the local mirror of the Chroma collection, or measure quantized recall.")
+    parser.add_argument("command", choices=["sync", "recall"])
+    parser.add_argument("--out", default=VECTOR_INDEX_DIR)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--top-k", type=int, default=TOP_K)
+    args = parser.parse_args()
+
+    if args.command == "recall":
+        print(json.dumps(recall_report(args.out, args.queries, args.top_k), indent=2))
+        return
+
+    from src.database.chroma_db import get_chroma_collection
+
+    async def run():
+        return await sync_local_index(await get_chroma_collection(), args.out)
+    print(json.dumps(asyncio.run(run())))
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    _main()
@@ -1,5 +1,6 @@
 from pydantic import BaseModel
 from typing import Optional, List, Dict, Any, Literal
+from src.models.kundli_model import BirthDetails
 
 class AIRequests(BaseModel):
     question: str
@@ -8,6 +9,7 @@ class AIRequests(BaseModel):
     religion: Optional[Literal["hindu", "christian", "muslim", "buddhist", "jain", "sikh", "secular"]] = "hindu"  # default to hindu for backward compatibility
     use_history: Optional[bool] = False
     session_id: Optional[str] = None
+    birth_details: Optional[BirthDetails] = None  # adds computed dasha and yoga/dosha facts to the context
 
 
 class AIResponses(BaseModel):
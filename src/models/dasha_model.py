@@ -0,0 +1,33 @@
+from pydantic import BaseModel, Field
+from typing import List, Literal, Optional
+from src.models.kundli_model import BirthDetails
+
+
+class DashaRequest(BaseModel):
+    items: List[BirthDetails]          # one or more people, computed together
+    levels: int = Field(2, ge=1, le=3)  # 1 = mahadasha, 2 = + antardasha, 3 = + pratyantardasha
+    at: Optional[str] = None           # ISO date for `current`; default now
+    ayanamsa: Literal["lahiri", "raman", "krishnamurti"] = "lahiri"
+    timeline: bool = True              # False: only the running periods
+
+
+class DashaPeriod(BaseModel):
+    lord: str
+    level: str                         # "maha", "antar" or "pratyantar"
+    start: str                         # UTC date
+    end: str
+    periods: Optional[List["DashaPeriod"]] = None
+
+
+class DashaResult(BaseModel):
+    index: int
+    moon_nakshatra: Optional[str] = None
+    moon_pada: Optional[int] = None
+    balance_years: Optional[float] = None  # of the first mahadasha, at birth
+    current: List[DashaPeriod] = []        # running maha / antar / pratyantar at `at`
+    timeline: Optional[List[DashaPeriod]] = None
+    error: Optional[str] = None
+
+
+class DashaResponse(BaseModel):
+    results: List[DashaResult]
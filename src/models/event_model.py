@@ -0,0 +1,31 @@
+from pydantic import BaseModel
+from typing import Dict, List, Literal, Optional
+from src.models.kundli_model import AspectOptions
+
+
+EventKind = Literal["ingress", "nakshatra", "pada", "station", "aspect"]
+
+
+class EventSearchRequest(BaseModel):
+    start: str                            # ISO datetime, UTC unless an offset is given
+    end: str
+    bodies: Optional[List[str]] = None    # default: all planets
+    events: List[EventKind] = ["ingress", "station"]
+    aspects: Optional[AspectOptions] = None   # aspect set for "aspect" events (orbs are ignored)
+    natal: Optional[Dict[str, float]] = None  # exact aspects to these longitudes instead of between bodies
+
+
+class AstroEvent(BaseModel):
+    time: str                     # UTC, to the second
+    julian_day: float
+    body: str
+    event: str
+    longitude: float              # of `body` at the event
+    previous: Optional[str] = None
+    current: Optional[str] = None
+    target: Optional[str] = None  # other body / natal point, for aspects
+    aspect: Optional[str] = None
+
+
+class EventSearchResponse(BaseModel):
+    events: List[AstroEvent]
@@ -1,5 +1,5 @@
 from pydantic import BaseModel
-from typing import Dict, List, Optional
+from typing import Dict, List, Literal, Optional
 
 
 
@@ -12,6 +12,7 @@ class Planet(BaseModel):
     house: Optional[int]
     nakshatra: str
     pada: int
+    speed: Optional[float] = None  # degrees/day
 
 class House(BaseModel):
     number: int
@@ -22,7 +23,18 @@ class House(BaseModel):
 class Aspect(BaseModel):
     between: List[str]
     type: str
-    angle: float
+    angle: float                      # separation folded into 0-180 degrees
+    orb: Optional[float] = None       # distance from the exact aspect angle
+    applying: Optional[bool] = None   # True while the orb is closing
+
+class AspectOptions(BaseModel):
+    aspect_set: Literal["major", "minor", "all"] = "major"
+    orbs: Optional[Dict[str, float]] = None         # per aspect, e.g. {"Trine": 6}
+    planet_orbs: Optional[Dict[str, float]] = None  # per planet, e.g. {"Moon": 10}
+
+class VargaPlacement(BaseModel):
+    sign: str
+    house: int   # whole-sign house counted from the varga ascendant
 
 class KundliChart(BaseModel):
     place: str
@@ -33,6 +45,9 @@ class KundliChart(BaseModel):
     planets: Dict[str, Planet]
     houses: Dict[int, House]
     aspects: List[Aspect]
+    zodiac: str = "tropical"
+    ayanamsa: Optional[float] = None  # degrees subtracted from tropical longitudes (sidereal only)
+    vargas: Optional[Dict[str, Dict[str, VargaPlacement]]] = None  # e.g. {"D9": {"Sun": {...}, "Ascendant": {...}}}
 
 class KundliResponse(BaseModel):
     name: str
@@ -50,3 +65,25 @@ class KundliRequest(BaseModel):
     birth_time: str  # e.g. "09:45"
     place: str       # e.g. "Bangalore, India"
     gender: str      # e.g. "Male"
+    aspects: Optional[AspectOptions] = None  # default: major aspects, ASPECT_DEFAULT_ORB
+    zodiac: Literal["tropical", "sidereal"] = "tropical"
+    ayanamsa: Literal["lahiri", "raman", "krishnamurti"] = "lahiri"  # sidereal only
+    vargas: Optional[List[str]] = None  # divisional charts to add, e.g. ["D9", "D10"]
+
+
+
+class BirthDetails(BaseModel):
+    birth_date: str  # e.g. "1985-05-10"
+    birth_time: str  # e.g. "09:45"
+    place: str       # e.g. "Bangalore, India"
+
+
+
+class KundliBatchRequest(BaseModel):
+    items: List[KundliRequest]
+
+
+class KundliBatchItem(BaseModel):
+    index: int                               # position of the item in the request
+    result: Optional[KundliResponse] = None
+    error: Optional[str] = None
@@ -0,0 +1,29 @@
+from pydantic import BaseModel, Field
+from typing import Dict, List, Literal, Optional
+from src.models.kundli_model import BirthDetails
+
+
+class MatchRequest(BaseModel):
+    profile: BirthDetails
+    role: Literal["boy", "girl"] = "boy"          # the profile's side in the koota tables
+    candidates: Optional[List[float]] = None      # sidereal Moon longitudes of the candidates
+    candidate_ids: Optional[List[str]] = None     # same order as `candidates`; default: their index
+    candidate_set: Optional[str] = None           # or a stored set (see compatibility.save_candidate_set)
+    top_k: int = Field(10, ge=1, le=1000)
+    min_score: float = 0                          # out of 36
+    ayanamsa: Literal["lahiri", "raman", "krishnamurti"] = "lahiri"
+
+
+class Match(BaseModel):
+    id: str
+    moon_nakshatra: str
+    moon_sign: str
+    score: float
+    breakdown: Dict[str, float]   # per koota
+
+
+class MatchResponse(BaseModel):
+    profile_nakshatra: str
+    profile_sign: str
+    candidates_scored: int
+    matches: List[Match]
@@ -0,0 +1,25 @@
+from pydantic import BaseModel, Field
+from typing import List, Literal, Optional
+
+
+class MuhurtaRequest(BaseModel):
+    place: str
+    start_date: str                                  # local date "YYYY-MM-DD"
+    end_date: str                                    # inclusive
+    tithis: Optional[List[int]] = None               # allowed tithis, 1-15 shukla, 16-30 krishna
+    nakshatras: Optional[List[str]] = None           # allowed Moon nakshatras
+    lagnas: Optional[List[str]] = None               # allowed (sidereal) ascendant signs
+    avoid_malefic_aspects: bool = False              # no Mars/Saturn/Rahu/Ketu conjunction, square or opposition
+    malefic_targets: List[Literal["moon", "lagna"]] = ["moon", "lagna"]
+    malefic_orb: float = Field(5.0, gt=0, le=15)
+    min_duration_minutes: float = Field(0, ge=0)
+    ayanamsa: Literal["lahiri", "raman", "krishnamurti"] = "lahiri"
+
+
+class MuhurtaWindow(BaseModel):
+    start: str                # local "YYYY-MM-DD HH:MM:SS"
+    end: str
+    duration_minutes: float
+    tithi: str                # at the start of the window
+    nakshatra: str
+    lagna: str
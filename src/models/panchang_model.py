@@ -0,0 +1,34 @@
+from pydantic import BaseModel
+from typing import Literal, Optional
+
+
+class PanchangElement(BaseModel):
+    number: int               # 1-based: tithi 1-30, nakshatra 1-27, yoga 1-27
+    name: str
+    ends: str                 # local "YYYY-MM-DD HH:MM:SS"
+    pada: Optional[int] = None
+
+
+class TimeSpan(BaseModel):
+    start: str                # local "HH:MM:SS"
+    end: str
+
+
+class PanchangResponse(BaseModel):
+    place: str
+    date: str
+    timezone: str
+    ayanamsa: str
+    vara: str
+    sunrise: str
+    sunset: str
+    paksha: Literal["Shukla", "Krishna"]
+    tithi: PanchangElement    # values at sunrise
+    nakshatra: PanchangElement
+    yoga: PanchangElement
+    karana: str
+    rahu_kalam: TimeSpan
+    yamaganda: TimeSpan
+    gulika_kalam: TimeSpan
+    abhijit_muhurta: TimeSpan
+    source: Literal["precomputed", "computed"]
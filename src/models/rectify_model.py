@@ -0,0 +1,49 @@
+from pydantic import BaseModel, Field
+from typing import List, Literal, Optional
+
+
+LifeEventKind = Literal[
+    "marriage", "relationship", "career", "promotion", "childbirth", "education",
+    "relocation", "property", "health", "accident", "bereavement", "travel", "finance",
+]
+
+
+class LifeEvent(BaseModel):
+    date: str                 # "YYYY-MM-DD"
+    kind: LifeEventKind
+    weight: float = 1.0
+
+
+class RectifyRequest(BaseModel):
+    birth_date: str                       # e.g. "1985-05-10"
+    place: str
+    window_start: str = "00:00"           # local time, start of the uncertain range
+    window_end: str = "23:59"             # local time, inclusive
+    resolution_minutes: float = Field(2.0, gt=0)
+    life_events: List[LifeEvent] = Field(..., min_length=1)
+    top_k: int = Field(5, ge=1, le=50)
+    ayanamsa: Literal["lahiri", "raman", "krishnamurti"] = "lahiri"
+
+
+class RectifyWindow(BaseModel):
+    start: str                # local "YYYY-MM-DD HH:MM:SS"; ascendant and cusp signs are constant inside
+    end: str
+    best_time: str
+    score: float
+    ascendant_sign: str
+    cusp_signs: List[str]     # sidereal, houses 1-12
+
+
+class RectifyResult(BaseModel):
+    timezone: str
+    samples: int
+    boundaries: int
+    candidates: List[RectifyWindow]
+
+
+class RectifyJob(BaseModel):
+    job_id: str
+    status: Literal["queued", "running", "done", "failed"]
+    created_at: float
+    result: Optional[RectifyResult] = None
+    error: Optional[str] = None
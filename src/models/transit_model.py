@@ -0,0 +1,47 @@
+from pydantic import BaseModel
+from typing import Dict, List, Optional
+from src.models.kundli_model import AspectOptions
+
+
+class TransitRequest(BaseModel):
+    start: str                            # ISO datetime, UTC unless an offset is given, e.g. "2025-01-01T00:00"
+    end: str                              # inclusive
+    step: str = "1d"                      # "<number><d|h|m>", e.g. "1d", "6h", "30m"
+    bodies: Optional[List[str]] = None    # default: all planets
+    natal: Optional[Dict[str, float]] = None  # natal longitudes to aspect, e.g. {"Moon": 123.4}
+    aspects: Optional[AspectOptions] = None
+    events_only: bool = False             # emit only the timestamps where something changes
+
+
+class TransitPosition(BaseModel):
+    longitude: float
+    sign: str
+    degree: float
+    nakshatra: str
+    pada: int
+    retrograde: bool
+    speed: float
+
+
+class TransitEvent(BaseModel):
+    body: str
+    event: str            # "sign_change", "retrograde" or "direct"
+    previous: Optional[str] = None
+    current: Optional[str] = None
+
+
+class TransitAspect(BaseModel):
+    transit: str
+    natal: str
+    type: str
+    angle: float
+    orb: float
+    applying: Optional[bool] = None
+
+
+class TransitRecord(BaseModel):
+    time: str
+    julian_day: float
+    positions: Dict[str, TransitPosition] = {}
+    events: List[TransitEvent] = []
+    aspects: List[TransitAspect] = []
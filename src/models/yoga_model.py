@@ -0,0 +1,27 @@
+from pydantic import BaseModel
+from typing import List, Literal, Optional
+from src.models.kundli_model import BirthDetails
+
+
+class YogaRequest(BaseModel):
+    items: List[BirthDetails]
+    rules: Optional[List[str]] = None  # default: all rules
+    at: Optional[str] = None           # ISO date for transit rules (Sade Sati); default now
+    ayanamsa: Literal["lahiri", "raman", "krishnamurti"] = "lahiri"
+
+
+class YogaHit(BaseModel):
+    name: str
+    label: str
+    kind: str          # "yoga" or "dosha"
+    description: str
+
+
+class YogaResult(BaseModel):
+    index: int
+    present: List[YogaHit] = []
+    error: Optional[str] = None
+
+
+class YogaResponse(BaseModel):
+    results: List[YogaResult]
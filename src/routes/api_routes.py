@@ -1,10 +1,32 @@
 # src/routes/api_routes.py
 from src.services.astro_service import process_question, process_question_with_context
-from src.services.kundli import compute_kundli
-from src.models.kundli_model import KundliResponse, KundliRequest
+from src.services.kundli_async import compute_kundli_async, run_ephemeris
+from src.services.events import search_events
+from src.services.dasha import compute_dashas_async, sidereal_moon_for_birth
+from src.services.compatibility import match_candidates
+from src.services.yogas import detect_yogas_async
+from src.services.rectification import get_rectification_job, submit_rectification
+from src.services.muhurta import MuhurtaQuery, stream_muhurta
+from src.services.panchang import get_panchang
+from src.services.astro_context import build_chart_context, merge_context
+from src.services.kundli_batch import stream_kundli_batch
+from src.models.kundli_model import KundliResponse, KundliRequest, KundliBatchRequest
+from src.models.transit_model import TransitRequest
+from src.models.event_model import EventSearchRequest, EventSearchResponse
+from src.models.dasha_model import DashaRequest, DashaResponse
+from src.models.match_model import MatchRequest, MatchResponse
+from src.models.yoga_model import YogaRequest, YogaResponse
+from src.models.rectify_model import RectifyJob, RectifyRequest
+from src.models.muhurta_model import MuhurtaRequest
+from src.models.panchang_model import PanchangResponse
+from src.services.transits import TransitQuery, stream_transits
 from src.models.astro_rag_model import AIRequests, AIResponses
+from src.utils.cache import cache_stats
+import asyncio
+from typing import Literal, Optional
 from fastapi import Header, HTTPException, Security, Depends , APIRouter , Form, Body
-from config import API_KEY
+from fastapi.responses import StreamingResponse
+from config import API_KEY, KUNDLI_BATCH_MAX_ITEMS
 
 router = APIRouter()
 
@@ -29,6 +51,9 @@ async def astro_rag_endpoint(
     - **context** (str, optional): Any additional context to help answer the question.
     - **rag_with_context** (bool): If `True`, context is used for retrieval as well.
     - **religion** (str, optional): User's religion preference - one of: hindu, christian, muslim, buddhist, jain, sikh, secular. Defaults to "hindu".
+    - **birth_details** (object, optional): birth_date, birth_time and place. When given, the running
+      Vimshottari dasha periods and the yogas/doshas present (Manglik, Kaal Sarp, Sade Sati, ...) are
+      computed and added to the context, so these answers do not rely on the LLM.
    
 
     ### Behavior:
@@ -68,10 +93,14 @@ async def astro_rag_endpoint(
     ```
     """
     try:
+        context = payload.context
+        if payload.birth_details:
+            context = merge_context(context, await build_chart_context(payload.birth_details))
+
         if payload.rag_with_context:
             result = await process_question_with_context(
                 question=payload.question,
-                context=payload.context,
+                context=context,
                 religion=payload.religion,
                 session_id=payload.session_id,
                 use_history=payload.use_history,
@@ -79,7 +108,7 @@ async def astro_rag_endpoint(
         else:
             result = await process_question(
                 question=payload.question,
-                context=payload.context,
+                context=context,
                 religion=payload.religion,
                 session_id=payload.session_id,
                 use_history=payload.use_history,
@@ -107,6 +136,15 @@ async def generate_kundli(
     - birth_time (str): Time of birth in 24-hour format (HH:MM). Example: "14:30".
     - place (str): Place of birth (e.g., "Delhi", "Mumbai", or "Delhi, India").
     - gender (str): Gender identity (e.g., "Male", "Female", "Other").
+    - aspects (object, optional): Aspect configuration:
+        - aspect_set: "major" (default), "minor" or "all".
+        - orbs: per-aspect orbs, e.g. {"Trine": 6}. Major aspects default to `ASPECT_DEFAULT_ORB`
+          (5 degrees); minor aspects to their own 2-3 degree orbs.
+        - planet_orbs: per-planet orbs, e.g. {"Moon": 10}; a pair gets the mean of its two planets.
+    - zodiac (str, optional): "tropical" (default) or "sidereal".
+    - ayanamsa (str, optional): "lahiri" (default), "raman" or "krishnamurti"; sidereal only.
+    - vargas (List[str], optional): Divisional charts to include, any of D1, D2, D3, D4,
+      D7, D9, D10, D12, D16, D20, D24, D27, D30, D40, D45, D60. Omit for D1 only.
     - x-api-key (header): API key for authorization.
 
     Processing Logic:
@@ -123,13 +161,19 @@ async def generate_kundli(
     - Planetary data (positions, signs, retrograde status, nakshatra, pada, house)
     - House positions with zodiac signs
     - Ascendant and MC (Midheaven)
-    - Aspect relationships between planets
+    - Aspect relationships between planets (separation, orb, applying/separating)
     - Julian day and timezone used
+    - Zodiac and ayanamsa (sidereal charts shift every longitude by the ayanamsa)
+    - Requested vargas: sign and whole-sign house of each planet and the Ascendant
 
     Notes:
     - Accepts both "YYYY-MM-DD" and "DD-MM-YYYY" formats for birth_date.
     - Accepts "HH:MM" or "HH:MM:SS" for time.
     - Automatically retries geolocation if the request times out.
+    - Geocoding is non-blocking and the ephemeris math runs on a dedicated bounded
+      executor; the whole computation must finish within `KUNDLI_DEADLINE_SECONDS`.
+    - Vargas are derived from the same longitudes with table lookups, so they add
+      no ephemeris calls; requests without `vargas` pay nothing extra.
     - Ensure the place string is as accurate as possible for timezone and latitude/longitude lookup.
 
     Example Request (form-data):
@@ -145,13 +189,23 @@ async def generate_kundli(
 
     Raises:
     - 400 Bad Request if input is invalid or geolocation fails.
+    - 504 Gateway Timeout if the chart is not ready within the deadline.
 
     Security:
     - Requires a valid API key passed in the `x-api-key` header.
     """
     
     try:
-        chart = compute_kundli(payload.birth_date, payload.birth_time, payload.place, payload.gender)
+        chart = await compute_kundli_async(
+            payload.birth_date,
+            payload.birth_time,
+            payload.place,
+            payload.gender,
+            payload.aspects,
+            payload.zodiac,
+            payload.ayanamsa,
+            payload.vargas,
+        )
         return KundliResponse(
             name=payload.name,
             birth_date=payload.birth_date,
@@ -160,7 +214,477 @@ async def generate_kundli(
             gender=payload.gender,
             chart=chart
         )
+    except asyncio.TimeoutError:
+        raise HTTPException(status_code=504, detail="Kundli computation timed out")
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
 
+@router.post("/generate/batch")
+async def generate_kundli_batch(
+    payload: KundliBatchRequest = Body(...), x_api_key: str = Depends(verify_api_key)
+):
+    """
+    Endpoint to generate many Kundli charts in one request.
+
+    The Swiss Ephemeris work is spread across a process pool sized to the
+    available cores (`KUNDLI_BATCH_WORKERS`), and results are streamed back
+    as NDJSON (`application/x-ndjson`) in the same order as the request items.
+
+    Request Body:
+    - items (List[KundliRequest]): Same fields as `/generate`, at most
+      `KUNDLI_BATCH_MAX_ITEMS` per request.
+
+    Output (one JSON object per line):
+    - index (int): Position of the item in the request.
+    - result (KundliResponse | null): The generated chart, if successful.
+    - error (str | null): Error message for this item; other items are unaffected.
+
+    Example Line:
+    ----------------------------------
+    {"index": 0, "result": {"name": "Vinay Kumar", ..., "chart": {...}}, "error": null}
+    {"index": 1, "result": null, "error": "Error computing kundli: Could not geocode place: Xyz"}
+
+    Raises:
+    - 413 if the batch is larger than `KUNDLI_BATCH_MAX_ITEMS`.
+
+    Security:
+    - Requires a valid API key passed in the `x-api-key` header.
+    """
+    if len(payload.items) > KUNDLI_BATCH_MAX_ITEMS:
+        raise HTTPException(
+            status_code=413,
+            detail=f"Batch too large: {len(payload.items)} items (max {KUNDLI_BATCH_MAX_ITEMS})",
+        )
+    return StreamingResponse(stream_kundli_batch(payload.items), media_type="application/x-ndjson")
+
+
+@router.post("/transits")
+async def transit_series(
+    payload: TransitRequest = Body(...), x_api_key: str = Depends(verify_api_key)
+):
+    """
+    Endpoint to stream planetary positions over a time range.
+
+    Positions are computed in chunks and streamed as NDJSON
+    (`application/x-ndjson`), one line per timestamp, so long ranges
+    (years at daily steps, days at minute steps) never build up in memory.
+    With `USE_EPHEMERIS_TABLE` enabled, positions are interpolated from the
+    precomputed table instead of calling Swiss Ephemeris per step.
+
+    Request Body:
+    - start (str): ISO datetime, UTC unless an offset is given (e.g. "2025-01-01T00:00").
+    - end (str): ISO datetime, inclusive.
+    - step (str, optional): "<number><d|h|m>", e.g. "1d", "6h", "30m". Defaults to "1d".
+    - bodies (List[str], optional): Planets to include. Defaults to all.
+    - natal (Dict[str, float], optional): Natal longitudes to aspect, e.g. {"Moon": 123.4}.
+    - aspects (AspectOptions, optional): Aspect set and orbs for the natal aspects.
+    - events_only (bool, optional): Only emit timestamps with sign changes or
+      retrograde/direct stations (positions and aspects are omitted).
+
+    Output (one JSON object per line):
+    - time (str), julian_day (float)
+    - positions: {body: {longitude, sign, degree, nakshatra, pada, retrograde, speed}}
+    - events: [{body, event: "sign_change" | "retrograde" | "direct", previous, current}]
+    - aspects: [{transit, natal, type, angle, orb, applying}]
+
+    Example Line:
+    ----------------------------------
+    {"time": "2025-03-29T00:00:00", "julian_day": 2460763.5, "positions": {}, "events": [{"body": "Saturn", "event": "sign_change", "previous": "Aquarius", "current": "Pisces"}], "aspects": []}
+
+    Raises:
+    - 400 for an invalid range, step or body, or more than `TRANSIT_MAX_STEPS` steps.
+
+    Security:
+    - Requires a valid API key passed in the `x-api-key` header.
+    """
+    try:
+        query = TransitQuery(payload)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return StreamingResponse(stream_transits(query), media_type="application/x-ndjson")
+
+
+@router.post("/events", response_model=EventSearchResponse)
+async def astro_events(
+    payload: EventSearchRequest = Body(...), x_api_key: str = Depends(verify_api_key)
+) -> EventSearchResponse:
+    """
+    Endpoint to find the exact times of astrological events in a date range.
+
+    Events are bracketed on a coarse grid and refined by root finding to
+    about one second, so questions like "when does Jupiter enter Taurus" or
+    "when does Mercury go retrograde" are answered precisely with a few
+    thousand ephemeris calls per year. Results are cached per year.
+
+    Request Body:
+    - start (str): ISO datetime, UTC unless an offset is given (e.g. "2025-01-01").
+    - end (str): ISO datetime, inclusive.
+    - bodies (List[str], optional): Planets to search. Defaults to all.
+    - events (List[str], optional): Any of "ingress", "nakshatra", "pada",
+      "station", "aspect". Defaults to ["ingress", "station"].
+    - aspects (AspectOptions, optional): Aspect set for "aspect" events
+      (orbs are ignored: only exact aspects are reported). Defaults to major.
+    - natal (Dict[str, float], optional): Natal longitudes; when given,
+      aspects are searched between each body and these points instead of
+      between the bodies themselves.
+
+    Returns:
+    - EventSearchResponse: events sorted by time, each with time (UTC, to
+      the second), julian_day, body, event, longitude, previous/current
+      (sign, nakshatra, pada or motion) and target/aspect for aspects.
+
+    Example Response:
+    ----------------------------------
+    {
+      "events": [
+        {"time": "2023-05-16T17:20:05", "julian_day": 2460081.2222, "body": "Jupiter",
+         "event": "ingress", "longitude": 30.0, "previous": "Aries", "current": "Taurus",
+         "target": null, "aspect": null}
+      ]
+    }
+
+    Raises:
+    - 400 for an invalid range or body, or a range over `EVENTS_MAX_YEARS` years.
+
+    Security:
+    - Requires a valid API key passed in the `x-api-key` header.
+    """
+    try:
+        events = await run_ephemeris(search_events, payload)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return EventSearchResponse(events=events)
+
+
+@router.post("/dasha", response_model=DashaResponse)
+async def vimshottari_dasha(
+    payload: DashaRequest = Body(...), x_api_key: str = Depends(verify_api_key)
+) -> DashaResponse:
+    """
+    Endpoint to compute Vimshottari dasha periods for one or more people.
+
+    Births are geocoded concurrently, then the periods for all of them are
+    computed in one vectorized pass from precomputed period tables.
+
+    Request Body:
+    - items (List[object]): birth_date, birth_time and place per person
+      (at most `KUNDLI_BATCH_MAX_ITEMS`).
+    - levels (int, optional): 1 = mahadasha, 2 = + antardasha (default),
+      3 = + pratyantardasha.
+    - at (str, optional): ISO date for the running periods. Defaults to now.
+    - ayanamsa (str, optional): "lahiri" (default), "raman" or "krishnamurti",
+      used for the sidereal Moon.
+    - timeline (bool, optional): Include the full nested timeline. Defaults to True.
+
+    Returns:
+    - DashaResponse: one result per item, in request order, with the Moon's
+      nakshatra/pada, the balance of the first mahadasha in years, the running
+      periods (`current`) and the nested `timeline` from birth. Items that
+      fail (e.g. unknown place) carry an `error` instead.
+
+    Example Response:
+    ----------------------------------
+    {
+      "results": [
+        {"index": 0, "moon_nakshatra": "Uttara Ashadha", "moon_pada": 2, "balance_years": 3.6464,
+         "current": [{"lord": "Rahu", "level": "maha", "start": "2011-01-06", "end": "2029-01-05", "periods": null},
+                     {"lord": "Moon", "level": "antar", "start": "2026-06-19", "end": "2027-12-19", "periods": null}],
+         "timeline": [...], "error": null}
+      ]
+    }
+
+    Raises:
+    - 400 for an invalid `at` date or too many items.
+
+    Security:
+    - Requires a valid API key passed in the `x-api-key` header.
+    """
+    try:
+        results = await compute_dashas_async(payload)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return DashaResponse(results=results)
+
+
+@router.post("/match", response_model=MatchResponse)
+async def ashtakoota_match(
+    payload: MatchRequest = Body(...), x_api_key: str = Depends(verify_api_key)
+) -> MatchResponse:
+    """
+    Endpoint to score one profile against many candidates with Ashtakoota (guna milan).
+
+    Only the profile's chart is computed. Candidates are given as sidereal Moon
+    longitudes, inline or as a stored candidate set, and all of them are scored
+    at once with precomputed 12x12 sign and 27x27 nakshatra koota tables.
+
+    Request Body:
+    - profile (object): birth_date, birth_time and place of the person being matched.
+    - role (str, optional): "boy" (default) or "girl"; the profile's side in the koota tables.
+    - candidates (List[float], optional): Sidereal Moon longitudes of the candidates.
+    - candidate_ids (List[str], optional): Ids for `candidates`, same order. Defaults to the index.
+    - candidate_set (str, optional): Name of a stored set (`python -m src.services.compatibility build-set`).
+    - top_k (int, optional): Number of matches to return. Defaults to 10.
+    - min_score (float, optional): Minimum total (out of 36).
+    - ayanamsa (str, optional): "lahiri" (default), "raman" or "krishnamurti" for the profile's Moon.
+
+    Returns:
+    - MatchResponse: the profile's Moon nakshatra and sign, the number of candidates
+      scored, and the best matches (highest score first) with per-koota points:
+      varna (1), vashya (2), tara (3), yoni (4), graha_maitri (5), gana (6), bhakoot (7), nadi (8).
+
+    Example Response:
+    ----------------------------------
+    {
+      "profile_nakshatra": "Uttara Ashadha",
+      "profile_sign": "Capricorn",
+      "candidates_scored": 50000,
+      "matches": [
+        {"id": "u123", "moon_nakshatra": "Hasta", "moon_sign": "Virgo", "score": 31.0,
+         "breakdown": {"varna": 1.0, "vashya": 0.5, "tara": 3.0, "yoni": 2.0, "graha_maitri": 4.0,
+                       "gana": 6.0, "bhakoot": 7.0, "nadi": 8.0}}
+      ]
+    }
+
+    Raises:
+    - 400 if the profile cannot be located, no candidates are given, the set is
+      unknown, or there are more than `MATCH_MAX_CANDIDATES` candidates.
+
+    Security:
+    - Requires a valid API key passed in the `x-api-key` header.
+    """
+    try:
+        _, profile_moon = await sidereal_moon_for_birth(payload.profile, payload.ayanamsa)
+        return await run_ephemeris(match_candidates, payload, profile_moon)
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@router.post("/yogas", response_model=YogaResponse)
+async def yogas_and_doshas(
+    payload: YogaRequest = Body(...), x_api_key: str = Depends(verify_api_key)
+) -> YogaResponse:
+    """
+    Endpoint to detect yogas and doshas (Manglik, Kaal Sarp, Sade Sati, ...) for one or more people.
+
+    Rules are declarative and compiled to array predicates, so all charts in
+    the request are evaluated together in a few NumPy operations per rule.
+    Charts are sidereal; Sade Sati uses the transits at `at`.
+
+    Request Body:
+    - items (List[object]): birth_date, birth_time and place per person
+      (at most `KUNDLI_BATCH_MAX_ITEMS`).
+    - rules (List[str], optional): Rules to evaluate. Defaults to all: manglik,
+      kaal_sarp, sade_sati, kemadruma, guru_chandala, gaja_kesari, budha_aditya,
+      chandra_mangala.
+    - at (str, optional): ISO date for transit-based rules. Defaults to now.
+    - ayanamsa (str, optional): "lahiri" (default), "raman" or "krishnamurti".
+
+    Returns:
+    - YogaResponse: one result per item, in request order, listing the rules
+      that hold (name, label, kind, description), or an `error`.
+
+    Example Response:
+    ----------------------------------
+    {
+      "results": [
+        {"index": 0, "present": [{"name": "manglik", "label": "Manglik (Kuja) Dosha", "kind": "dosha",
+          "description": "Mars in the 1st, 2nd, 4th, 7th, 8th or 12th from the Ascendant or the Moon."}],
+         "error": null}
+      ]
+    }
+
+    Raises:
+    - 400 for an unknown rule, an invalid `at` date or too many items.
+
+    Security:
+    - Requires a valid API key passed in the `x-api-key` header.
+    """
+    try:
+        results = await detect_yogas_async(payload)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return YogaResponse(results=results)
+
+
+@router.post("/rectify", response_model=RectifyJob, status_code=202)
+async def rectify_birth_time(
+    payload: RectifyRequest = Body(...), x_api_key: str = Depends(verify_api_key)
+) -> RectifyJob:
+    """
+    Endpoint to start a birth-time rectification job for an uncertain birth time.
+
+    The place is geocoded once and the window is sampled at `resolution_minutes`;
+    each sample is scored against the life events (slow transits to the
+    relevant house cusps and the running dasha lords). The exact times where the
+    ascendant or a house cusp changes sign are found by bisection and split the
+    window into candidate windows. The sweep runs on the worker process pool in
+    the background; poll `GET /astro/rectify/{job_id}` for the result.
+
+    Request Body:
+    - birth_date (str): Date of birth, "YYYY-MM-DD".
+    - place (str): Place of birth.
+    - window_start / window_end (str, optional): Local "HH:MM" bounds of the uncertain
+      range (default the whole day). An end before the start crosses midnight.
+    - resolution_minutes (float, optional): Sampling step. Defaults to 2.
+    - life_events (List[object]): date ("YYYY-MM-DD"), kind (marriage, career, childbirth,
+      relocation, health, bereavement, ...) and optional weight.
+    - top_k (int, optional): Number of candidate windows to return. Defaults to 5.
+    - ayanamsa (str, optional): "lahiri" (default), "raman" or "krishnamurti".
+
+    Returns:
+    - RectifyJob: job_id and status "queued".
+
+    Raises:
+    - 400 for invalid dates or a window needing more than `RECTIFY_MAX_SAMPLES` samples.
+
+    Security:
+    - Requires a valid API key passed in the `x-api-key` header.
+    """
+    try:
+        return await submit_rectification(payload)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@router.get("/rectify/{job_id}", response_model=RectifyJob)
+async def rectify_job_status(job_id: str, x_api_key: str = Depends(verify_api_key)) -> RectifyJob:
+    """
+    Status of a rectification job: "queued", "running", "done" (with `result`) or "failed" (with `error`).
+
+    The result lists candidate windows (local start/end, best time, score and
+    sidereal ascendant/cusp signs), best first. Jobs expire after
+    `RECTIFY_JOB_TTL_SECONDS`. A job whose worker stopped (restart, crash) is
+    reported as "failed" instead of staying "running".
+
+    Example Response:
+    ----------------------------------
+    {
+      "job_id": "9f2c...", "status": "done", "created_at": 1760000000.0,
+      "result": {"timezone": "Asia/Kolkata", "samples": 241, "boundaries": 12,
+        "candidates": [{"start": "1985-05-10 22:00:00", "end": "1985-05-10 22:52:15",
+          "best_time": "1985-05-10 22:13:00", "score": 6.04, "ascendant_sign": "Sagittarius",
+          "cusp_signs": ["Sagittarius", "Capricorn", "..."]}]},
+      "error": null
+    }
+
+    Raises:
+    - 404 if the job is unknown or expired.
+    """
+    job = await get_rectification_job(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Unknown or expired job")
+    return job
+
+
+@router.post("/muhurta")
+async def muhurta_search(
+    payload: MuhurtaRequest = Body(...), x_api_key: str = Depends(verify_api_key)
+):
+    """
+    Endpoint to find auspicious time windows (muhurta) over a date range at one place.
+
+    Each constraint only changes state where its underlying longitude crosses
+    a boundary, so those crossings are bracketed and refined instead of
+    testing every minute; slow constraints (tithi, nakshatra) run first and
+    the ascendant is only computed inside the intervals they allow. Days are
+    searched in parallel and windows are streamed as NDJSON
+    (`application/x-ndjson`) in time order as they are found.
+
+    Request Body:
+    - place (str): Location of the event.
+    - start_date / end_date (str): Local dates "YYYY-MM-DD", inclusive
+      (at most `MUHURTA_MAX_DAYS` days).
+    - tithis (List[int], optional): Allowed tithis, 1-15 shukla paksha, 16-30 krishna paksha.
+    - nakshatras (List[str], optional): Allowed Moon nakshatras.
+    - lagnas (List[str], optional): Allowed ascendant signs (sidereal).
+    - avoid_malefic_aspects (bool, optional): Exclude Mars, Saturn, Rahu and Ketu within
+      `malefic_orb` (default 5) degrees of conjunction, square or opposition to the
+      `malefic_targets` ("moon", "lagna"; default both).
+    - min_duration_minutes (float, optional): Drop shorter windows.
+    - ayanamsa (str, optional): "lahiri" (default), "raman" or "krishnamurti".
+
+    Output (one JSON object per line):
+    - start, end (local "YYYY-MM-DD HH:MM:SS"), duration_minutes
+    - tithi, nakshatra, lagna at the start of the window
+
+    Example Line:
+    ----------------------------------
+    {"start": "2025-01-11 17:22:00", "end": "2025-01-11 18:21:33", "duration_minutes": 59.55, "tithi": "Shukla Trayodashi", "nakshatra": "Mrigashira", "lagna": "Gemini"}
+
+    Raises:
+    - 400 for invalid dates or constraint names, no constraint at all, too many days,
+      or a place that cannot be geocoded.
+
+    Security:
+    - Requires a valid API key passed in the `x-api-key` header.
+    """
+    try:
+        query = MuhurtaQuery(payload)
+        await query.locate()
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return StreamingResponse(stream_muhurta(query), media_type="application/x-ndjson")
+
+
+@router.get("/panchang", response_model=PanchangResponse)
+async def daily_panchang(
+    place: str,
+    date: Optional[str] = None,
+    ayanamsa: Optional[Literal["lahiri", "raman", "krishnamurti"]] = None,
+    x_api_key: str = Depends(verify_api_key),
+) -> PanchangResponse:
+    """
+    Endpoint to get the daily panchang for a place.
+
+    Cities in the precomputed grid (`PANCHANG_CITIES`, rebuilt nightly with
+    `python -m src.services.panchang build`) are answered with a direct
+    lookup into the memory-mapped table; any other place, date or ayanamsa
+    is computed on the fly and memoized.
+
+    Query Parameters:
+    - place (str): City or place name.
+    - date (str, optional): Local date "YYYY-MM-DD". Defaults to today at the place.
+    - ayanamsa (str, optional): "lahiri", "raman" or "krishnamurti". Defaults to `PANCHANG_AYANAMSA`.
+
+    Returns:
+    - PanchangResponse: vara, sunrise/sunset, tithi, nakshatra and yoga at sunrise (with
+      their end times), karana, Rahu kalam, Yamaganda, Gulika kalam, Abhijit muhurta,
+      and `source` ("precomputed" or "computed").
+
+    Example Response:
+    ----------------------------------
+    {
+      "place": "Delhi", "date": "2025-01-01", "timezone": "Asia/Kolkata", "ayanamsa": "lahiri",
+      "vara": "Budhavara", "sunrise": "07:14:20", "sunset": "17:36:06", "paksha": "Shukla",
+      "tithi": {"number": 2, "name": "Shukla Dwitiya", "ends": "2025-01-02 02:24:37", "pada": null},
+      "nakshatra": {"number": 21, "name": "Uttara Ashadha", "ends": "2025-01-01 23:46:17", "pada": 2},
+      "yoga": {"number": 13, "name": "Vyaghata", "ends": "2025-01-01 17:06:26", "pada": null},
+      "karana": "Balava",
+      "rahu_kalam": {"start": "12:25:13", "end": "13:42:56"}, "...": "...",
+      "source": "precomputed"
+    }
+
+    Raises:
+    - 400 for an invalid date, a place that cannot be geocoded, or a place where the Sun
+      does not rise or set that day.
+
+    Security:
+    - Requires a valid API key passed in the `x-api-key` header.
+    """
+    try:
+        return await get_panchang(place, date, ayanamsa)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@router.get("/metrics/cache")
+async def cache_metrics(x_api_key: str = Depends(verify_api_key)):
+    """
+    Hit/miss counters for the service caches, keyed by cache name.
+
+    Each entry reports overall hits, misses and hit rate, plus per-tier
+    details (`memory` LRU and shared `disk` SQLite store: size, evictions,
+    errors) to help size the caches.
+    """
+    return cache_stats()
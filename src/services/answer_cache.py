@@ -0,0 +1,147 @@
+# src/services/answer_cache.py
+"""Semantic cache of answers to near-duplicate first-turn questions.
+
+Many users open with essentially the same question ("will I get married
+soon", "career growth this year"). The cache keeps the unit-normalized
+embedding of every answered question in a preallocated float32 matrix per
+religion; a lookup is one matrix-vector product, and the best match at or
+above the similarity threshold returns its stored response.
+
+Entries expire after a TTL; a full partition overwrites an expired slot,
+else the least recently used one. The cache is per process (each uvicorn
+worker warms its own) and shows up in GET /astro/metrics/cache.
+"""
+import time
+from threading import Lock
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from config import (
+    ANSWER_CACHE_MAX_ENTRIES,
+    ANSWER_CACHE_THRESHOLD,
+    ANSWER_CACHE_TTL_SECONDS,
+)
+from src.utils.cache import _hit_rate, register_cache
+
+
+class _Partition:
+    def __init__(self, max_entries: int, dim: int):
+        self.vectors = np.zeros((max_entries, dim), dtype=np.float32)
+        self.expires_at = np.full(max_entries, -np.inf)
+        self.last_used = np.zeros(max_entries)
+        self.responses: List[Optional[Dict[str, Any]]] = [None] * max_entries
+        self.size = 0
+
+    def best(self, vector: np.ndarray, now: float):
+        """(slot, similarity) of the most similar live entry, or (None, -1.0)."""
+        if not self.size:
+            return None, -1.0
+        sims = self.vectors[:self.size] @ vector
+        sims[self.expires_at[:self.size] <= now] = -np.inf
+        slot = int(np.argmax(sims))
+        return (slot, float(sims[slot])) if np.isfinite(sims[slot]) else (None, -1.0)
+
+    def free_slot(self, now: float):
+        """Next empty slot, else an expired one, else the least recently used; and whether a
+        live entry is being evicted."""
+        if self.size < len(self.responses):
+            self.size += 1
+            return self.size - 1, False
+        expired = np.flatnonzero(self.expires_at <= now)
+        if len(expired):
+            return int(expired[0]), False
+        return int(np.argmin(self.last_used)), True
+
+
+class SemanticAnswerCache:
+    """Question embedding -> response, partitioned by (lowercased) religion, matched by cosine
+    similarity."""
+
+    def __init__(
+        self,
+        name: str,
+        threshold: float = ANSWER_CACHE_THRESHOLD,
+        max_entries: int = ANSWER_CACHE_MAX_ENTRIES,
+        ttl: float = ANSWER_CACHE_TTL_SECONDS,
+    ):
+        self.name = name
+        self.threshold = threshold
+        self.max_entries = max(1, max_entries)
+        self.ttl = ttl
+        self._partitions: Dict[str, _Partition] = {}
+        self._lock = Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        register_cache(name, self)
+
+    @staticmethod
+    def _unit(vector) -> Optional[np.ndarray]:
+        v = np.asarray(vector, dtype=np.float32).ravel()
+        norm = float(np.linalg.norm(v))
+        return v / norm if norm > 0 else None
+
+    @staticmethod
+    def _key(religion: Optional[str]) -> str:
+        # AIRequests.religion may be null; the prompts treat that as secular
+        return (religion or "secular").lower()
+
+    def lookup(self, religion: Optional[str], vector) -> Optional[Dict[str, Any]]:
+        """The stored response for the closest previous question at or above the threshold."""
+        v = self._unit(vector)
+        now = time.time()
+        with self._lock:
+            part = self._partitions.get(self._key(religion))
+            if part is not None and v is not None and part.vectors.shape[1] == len(v):
+                slot, similarity = part.best(v, now)
+                if slot is not None and similarity >= self.threshold:
+                    part.last_used[slot] = now
+                    self.hits += 1
+                    return dict(part.responses[slot])
+            self.misses += 1
+            return None
+
+    def store(self, religion: Optional[str], vector, response: Dict[str, Any]) -> None:
+        """Remember `response`; a near-duplicate of an existing entry replaces it in place."""
+        v = self._unit(vector)
+        if v is None:
+            return
+        now = time.time()
+        with self._lock:
+            part = self._partitions.get(self._key(religion))
+            if part is None or part.vectors.shape[1] != len(v):
+                part = self._partitions[self._key(religion)] = _Partition(self.max_entries, len(v))
+            slot, similarity = part.best(v, now)
+            if slot is None or similarity < self.threshold:
+                slot, evicted = part.free_slot(now)
+                self.evictions += evicted
+            part.vectors[slot] = v
+            part.expires_at[slot] = now + self.ttl if self.ttl else np.inf
+            part.last_used[slot] = now
+            part.responses[slot] = dict(response)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._partitions.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        now = time.time()
+        with self._lock:
+            live = {
+                religion: int((part.expires_at[:part.size] > now).sum())
+                for religion, part in self._partitions.items()
+            }
+        return {
+            "size": sum(live.values()),
+            "by_religion": live,
+            "maxsize_per_religion": self.max_entries,
+            "threshold": self.threshold,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": _hit_rate(self.hits, self.misses),
+            "evictions": self.evictions,
+        }
+
+
+answer_cache = SemanticAnswerCache("answers")
@@ -0,0 +1,164 @@
+# src/services/aspects.py
+"""NumPy aspect engine.
+
+All planet pairs and aspect types are tested in one broadcast:
+separations are folded into [0, 180] and compared against an orb matrix
+of shape (N, M, K). Leading dimensions batch over many charts, or over
+many transit timestamps against one natal chart.
+"""
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+
+from config import ASPECT_DEFAULT_ORB
+
+
+# name: (exact angle, default orb)
+ASPECTS = {
+    "Conjunction": (0.0, 8.0),
+    "Sextile": (60.0, 6.0),
+    "Square": (90.0, 7.0),
+    "Trine": (120.0, 8.0),
+    "Opposition": (180.0, 8.0),
+    "Semi-sextile": (30.0, 2.0),
+    "Semi-square": (45.0, 2.0),
+    "Quintile": (72.0, 2.0),
+    "Sesquiquadrate": (135.0, 2.0),
+    "Bi-quintile": (144.0, 2.0),
+    "Quincunx": (150.0, 3.0),
+}
+
+ASPECT_SETS = {
+    "major": ["Conjunction", "Sextile", "Square", "Trine", "Opposition"],
+    "minor": ["Semi-sextile", "Semi-square", "Quintile", "Sesquiquadrate", "Bi-quintile", "Quincunx"],
+}
+ASPECT_SETS["all"] = ASPECT_SETS["major"] + ASPECT_SETS["minor"]
+
+
+@dataclass
+class AspectHits:
+    """Flat arrays, one entry per aspect found.
+
+    `batch` is the flat index into the leading (batch) dimensions, or None
+    when the input was a single chart. `i`/`j` index the first/second
+    planet arrays and `aspect` indexes `names`.
+    """
+    names: List[str]
+    batch: Optional[np.ndarray]
+    i: np.ndarray
+    j: np.ndarray
+    aspect: np.ndarray
+    separation: np.ndarray
+    orb: np.ndarray
+    applying: Optional[np.ndarray]
+
+    def __len__(self) -> int:
+        return len(self.i)
+
+
+class AspectEngine:
+    """Configured aspect set + orbs, reusable across calls.
+
+    - `aspect_set`: "major", "minor" or "all".
+    - `orbs`: per-aspect orb overrides, e.g. {"Trine": 6}.
+    - `default_orb`: if set, used for every major aspect not in `orbs`
+      (instead of the per-aspect defaults in ASPECTS). Minor aspects always
+      keep their own, tighter table orbs, so neighbours such as
+      Sesquiquadrate (135) and Bi-quintile (144) never overlap.
+    - `planet_orbs`: per-planet orbs; a pair is allowed the mean of its two
+      planets' orbs, capped by the aspect orb. Unlisted planets are uncapped.
+    """
+
+    def __init__(
+        self,
+        aspect_set: str = "major",
+        orbs: Optional[Dict[str, float]] = None,
+        planet_orbs: Optional[Dict[str, float]] = None,
+        default_orb: Optional[float] = None,
+    ):
+        if aspect_set not in ASPECT_SETS:
+            raise ValueError(f"Unknown aspect set: {aspect_set}")
+        orbs = orbs or {}
+        unknown = set(orbs) - set(ASPECTS)
+        if unknown:
+            raise ValueError(f"Unknown aspect(s) in orbs: {', '.join(sorted(unknown))}")
+        self.names = list(ASPECT_SETS[aspect_set])
+        self.angles = np.array([ASPECTS[n][0] for n in self.names])
+        self.orbs = np.array([orbs.get(n, self._default_orb(n, default_orb)) for n in self.names])
+        self.planet_orbs = dict(planet_orbs or {})
+
+    @staticmethod
+    def _default_orb(name: str, default_orb: Optional[float]) -> float:
+        if default_orb is not None and name in ASPECT_SETS["major"]:
+            return default_orb
+        return ASPECTS[name][1]
+
+    def _pair_orbs(self, names_a: Optional[Sequence[str]], names_b: Optional[Sequence[str]]) -> Optional[np.ndarray]:
+        if not self.planet_orbs or names_a is None or names_b is None:
+            return None
+        a = np.array([self.planet_orbs.get(n, np.inf) for n in names_a])
+        b = np.array([self.planet_orbs.get(n, np.inf) for n in names_b])
+        return (a[:, None] + b[None, :]) / 2.0
+
+    def match(
+        self,
+        lon_a,
+        lon_b=None,
+        speed_a=None,
+        speed_b=None,
+        names_a: Optional[Sequence[str]] = None,
+        names_b: Optional[Sequence[str]] = None,
+    ) -> AspectHits:
+        """Find aspects between `lon_a` (..., N) and `lon_b` (..., M).
+
+        With `lon_b` omitted the planets of `lon_a` are matched against each
+        other, each unordered pair once (i < j). Applying/separating status is
+        computed when speeds (degrees/day) are given for both sides.
+        """
+        lon_a = np.asarray(lon_a, dtype=float)
+        same_set = lon_b is None
+        if same_set:
+            lon_b, speed_b, names_b = lon_a, speed_a, names_a
+        lon_b = np.asarray(lon_b, dtype=float)
+
+        # signed shortest arc a - b in (-180, 180], separation folded into [0, 180]
+        delta = (lon_a[..., :, None] - lon_b[..., None, :] + 180.0) % 360.0 - 180.0
+        separation = np.abs(delta)
+        deviation = separation[..., None] - self.angles          # (..., N, M, K)
+
+        allowed = self.orbs
+        pair = self._pair_orbs(names_a, names_b)
+        if pair is not None:
+            allowed = np.minimum(allowed, pair[..., None])
+        mask = np.abs(deviation) <= allowed
+        if same_set:
+            n = lon_a.shape[-1]
+            mask &= np.triu(np.ones((n, n), dtype=bool), k=1)[..., None]
+
+        idx = np.nonzero(mask)
+        lead_shape = mask.shape[:-3]
+        batch = np.ravel_multi_index(idx[:-3], lead_shape) if lead_shape else None
+
+        applying = None
+        if speed_a is not None and speed_b is not None:
+            speed_a = np.asarray(speed_a, dtype=float)
+            speed_b = np.asarray(speed_b, dtype=float)
+            # d(separation)/dt; the aspect is applying while |deviation| shrinks
+            rate = np.sign(delta) * (speed_a[..., :, None] - speed_b[..., None, :])
+            rate = np.broadcast_to(rate, delta.shape)
+            applying = (deviation[idx] * rate[idx[:-1]]) < 0
+
+        return AspectHits(
+            names=self.names,
+            batch=batch,
+            i=idx[-3],
+            j=idx[-2],
+            aspect=idx[-1],
+            separation=separation[idx[:-1]],
+            orb=np.abs(deviation[idx]),
+            applying=applying,
+        )
+
+
+DEFAULT_ENGINE = AspectEngine(default_orb=ASPECT_DEFAULT_ORB)
@@ -0,0 +1,44 @@
+# src/services/astro_context.py
+"""Computed chart facts for the /ask prompt, so the LLM does not have to guess them."""
+import logging
+from datetime import datetime, timezone
+from typing import List, Optional
+
+from src.models.kundli_model import BirthDetails
+from src.services.dasha import compute_dashas, describe_current
+from src.services.kundli import PLANET_NAMES
+from src.services.kundli_async import locate_birth_async, run_ephemeris
+from src.services.transits import utc_to_jd
+from src.services.yogas import RULES, detect_for_cores, sidereal_chart
+
+_MOON = PLANET_NAMES.index("Moon")
+
+
+def _chart_facts(jd_ut: float, lat: float, lon: float, ayanamsa: str) -> List[str]:
+    core = sidereal_chart(jd_ut, lat, lon, ayanamsa)
+    now = utc_to_jd(datetime.now(timezone.utc).replace(tzinfo=None))
+    dasha = compute_dashas([jd_ut], [core.planets["longitude"][_MOON]], levels=3, at_jd=now, timeline=False)[0]
+    present = detect_for_cores([core], now, ayanamsa)[0]
+    lines = [describe_current(dasha)]
+    if present:
+        lines.append("Yogas/doshas present: " + "; ".join(f"{RULES[n]['label']} ({RULES[n]['description']})" for n in present))
+    else:
+        lines.append("Yogas/doshas present: none of " + ", ".join(r["label"] for r in RULES.values()))
+    return lines
+
+
+async def build_chart_context(birth: BirthDetails, ayanamsa: str = "lahiri") -> Optional[str]:
+    """Context block from the user's birth details, or None when it cannot be computed."""
+    try:
+        jd_ut, lat, lon, _ = await locate_birth_async(birth.birth_date, birth.birth_time, birth.place)
+        lines = await run_ephemeris(_chart_facts, jd_ut, lat, lon, ayanamsa)
+    except Exception as e:
+        logging.error(f"Chart context failed for {birth.place!r}: {e}")
+        return None
+    return "Computed Chart Facts (authoritative, do not recompute):\n" + "\n".join(lines)
+
+
+def merge_context(context: Optional[str], chart_context: Optional[str]) -> Optional[str]:
+    if not chart_context:
+        return context
+    return f"{context}\n\n{chart_context}" if context else chart_context
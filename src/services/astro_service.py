@@ -1,10 +1,11 @@
-import asyncio
 import logging
 from typing import Optional
 from langchain_openai import ChatOpenAI, OpenAIEmbeddings
 from langchain.schema import HumanMessage
-from src.database.chroma_db import chromadb_retrieve
-from config import OPENAI_API_KEY, OPENAI_MODEL, EMBED_MODEL, TOP_K, TEMPERATURE, MAX_TOKENS
+from src.database.chroma_db import chromadb_retrieve, chromadb_retrieve_many, embed_query, metadata_filter
+from config import OPENAI_API_KEY, OPENAI_MODEL, EMBED_MODEL, TOP_K, TEMPERATURE, MAX_TOKENS, RETRIEVAL_METADATA_FILTER, ANSWER_CACHE_ENABLED
+from src.services.answer_cache import answer_cache
+from src.services.category_service import get_category
 from src.utils.helper import normalize_metadata, pack_retrieved_text, _unwrap_ai_message
 from src.prompts.astro_prompt import get_comprehensive_prompt
 from src.chat_memory.get_chat_history import (
@@ -56,22 +57,10 @@ async def process_question_with_context(
                     else:
                         data["context"] = session_ctx
 
-        # Step 1: Retrieval (question + context) concurrently
-       
-        tasks = [chromadb_retrieve(data["question"], TOP_K)]
-        if data.get("context"):
-            tasks.append(chromadb_retrieve(data["context"], TOP_K))
-        else:
-            tasks.append(asyncio.sleep(0, result=[]))  # dummy for alignment
-
-        retrieved_docs_question, retrieved_docs_context = await asyncio.gather(*tasks)
-        
-        
-
-        # Deduplicate retrieved docs
-        combined_docs_map = {doc['text']: doc for doc in (retrieved_docs_question + retrieved_docs_context)}
-        combined_docs = list(combined_docs_map.values())
-        data["retrieved_docs"] = combined_docs
+        # Step 1: Retrieval (question + context) in one embedding call and one Chroma query,
+        # deduplicated by document id; optionally pre-filtered by keyword category and religion
+        where = metadata_filter(get_category(question), religion) if RETRIEVAL_METADATA_FILTER else None
+        data["retrieved_docs"] = await chromadb_retrieve_many([data["question"], data.get("context")], TOP_K, where)
         data["retrieved_text"] = pack_retrieved_text(data["retrieved_docs"])
         data["context_block"] = f"Additional Context:\n{data['context']}" if data.get("context") else ""
 
@@ -246,9 +235,24 @@ async def process_question(
                     else:
                         data["context"] = session_ctx
 
+        # Step 0: Semantic answer cache, for questions with no context or session history only
+        # (the question's embedding is cached, so retrieval below does not embed it again)
+        cache_vector = None
+        if ANSWER_CACHE_ENABLED and not data["context"]:
+            cache_vector = await embed_query(question)
+            cached = answer_cache.lookup(religion, cache_vector)
+            if cached is not None:
+                if session_id:
+                    try:
+                        append_chat_turn(session_id, question, cached.get("answer") or cached.get("remedy", ""))
+                    except Exception:
+                        pass
+                return {**cached, "question": question}
+
         # Step 1: Retrieval (question only)
         
-        retrieved_docs_question = await chromadb_retrieve(data["question"], TOP_K)
+        where = metadata_filter(get_category(question), religion) if RETRIEVAL_METADATA_FILTER else None
+        retrieved_docs_question = await chromadb_retrieve(data["question"], TOP_K, where)
         
       
 
@@ -319,6 +323,7 @@ async def process_question(
                     clean_text = clean_text[json_start:]
             
             parsed_output = output_parser.parse(clean_text)
+            answer_cacheable = cache_vector is not None
             
             data["category"] = parsed_output.get("category", "General").title()
             data["answer"] = parsed_output.get("answer", "I sense important energies surrounding your question. Please allow me to provide deeper insight in a moment.")
@@ -365,6 +370,7 @@ Generate NOW. No more delays. No more empty fields."""
             
         except Exception as e:
             logging.error(f"JSON parsing failed: {e}. Response: {combined_text[:500]}")
+            answer_cacheable = False
             # Fallback: try to extract from text
             data["category"] = "General"
             data["answer"] = _unwrap_ai_message(combined_text)
@@ -379,13 +385,16 @@ Generate NOW. No more delays. No more empty fields."""
             except Exception:
                 pass
 
-        return {
+        result = {
             "question": question,
             "category": data["category"],
             "answer": data["answer"],
             "remedy": data["remedy"],
             "retrieved_sources": [normalize_metadata(d.get("metadata")) for d in data.get("retrieved_docs", [])],
         }
+        if answer_cacheable:
+            answer_cache.store(religion, cache_vector, result)
+        return result
 
     except Exception as e:
         logging.error(f"Error: {e}")
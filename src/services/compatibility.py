@@ -0,0 +1,257 @@
+# src/services/compatibility.py
+"""Ashtakoota (guna milan) matching, one profile against many candidates.
+
+Each of the eight kootas depends only on the two Moon signs or the two
+Moon nakshatras, so every koota is precomputed as a 12x12 or 27x27 table
+indexed [boy, girl]. Scoring N candidates is then eight fancy-indexing
+lookups over arrays of length N plus one argpartition for the top K.
+
+Simplifications: Vashya uses one group per whole sign (Sagittarius as
+quadruped, Capricorn as water), and Yoni scores 4 for the same animal, 0
+for sworn enemies and 2 otherwise.
+
+Stored candidate sets (float32 sidereal Moon longitudes + ids) live in
+MATCH_CANDIDATES_DIR and are memory-mapped:
+    python -m src.services.compatibility build-set NAME candidates.csv   # columns: id, moon_longitude
+"""
+import argparse
+import csv
+import json
+import os
+from threading import Lock
+from typing import Dict, List, Sequence, Tuple
+
+import numpy as np
+
+from config import MATCH_CANDIDATES_DIR, MATCH_MAX_CANDIDATES
+from src.models.match_model import Match, MatchRequest, MatchResponse
+from src.services.kundli import NAKSHATRAS, SIGNS
+
+_NAKSHATRA_SPAN = 360.0 / 27
+
+# --------------------------
+# Attribute tables
+# --------------------------
+SIGN_LORDS = ["Mars", "Venus", "Mercury", "Moon", "Sun", "Mercury", "Venus", "Mars", "Jupiter", "Saturn", "Saturn", "Jupiter"]
+
+# natural relationships: planet -> (friends, enemies); everyone else is neutral
+_RELATIONS = {
+    "Sun": ({"Moon", "Mars", "Jupiter"}, {"Venus", "Saturn"}),
+    "Moon": ({"Sun", "Mercury"}, set()),
+    "Mars": ({"Sun", "Moon", "Jupiter"}, {"Mercury"}),
+    "Mercury": ({"Sun", "Venus"}, {"Moon"}),
+    "Jupiter": ({"Sun", "Moon", "Mars"}, {"Mercury", "Venus"}),
+    "Venus": ({"Mercury", "Saturn"}, {"Sun", "Moon"}),
+    "Saturn": ({"Mercury", "Venus"}, {"Sun", "Moon", "Mars"}),
+}
+
+# Varna by element: water = Brahmin (3), fire = Kshatriya (2), earth = Vaishya (1), air = Shudra (0)
+_VARNA = [(2, 1, 0, 3)[s % 4] for s in range(12)]
+
+# Vashya groups: 0 quadruped, 1 human, 2 water, 3 wild, 4 insect
+_VASHYA = [0, 0, 1, 2, 3, 1, 1, 4, 0, 2, 1, 2]
+_VASHYA_SCORES = np.array([
+    [2, 1, 1, 0.5, 1],
+    [1, 2, 0.5, 0, 1],
+    [1, 0.5, 2, 1, 1],
+    [0.5, 0, 1, 2, 0],
+    [1, 1, 1, 0, 2],
+])
+
+_YONI = [
+    "Horse", "Elephant", "Sheep", "Serpent", "Serpent", "Dog", "Cat", "Sheep", "Cat",
+    "Rat", "Rat", "Cow", "Buffalo", "Tiger", "Buffalo", "Tiger", "Deer", "Deer",
+    "Dog", "Monkey", "Mongoose", "Monkey", "Lion", "Horse", "Lion", "Cow", "Elephant",
+]
+_YONI_ENEMIES = [
+    {"Horse", "Buffalo"}, {"Elephant", "Lion"}, {"Sheep", "Monkey"}, {"Serpent", "Mongoose"},
+    {"Dog", "Deer"}, {"Cat", "Rat"}, {"Cow", "Tiger"},
+]
+
+# Gana: 0 Deva, 1 Manushya, 2 Rakshasa
+_GANA = [0, 1, 2, 1, 0, 1, 0, 0, 2, 2, 1, 1, 0, 2, 0, 2, 0, 2, 2, 1, 1, 0, 2, 2, 1, 1, 0]
+_GANA_SCORES = np.array([
+    [6, 6, 1],
+    [5, 6, 0],
+    [1, 0, 6],
+])
+
+# Nadi: Adi, Madhya, Antya in a zigzag over the nakshatras
+_NADI = [(0, 1, 2, 2, 1, 0)[n % 6] for n in range(27)]
+
+
+def _graha_maitri(boy_lord: str, girl_lord: str) -> float:
+    if boy_lord == girl_lord:
+        return 5
+
+    def relation(a: str, b: str) -> int:
+        friends, enemies = _RELATIONS[a]
+        return 1 if b in friends else -1 if b in enemies else 0
+
+    pair = sorted((relation(boy_lord, girl_lord), relation(girl_lord, boy_lord)), reverse=True)
+    return {(1, 1): 5, (1, 0): 4, (0, 0): 3, (1, -1): 1, (0, -1): 0.5, (-1, -1): 0}[tuple(pair)]
+
+
+def _tara_ok(count_from: int, count_to: int) -> bool:
+    # the 3rd, 5th and 7th taras (counting from the other's nakshatra, cyclically by 9) are inauspicious
+    return (((count_to - count_from) % 27) + 1) % 9 not in (3, 5, 7)
+
+
+def _build_tables() -> Tuple[Dict[str, np.ndarray], Dict[str, np.ndarray]]:
+    b, g = np.meshgrid(np.arange(12), np.arange(12), indexing="ij")
+    sign = {
+        "varna": np.array([[1.0 if _VARNA[i] >= _VARNA[j] else 0.0 for j in range(12)] for i in range(12)]),
+        "vashya": _VASHYA_SCORES[np.array(_VASHYA)[b], np.array(_VASHYA)[g]],
+        "graha_maitri": np.array([[_graha_maitri(SIGN_LORDS[i], SIGN_LORDS[j]) for j in range(12)] for i in range(12)]),
+        # 2/12, 5/9 and 6/8 sign relationships break Bhakoot
+        "bhakoot": np.where(np.isin(((g - b) % 12) + 1, [2, 12, 5, 9, 6, 8]), 0.0, 7.0),
+    }
+    bn, gn = np.meshgrid(np.arange(27), np.arange(27), indexing="ij")
+    nakshatra = {
+        "tara": np.array([[1.5 * _tara_ok(j, i) + 1.5 * _tara_ok(i, j) for j in range(27)] for i in range(27)]),
+        "yoni": np.array([
+            [4.0 if _YONI[i] == _YONI[j] else 0.0 if {_YONI[i], _YONI[j]} in _YONI_ENEMIES else 2.0 for j in range(27)]
+            for i in range(27)
+        ]),
+        "gana": _GANA_SCORES[np.array(_GANA)[bn], np.array(_GANA)[gn]].astype(float),
+        "nadi": np.where(np.array(_NADI)[bn] == np.array(_NADI)[gn], 0.0, 8.0),
+    }
+    return {k: v.astype(np.float32) for k, v in sign.items()}, {k: v.astype(np.float32) for k, v in nakshatra.items()}
+
+
+SIGN_KOOTAS, NAKSHATRA_KOOTAS = _build_tables()
+KOOTAS = ["varna", "vashya", "tara", "yoni", "graha_maitri", "gana", "bhakoot", "nadi"]
+MAX_POINTS = {"varna": 1, "vashya": 2, "tara": 3, "yoni": 4, "graha_maitri": 5, "gana": 6, "bhakoot": 7, "nadi": 8}
+
+
+# --------------------------
+# Scoring
+# --------------------------
+def moon_indices(moon_longitudes) -> Tuple[np.ndarray, np.ndarray]:
+    lons = np.asarray(moon_longitudes, dtype=float) % 360
+    return (lons // 30).astype(np.intp), (lons // _NAKSHATRA_SPAN).astype(np.intp)
+
+
+def score_kootas(boy_moons, girl_moons) -> Dict[str, np.ndarray]:
+    """Points per koota for sidereal Moon longitudes; arrays broadcast against each other."""
+    boy_sign, boy_nak = moon_indices(boy_moons)
+    girl_sign, girl_nak = moon_indices(girl_moons)
+    out = {}
+    for name in KOOTAS:
+        if name in SIGN_KOOTAS:
+            out[name] = SIGN_KOOTAS[name][boy_sign, girl_sign]
+        else:
+            out[name] = NAKSHATRA_KOOTAS[name][boy_nak, girl_nak]
+    return out
+
+
+def top_matches(profile_moon: float, candidate_moons, role: str = "boy", top_k: int = 10, min_score: float = 0):
+    """Indices, totals and breakdowns of the best `top_k` candidates, best first."""
+    candidates = np.asarray(candidate_moons, dtype=np.float32)
+    if role == "boy":
+        kootas = score_kootas(profile_moon, candidates)
+    else:
+        kootas = score_kootas(candidates, profile_moon)
+    total = sum(kootas.values())
+    eligible = np.nonzero(total >= min_score)[0]
+    k = min(top_k, len(eligible))
+    if k == 0:
+        return eligible[:0], total[:0], {name: v[:0] for name, v in kootas.items()}
+    best = eligible[np.argpartition(-total[eligible], k - 1)[:k]]
+    best = best[np.argsort(-total[best], kind="stable")]
+    return best, total[best], {name: v[best] for name, v in kootas.items()}
+
+
+# --------------------------
+# Stored candidate sets
+# --------------------------
+_SETS: Dict[str, Tuple[np.ndarray, List[str]]] = {}
+_SETS_LOCK = Lock()
+
+
+def _set_paths(name: str) -> Tuple[str, str]:
+    if not name.replace("-", "").replace("_", "").isalnum():
+        raise ValueError(f"Invalid candidate set name: {name!r}")
+    base = os.path.join(MATCH_CANDIDATES_DIR, name)
+    return base + ".npy", base + ".json"
+
+
+def save_candidate_set(name: str, ids: Sequence[str], moon_longitudes: Sequence[float]) -> None:
+    if len(ids) != len(moon_longitudes):
+        raise ValueError("ids and moon_longitudes must have the same length")
+    npy_path, ids_path = _set_paths(name)
+    os.makedirs(MATCH_CANDIDATES_DIR, exist_ok=True)
+    np.save(npy_path + ".tmp.npy", np.asarray(moon_longitudes, dtype=np.float32) % 360)
+    with open(ids_path + ".tmp", "w", encoding="utf-8") as f:
+        json.dump([str(i) for i in ids], f)
+    os.replace(npy_path + ".tmp.npy", npy_path)
+    os.replace(ids_path + ".tmp", ids_path)
+    with _SETS_LOCK:
+        _SETS.pop(name, None)
+
+
+def load_candidate_set(name: str) -> Tuple[np.ndarray, List[str]]:
+    npy_path, ids_path = _set_paths(name)
+    with _SETS_LOCK:
+        if name not in _SETS:
+            if not os.path.exists(npy_path):
+                raise ValueError(f"Unknown candidate set: {name}")
+            with open(ids_path, encoding="utf-8") as f:
+                ids = json.load(f)
+            _SETS[name] = (np.load(npy_path, mmap_mode="r"), ids)
+        return _SETS[name]
+
+
+# --------------------------
+# Request handling
+# --------------------------
+def match_candidates(req: MatchRequest, profile_moon: float) -> MatchResponse:
+    """Score every candidate of a MatchRequest against the profile's sidereal Moon."""
+    if req.candidate_set:
+        moons, ids = load_candidate_set(req.candidate_set)
+    elif req.candidates is not None:
+        moons = np.asarray(req.candidates, dtype=np.float32)
+        ids = req.candidate_ids
+        if ids is not None and len(ids) != len(moons):
+            raise ValueError("candidate_ids must have the same length as candidates")
+    else:
+        raise ValueError("Provide either candidates or candidate_set")
+    if len(moons) > MATCH_MAX_CANDIDATES:
+        raise ValueError(f"Too many candidates: {len(moons)} (max {MATCH_MAX_CANDIDATES})")
+
+    best, totals, kootas = top_matches(profile_moon, moons, req.role, req.top_k, req.min_score)
+    signs, naks = moon_indices(np.asarray(moons)[best])
+    profile_sign, profile_nak = moon_indices(profile_moon)
+    matches = [
+        Match(
+            id=ids[i] if ids is not None else str(i),
+            moon_nakshatra=NAKSHATRAS[naks[n]],
+            moon_sign=SIGNS[signs[n]],
+            score=float(totals[n]),
+            breakdown={name: float(kootas[name][n]) for name in KOOTAS},
+        )
+        for n, i in enumerate(best.tolist())
+    ]
+    return MatchResponse(
+        profile_nakshatra=NAKSHATRAS[int(profile_nak)],
+        profile_sign=SIGNS[int(profile_sign)],
+        candidates_scored=len(moons),
+        matches=matches,
+    )
+
+
+def _main() -> None:
+    parser = argparse.ArgumentParser(description="Manage stored candidate sets for matching.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    build = sub.add_parser("build-set", help="Store a CSV with columns id, moon_longitude (sidereal)")
+    build.add_argument("name")
+    build.add_argument("csv_path")
+    args = parser.parse_args()
+    with open(args.csv_path, newline="", encoding="utf-8") as f:
+        rows = list(csv.DictReader(f))
+    save_candidate_set(args.name, [r["id"] for r in rows], [float(r["moon_longitude"]) for r in rows])
+    print(f"Stored {len(rows)} candidates as {args.name!r} in {MATCH_CANDIDATES_DIR}")
+
+
+if __name__ == "__main__":
+    _main()
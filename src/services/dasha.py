@@ -0,0 +1,217 @@
+# src/services/dasha.py
+"""Vimshottari dasha engine.
+
+Every level of the Vimshottari system splits its parent the same way: the
+nine lords in fixed order, starting from the parent's lord, each taking
+years/120 of the parent. So a single (9, 10) offset table, precomputed
+below, drives mahadasha, antardasha and pratyantardasha alike. All
+functions take arrays and work on many charts at once.
+
+The starting lord and the balance of the first mahadasha come from the
+Moon's (sidereal) nakshatra and how far it has run through it.
+"""
+import asyncio
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from config import KUNDLI_BATCH_MAX_ITEMS
+from src.models.dasha_model import DashaPeriod, DashaRequest, DashaResult
+from src.models.kundli_model import BirthDetails
+from src.services.kundli import PLANET_NAMES, get_chart_core, get_nakshatra
+from src.services.kundli_async import locate_birth_async, run_ephemeris
+from src.services.transits import parse_utc, utc_to_jd
+from src.services.varga import get_ayanamsa
+
+DASHA_LORDS = ("Ketu", "Venus", "Sun", "Moon", "Mars", "Rahu", "Jupiter", "Saturn", "Mercury")
+DASHA_YEARS = np.array([7, 20, 6, 10, 7, 18, 16, 19, 17], dtype=float)
+CYCLE_YEARS = DASHA_YEARS.sum()   # 120
+YEAR_DAYS = 365.25
+LEVELS = ("maha", "antar", "pratyantar")
+
+# SUB_LORDS[L, k]: k-th sub-period lord inside a period ruled by L
+SUB_LORDS = (np.arange(9)[:, None] + np.arange(9)[None, :]) % 9
+# SUB_FRACTIONS[L, k]: share of the parent taken by that sub-period;
+# SUB_OFFSETS[L, k]: where it starts, as a fraction of the parent (k = 0..9)
+SUB_FRACTIONS = DASHA_YEARS[SUB_LORDS] / CYCLE_YEARS
+SUB_OFFSETS = np.concatenate([np.zeros((9, 1)), np.cumsum(SUB_FRACTIONS, axis=1)], axis=1)
+
+_NAKSHATRA_SPAN = 360.0 / 27
+_MOON = PLANET_NAMES.index("Moon")
+
+
+def dasha_start(moon_longitudes, birth_jds) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """First mahadasha lord, start of its (virtual) full cycle, and balance in years at birth.
+
+    `moon_longitudes` are sidereal. The cycle starts before birth by the part
+    of the first mahadasha already elapsed.
+    """
+    lons = np.asarray(moon_longitudes, dtype=float) % 360
+    nakshatra = (lons // _NAKSHATRA_SPAN).astype(np.intp)
+    elapsed = (lons % _NAKSHATRA_SPAN) / _NAKSHATRA_SPAN
+    lord = nakshatra % 9
+    first_years = DASHA_YEARS[lord]
+    cycle_start = np.asarray(birth_jds, dtype=float) - elapsed * first_years * YEAR_DAYS
+    return lord, cycle_start, (1 - elapsed) * first_years
+
+
+def subdivide(lords: np.ndarray, starts: np.ndarray, lengths: np.ndarray):
+    """Split periods (..., P) into their nine sub-periods (..., P * 9)."""
+    sub_lords = SUB_LORDS[lords]
+    sub_starts = starts[..., None] + lengths[..., None] * SUB_OFFSETS[lords][..., :9]
+    sub_lengths = lengths[..., None] * SUB_FRACTIONS[lords]
+    shape = lords.shape[:-1] + (-1,)
+    return sub_lords.reshape(shape), sub_starts.reshape(shape), sub_lengths.reshape(shape)
+
+
+def dasha_timeline(first_lords, cycle_starts, levels: int = 2) -> List[Tuple[np.ndarray, np.ndarray, np.ndarray]]:
+    """(lords, starts, lengths) per level for N charts: shapes (N, 9), (N, 81), (N, 729)."""
+    lords = np.asarray(first_lords, dtype=np.intp)[:, None]
+    starts = np.asarray(cycle_starts, dtype=float)[:, None]
+    lengths = np.full(starts.shape, CYCLE_YEARS * YEAR_DAYS)
+    out = []
+    for _ in range(levels):
+        lords, starts, lengths = subdivide(lords, starts, lengths)
+        out.append((lords, starts, lengths))
+    return out
+
+
+def dasha_at(first_lords, cycle_starts, at_jds, levels: int = 3) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Running lords, starts and ends (each (N, levels)) at `at_jds` for N charts.
+
+    Only the running branch is subdivided, so this is 9 * levels lookups
+    per chart however deep the levels go. Dates outside the 120-year cycle
+    are clamped to its first/last period.
+    """
+    lords = np.asarray(first_lords, dtype=np.intp)
+    starts = np.asarray(cycle_starts, dtype=float)
+    lengths = np.full(starts.shape, CYCLE_YEARS * YEAR_DAYS)
+    at = np.broadcast_to(np.asarray(at_jds, dtype=float), starts.shape)
+    rows = np.arange(len(lords))
+    out_lords, out_starts, out_ends = [], [], []
+    for _ in range(levels):
+        sub_lords, sub_starts, sub_lengths = subdivide(lords[:, None], starts[:, None], lengths[:, None])
+        k = np.clip((at[:, None] >= sub_starts).sum(axis=1) - 1, 0, 8)
+        lords, starts, lengths = sub_lords[rows, k], sub_starts[rows, k], sub_lengths[rows, k]
+        out_lords.append(lords)
+        out_starts.append(starts)
+        out_ends.append(starts + lengths)
+    return np.stack(out_lords, 1), np.stack(out_starts, 1), np.stack(out_ends, 1)
+
+
+# --------------------------
+# Output helpers
+# --------------------------
+_UNIX_EPOCH_JD = 2440587.5
+
+
+def _dates(jds) -> np.ndarray:
+    """UTC dates ("YYYY-MM-DD") for an array of Julian days, in one vectorized conversion."""
+    seconds = np.round((np.asarray(jds, dtype=float) - _UNIX_EPOCH_JD) * 86400).astype("int64")
+    return np.datetime_as_string(seconds.astype("datetime64[s]"), unit="D")
+
+
+def _periods(levels, row: int, depth: int, first: int, count: int) -> List[DashaPeriod]:
+    """Nested DashaPeriods from per-level (lords, start dates, end dates, ends) arrays."""
+    lords, starts, ends, end_jds, birth_jd = levels[depth]
+    out = []
+    for p in range(first, first + count):
+        if end_jds[row, p] <= birth_jd[row]:
+            continue
+        out.append(DashaPeriod(
+            lord=DASHA_LORDS[lords[row, p]],
+            level=LEVELS[depth],
+            start=starts[row, p],
+            end=ends[row, p],
+            periods=_periods(levels, row, depth + 1, p * 9, 9) if depth + 1 < len(levels) else None,
+        ))
+    return out
+
+
+def sidereal_moon(jd_ut: float, lat: float, lon: float, ayanamsa: str = "lahiri") -> float:
+    core = get_chart_core(jd_ut, lat, lon)
+    return (core.planets["longitude"][_MOON] - get_ayanamsa(core.julian_day, ayanamsa)) % 360
+
+
+def compute_dashas(
+    birth_jds: Sequence[float],
+    moon_longitudes: Sequence[float],
+    levels: int = 2,
+    at_jd: Optional[float] = None,
+    timeline: bool = True,
+) -> List[Dict]:
+    """Dasha results for many charts in one vectorized pass.
+
+    Internal API for the `/ask` context and the `/dasha` endpoint: returns
+    dicts matching DashaResult (without `index`).
+    """
+    birth_jds = np.asarray(birth_jds, dtype=float)
+    if at_jd is None:
+        at_jd = utc_to_jd(datetime.now(timezone.utc).replace(tzinfo=None))
+    first_lords, cycle_starts, balances = dasha_start(moon_longitudes, birth_jds)
+    cur_lords, cur_starts, cur_ends = dasha_at(first_lords, cycle_starts, at_jd, levels)
+    level_arrays = []
+    if timeline:
+        for lords, starts, lengths in dasha_timeline(first_lords, cycle_starts, levels):
+            ends = starts + lengths
+            # periods already running at birth are shown from birth
+            shown = np.maximum(starts, birth_jds[:, None])
+            level_arrays.append((lords, _dates(shown), _dates(ends), ends, birth_jds))
+    cur_start_dates, cur_end_dates = _dates(np.maximum(cur_starts, birth_jds[:, None])), _dates(cur_ends)
+
+    results = []
+    for n, moon in enumerate(np.asarray(moon_longitudes, dtype=float).tolist()):
+        nakshatra, pada = get_nakshatra(moon)
+        results.append({
+            "moon_nakshatra": nakshatra,
+            "moon_pada": pada,
+            "balance_years": round(float(balances[n]), 4),
+            "current": [
+                DashaPeriod(
+                    lord=DASHA_LORDS[cur_lords[n, d]],
+                    level=LEVELS[d],
+                    start=cur_start_dates[n, d],
+                    end=cur_end_dates[n, d],
+                )
+                for d in range(levels)
+            ],
+            "timeline": _periods(level_arrays, n, 0, 0, 9) if timeline else None,
+        })
+    return results
+
+
+def describe_current(result: Dict) -> str:
+    """One-line summary of the running periods, for prompts."""
+    parts = [f"{p.lord} {p.level}dasha ({p.start} to {p.end})" for p in result["current"]]
+    return "Vimshottari dasha: " + " > ".join(parts) + f"; Moon in {result['moon_nakshatra']} pada {result['moon_pada']}"
+
+
+async def sidereal_moon_for_birth(birth: BirthDetails, ayanamsa: str = "lahiri") -> Tuple[float, float]:
+    """(jd_ut, sidereal Moon longitude) for a birth, via the cached chart."""
+    jd_ut, lat, lon, _ = await locate_birth_async(birth.birth_date, birth.birth_time, birth.place)
+    return jd_ut, await run_ephemeris(sidereal_moon, jd_ut, lat, lon, ayanamsa)
+
+
+async def compute_dashas_async(req: DashaRequest) -> List[DashaResult]:
+    """Resolve every birth concurrently, then run the dasha math once for the whole batch."""
+    if len(req.items) > KUNDLI_BATCH_MAX_ITEMS:
+        raise ValueError(f"Too many items: {len(req.items)} (max {KUNDLI_BATCH_MAX_ITEMS})")
+    at_jd = utc_to_jd(parse_utc(req.at)) if req.at else None
+
+    resolved = await asyncio.gather(
+        *(sidereal_moon_for_birth(b, req.ayanamsa) for b in req.items), return_exceptions=True
+    )
+    ok = [i for i, r in enumerate(resolved) if not isinstance(r, BaseException)]
+    results = [DashaResult(index=i, error=str(r)) for i, r in enumerate(resolved) if isinstance(r, BaseException)]
+    if ok:
+        computed = await run_ephemeris(
+            compute_dashas,
+            [resolved[i][0] for i in ok],
+            [resolved[i][1] for i in ok],
+            req.levels,
+            at_jd,
+            req.timeline,
+        )
+        results += [DashaResult(index=i, **c) for i, c in zip(ok, computed)]
+    return sorted(results, key=lambda r: r.index)
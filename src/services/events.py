@@ -0,0 +1,368 @@
+# src/services/events.py
+"""Event search by bracketing + root refinement.
+
+A *signal* is a function of time with a value in degrees (a longitude, or
+the difference of two longitudes) and its rate in degrees/day. Events are
+the times where the signal crosses a level (sign, nakshatra and pada
+boundaries, aspect angles) or where its rate crosses zero (stations).
+
+1. Sample the signal on a coarse grid, fine enough that it never moves
+   more than 180 degrees or turns around twice between samples.
+2. Find rate sign changes and refine them: those are the stations, and
+   they split the grid into pieces where the signal is monotonic.
+3. In each monotonic piece every level crossed has exactly one root,
+   refined with the Illinois (regula falsi) method to about half a second.
+
+A year of events for one body costs a few thousand ephemeris calls instead
+of one per minute. Results are cached per (year, signal, kind) in a
+TieredCache, so repeated queries only pay for the years not seen before.
+"""
+import math
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+import swisseph as swe
+
+from config import EVENTS_CACHE_MAX_ENTRIES, EVENTS_CACHE_PATH, EVENTS_CACHE_SIZE, EVENTS_MAX_YEARS
+from src.models.event_model import AstroEvent, EventSearchRequest
+from src.services.aspects import ASPECT_SETS, ASPECTS
+from src.services.kundli import NAKSHATRAS, PLANETS, SIGNS, planet_positions
+from src.services.transits import jd_to_utc, parse_utc, utc_to_jd
+from src.utils.cache import LRUCache, SQLiteCache, TieredCache
+
+Signal = Callable[[float], Tuple[float, float]]
+
+TOLERANCE_DAYS = 0.5 / 86400
+
+# Coarse sampling step (days) per body: small enough that no body stations
+# twice, and the true node does not wobble back and forth, within one step.
+COARSE_STEPS = {
+    "Moon": 0.5,
+    "TrueNode": 0.5,
+    "Sun": 1.0,
+    "Mercury": 1.0,
+    "Venus": 1.0,
+    "Mars": 1.0,
+    "Jupiter": 2.0,
+    "Saturn": 2.0,
+    "Uranus": 4.0,
+    "Neptune": 4.0,
+    "Pluto": 4.0,
+}
+
+# kind: (level spacing in degrees, names of the divisions)
+BOUNDARIES = {
+    "ingress": (30.0, SIGNS),
+    "nakshatra": (360.0 / 27, NAKSHATRAS),
+    "pada": (360.0 / 108, [f"{n} pada {p}" for n in NAKSHATRAS for p in range(1, 5)]),
+}
+
+event_cache = TieredCache(
+    "events",
+    LRUCache(EVENTS_CACHE_SIZE),
+    SQLiteCache(EVENTS_CACHE_PATH, max_entries=EVENTS_CACHE_MAX_ENTRIES) if EVENTS_CACHE_PATH else None,
+)
+_CACHE_VERSION = "v1"
+
+
+def _wrap180(x):
+    return (x + 180.0) % 360.0 - 180.0
+
+
+# --------------------------
+# Generic root finding
+# --------------------------
+def refine_root(f: Callable[[float], float], a: float, fa: float, b: float, fb: float, tol: float = TOLERANCE_DAYS) -> float:
+    """Root of `f` in [a, b] given values of opposite sign at the ends (Illinois method)."""
+    if fa == 0:
+        return a
+    if fb == 0:
+        return b
+    side = 0
+    for _ in range(100):
+        if b - a <= tol:
+            break
+        c = (a * fb - b * fa) / (fb - fa)
+        if not a < c < b:
+            c = (a + b) / 2
+        fc = f(c)
+        if fc == 0:
+            return c
+        if (fc > 0) == (fb > 0):
+            b, fb = c, fc
+            if side == -1:
+                fa /= 2
+            side = -1
+        else:
+            a, fa = c, fc
+            if side == 1:
+                fb /= 2
+            side = 1
+    return (a + b) / 2
+
+
+def unwrap(values: np.ndarray) -> np.ndarray:
+    """Continuous version of a series of angles (degrees) sampled finely enough."""
+    out = np.empty_like(values)
+    out[0] = values[0]
+    out[1:] = values[0] + np.cumsum(_wrap180(np.diff(values)))
+    return out
+
+
+def find_stations(signal: Signal, jds: np.ndarray, rates: np.ndarray) -> List[float]:
+    """Times where the rate changes sign between consecutive samples."""
+    flips = np.nonzero(np.sign(rates[:-1]) * np.sign(rates[1:]) < 0)[0]
+    return [
+        refine_root(lambda t: signal(t)[1], jds[i], rates[i], jds[i + 1], rates[i + 1])
+        for i in flips.tolist()
+    ]
+
+
+def find_crossings(
+    signal: Signal,
+    jds: np.ndarray,
+    values: np.ndarray,
+    stations: Sequence[float],
+    offset: float,
+    spacing: float,
+) -> List[Tuple[float, int, int]]:
+    """Crossings of the levels `offset + k * spacing` by a sampled signal.
+
+    `values` must be unwrapped (see `unwrap`) and `stations` the turning
+    points from `find_stations`. Returns (jd, k, direction) per crossing,
+    with direction +1 when the signal increases through the level.
+    """
+    nodes_t = list(jds)
+    nodes_v = list(values)
+    for t in sorted(stations, reverse=True):
+        i = int(np.searchsorted(jds, t))
+        v = values[i - 1] + _wrap180(signal(t)[0] - values[i - 1])
+        nodes_t.insert(i, t)
+        nodes_v.insert(i, v)
+
+    out = []
+    for (a, va), (b, vb) in zip(zip(nodes_t, nodes_v), zip(nodes_t[1:], nodes_v[1:])):
+        lo, hi = min(va, vb), max(va, vb)
+        first = math.floor((lo - offset) / spacing) + 1
+        last = math.floor((hi - offset) / spacing)
+        direction = 1 if vb > va else -1
+        for k in range(first, last + 1):
+            level = offset + k * spacing
+            jd = refine_root(lambda t: _wrap180(signal(t)[0] - level), a, va - level, b, vb - level)
+            out.append((jd, k, direction))
+    return out
+
+
+# --------------------------
+# Signals
+# --------------------------
+def body_signal(name: str) -> Signal:
+    pid = PLANETS[name]
+
+    def signal(jd: float) -> Tuple[float, float]:
+        xx, ret = swe.calc_ut(jd, pid)
+        return xx[0], xx[3]
+    return signal
+
+
+def pair_signal(name_a: str, name_b: str) -> Signal:
+    a, b = body_signal(name_a), body_signal(name_b)
+
+    def signal(jd: float) -> Tuple[float, float]:
+        (lon_a, speed_a), (lon_b, speed_b) = a(jd), b(jd)
+        return (lon_a - lon_b) % 360.0, speed_a - speed_b
+    return signal
+
+
+def natal_signal(name: str, longitude: float) -> Signal:
+    a = body_signal(name)
+
+    def signal(jd: float) -> Tuple[float, float]:
+        lon, speed = a(jd)
+        return (lon - longitude) % 360.0, speed
+    return signal
+
+
+# --------------------------
+# Per-year search
+# --------------------------
+def year_bounds(year: int) -> Tuple[float, float]:
+    return swe.julday(year, 1, 1, 0.0), swe.julday(year + 1, 1, 1, 0.0)
+
+
+class _YearSamples:
+    """Coarse samples of every body for one year, shared by all signals."""
+
+    def __init__(self, year: int):
+        self.start, self.end = year_bounds(year)
+        self._samples: Dict[Tuple[str, float], Tuple[np.ndarray, np.ndarray, np.ndarray]] = {}
+
+    def grid(self, step: float) -> np.ndarray:
+        return np.arange(self.start, self.end + step, step)
+
+    def body(self, name: str, step: float):
+        key = (name, step)
+        if key not in self._samples:
+            jds = self.grid(step)
+            lons, speeds = planet_positions(jds, [name])
+            self._samples[key] = (jds, lons[:, 0], speeds[:, 0])
+        return self._samples[key]
+
+
+def _event(jd: float, body: str, event: str, longitude: float, **extra) -> dict:
+    return {
+        "time": jd_to_utc(jd).isoformat(),
+        "julian_day": jd,
+        "body": body,
+        "event": event,
+        "longitude": longitude % 360.0,
+        **extra,
+    }
+
+
+def _body_events(samples: _YearSamples, body: str, kinds: Iterable[str]) -> Dict[str, List[dict]]:
+    signal = body_signal(body)
+    jds, lons, speeds = samples.body(body, COARSE_STEPS.get(body, 1.0))
+    values = unwrap(lons)
+    stations = find_stations(signal, jds, speeds)
+    out = {}
+    for kind in kinds:
+        events = []
+        if kind == "station":
+            for jd in stations:
+                retrograde = signal(jd + TOLERANCE_DAYS)[1] < 0
+                events.append(_event(
+                    jd, body, "station", signal(jd)[0],
+                    previous="direct" if retrograde else "retrograde",
+                    current="retrograde" if retrograde else "direct",
+                ))
+        else:
+            spacing, labels = BOUNDARIES[kind]
+            for jd, k, direction in find_crossings(signal, jds, values, stations, 0.0, spacing):
+                entered = k if direction > 0 else k - 1
+                left = k - 1 if direction > 0 else k
+                events.append(_event(
+                    jd, body, kind, k * spacing,
+                    previous=labels[left % len(labels)], current=labels[entered % len(labels)],
+                ))
+        out[kind] = [e for e in events if samples.start <= e["julian_day"] < samples.end]
+    return out
+
+
+def _aspect_events(
+    samples: _YearSamples,
+    body: str,
+    target: str,
+    signal: Signal,
+    values: np.ndarray,
+    rates: np.ndarray,
+    jds: np.ndarray,
+    aspect_names: Iterable[str],
+) -> Dict[str, List[dict]]:
+    stations = find_stations(signal, jds, rates)
+    body_lon = body_signal(body)
+    values = unwrap(values)
+    out = {}
+    for name in aspect_names:
+        angle = ASPECTS[name][0]
+        events = []
+        for offset in sorted({angle % 360.0, -angle % 360.0}):
+            for jd, k, direction in find_crossings(signal, jds, values, stations, offset, 360.0):
+                if samples.start <= jd < samples.end:
+                    events.append(_event(jd, body, "aspect", body_lon(jd)[0], target=target, aspect=name))
+        out[f"aspect:{name}"] = sorted(events, key=lambda e: e["julian_day"])
+    return out
+
+
+def _cached(key_prefix: str, kinds: List[str], compute: Callable[[List[str]], Dict[str, List[dict]]]) -> List[dict]:
+    keys = {kind: f"{_CACHE_VERSION}:{key_prefix}:{kind}" for kind in kinds}
+    found = event_cache.get_many(keys.values())
+    missing = [kind for kind in kinds if keys[kind] not in found]
+    if missing:
+        computed = compute(missing)
+        event_cache.set_many({keys[kind]: computed[kind] for kind in missing})
+        found.update({keys[kind]: computed[kind] for kind in missing})
+    return [e for kind in kinds for e in found[keys[kind]]]
+
+
+def events_for_year(
+    year: int,
+    bodies: Sequence[str],
+    kinds: Sequence[str],
+    aspect_names: Sequence[str] = (),
+    natal: Optional[Dict[str, float]] = None,
+) -> List[dict]:
+    """Every requested event in one calendar year (UTC), served from the cache when possible."""
+    samples = _YearSamples(year)
+    out: List[dict] = []
+
+    body_kinds = [k for k in kinds if k != "aspect"]
+    for body in bodies if body_kinds else ():
+        out += _cached(f"{year}:{body}", body_kinds, lambda missing, body=body: _body_events(samples, body, missing))
+
+    if "aspect" not in kinds or not aspect_names:
+        return out
+    aspect_kinds = [f"aspect:{name}" for name in aspect_names]
+
+    if natal:
+        for body in bodies:
+            for target, longitude in natal.items():
+                def compute(missing, body=body, target=target, longitude=longitude):
+                    jds, lons, speeds = samples.body(body, COARSE_STEPS.get(body, 1.0))
+                    return _aspect_events(
+                        samples, body, target, natal_signal(body, longitude), (lons - longitude) % 360.0, speeds, jds,
+                        [kind.split(":", 1)[1] for kind in missing],
+                    )
+                out += _cached(f"{year}:{body}|natal:{target}@{longitude:.6f}", aspect_kinds, compute)
+        return out
+
+    for n, body in enumerate(bodies):
+        for other in bodies[n + 1:]:
+            def compute(missing, body=body, other=other):
+                step = min(COARSE_STEPS.get(body, 1.0), COARSE_STEPS.get(other, 1.0))
+                jds, lons_a, speeds_a = samples.body(body, step)
+                _, lons_b, speeds_b = samples.body(other, step)
+                return _aspect_events(
+                    samples, body, other, pair_signal(body, other), (lons_a - lons_b) % 360.0, speeds_a - speeds_b, jds,
+                    [kind.split(":", 1)[1] for kind in missing],
+                )
+            out += _cached(f"{year}:{body}|{other}", aspect_kinds, compute)
+    return out
+
+
+def find_events(
+    start_jd: float,
+    end_jd: float,
+    bodies: Optional[Sequence[str]] = None,
+    kinds: Sequence[str] = ("ingress", "station"),
+    aspect_names: Sequence[str] = (),
+    natal: Optional[Dict[str, float]] = None,
+) -> List[dict]:
+    """Events between two Julian days (UT), sorted by time."""
+    bodies = list(bodies or PLANETS)
+    first_year = jd_to_utc(start_jd).year
+    last_year = jd_to_utc(end_jd).year
+    out = []
+    for year in range(first_year, last_year + 1):
+        out += [
+            e for e in events_for_year(year, bodies, kinds, aspect_names, natal)
+            if start_jd <= e["julian_day"] <= end_jd
+        ]
+    return sorted(out, key=lambda e: e["julian_day"])
+
+
+def search_events(req: EventSearchRequest) -> List[AstroEvent]:
+    """Validate an EventSearchRequest and run it. Raises ValueError for bad input."""
+    start, end = parse_utc(req.start), parse_utc(req.end)
+    if end < start:
+        raise ValueError("end must not be before start")
+    if end.year - start.year + 1 > EVENTS_MAX_YEARS:
+        raise ValueError(f"Range spans more than {EVENTS_MAX_YEARS} years")
+    bodies = list(req.bodies or PLANETS)
+    unknown = [b for b in bodies if b not in PLANETS]
+    if unknown:
+        raise ValueError(f"Unknown bodies: {', '.join(unknown)}")
+    aspect_names = ASPECT_SETS[req.aspects.aspect_set if req.aspects else "major"]
+
+    events = find_events(utc_to_jd(start), utc_to_jd(end), bodies, list(dict.fromkeys(req.events)), aspect_names, req.natal)
+    return [AstroEvent(**e) for e in events]
@@ -0,0 +1,269 @@
+# src/services/gazetteer.py
+"""Offline place index used by `geocode_place` before falling back to Nominatim.
+
+The bundled CSV (or a GeoNames `citiesNNNN.txt` dump) is compiled into a few
+`.npy` files that are memory-mapped at load time, so every worker process
+shares the same pages:
+
+- keys.npy         sorted, normalized place names/aliases (fixed-width bytes)
+- key_records.npy  record index for every key
+- records.npy      structured array: latitude, longitude, timezone, country, admin, population
+- meta.json        string tables (timezones, countries, admin areas, display names)
+
+Build (also done lazily on first use when the index is missing or stale):
+    python -m src.services.gazetteer build [--geonames cities15000.txt]
+"""
+import argparse
+import csv
+import difflib
+import json
+import logging
+import os
+import re
+import unicodedata
+from threading import Lock
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+from config import GAZETTEER_CSV, GAZETTEER_INDEX_DIR
+
+
+RECORD_DTYPE = np.dtype([
+    ("latitude", "f8"),
+    ("longitude", "f8"),
+    ("timezone", "i4"),
+    ("country", "i4"),
+    ("admin", "i4"),
+    ("population", "i8"),
+])
+
+_INDEX_FILES = ("keys.npy", "key_records.npy", "records.npy", "meta.json")
+_NON_ALNUM = re.compile(r"[^a-z0-9]+")
+
+
+def normalize_place(text: str) -> str:
+    """Lowercase, strip accents and punctuation, collapse whitespace."""
+    text = unicodedata.normalize("NFKD", text or "")
+    text = text.encode("ascii", "ignore").decode("ascii").lower()
+    return _NON_ALNUM.sub(" ", text).strip()
+
+
+# --------------------------
+# Source readers
+# --------------------------
+def _read_csv(path: str) -> Iterator[dict]:
+    with open(path, newline="", encoding="utf-8") as f:
+        for row in csv.DictReader(f):
+            yield {
+                "name": row["name"],
+                "aliases": [a for a in (row.get("aliases") or "").split("|") if a],
+                "admin": row.get("admin") or "",
+                "country_code": row.get("country_code") or "",
+                "country": row.get("country") or "",
+                "latitude": float(row["latitude"]),
+                "longitude": float(row["longitude"]),
+                "timezone": row["timezone"],
+                "population": int(row.get("population") or 0),
+            }
+
+
+def _read_geonames(path: str) -> Iterator[dict]:
+    """Read a GeoNames cities dump (tab separated, see download.geonames.org/export/dump)."""
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            cols = line.rstrip("\n").split("\t")
+            if len(cols) < 18 or not cols[17]:
+                continue
+            yield {
+                "name": cols[1],
+                "aliases": [cols[2]] if cols[2] != cols[1] else [],
+                "admin": "",
+                "country_code": cols[8],
+                "country": cols[8],
+                "latitude": float(cols[4]),
+                "longitude": float(cols[5]),
+                "timezone": cols[17],
+                "population": int(cols[14] or 0),
+            }
+
+
+# --------------------------
+# Build
+# --------------------------
+def build_index(rows: Iterator[dict], out_dir: str) -> None:
+    """Compile place rows into the memory-mappable index files in `out_dir`."""
+    timezones: Dict[str, int] = {}
+    countries: Dict[Tuple[str, str], int] = {}
+    admins: Dict[str, int] = {}
+    names: List[str] = []
+    records = []
+    keys: List[Tuple[bytes, int]] = []
+
+    for row in rows:
+        rec_idx = len(records)
+        tz_idx = timezones.setdefault(row["timezone"], len(timezones))
+        country_idx = countries.setdefault((row["country_code"], row["country"]), len(countries))
+        admin_idx = admins.setdefault(row["admin"], len(admins))
+        records.append((row["latitude"], row["longitude"], tz_idx, country_idx, admin_idx, row["population"]))
+        names.append(row["name"])
+        for label in {normalize_place(n) for n in [row["name"], *row["aliases"]]}:
+            if label:
+                keys.append((label.encode("ascii"), rec_idx))
+
+    if not records:
+        raise ValueError("Gazetteer source contains no places")
+
+    keys.sort()
+    width = max(len(k) for k, _ in keys)
+    os.makedirs(out_dir, exist_ok=True)
+    np.save(os.path.join(out_dir, "keys.npy"), np.array([k for k, _ in keys], dtype=f"S{width}"))
+    np.save(os.path.join(out_dir, "key_records.npy"), np.array([r for _, r in keys], dtype=np.int32))
+    np.save(os.path.join(out_dir, "records.npy"), np.array(records, dtype=RECORD_DTYPE))
+    with open(os.path.join(out_dir, "meta.json"), "w", encoding="utf-8") as f:
+        json.dump({
+            "timezones": list(timezones),
+            "countries": [list(c) for c in countries],
+            "admins": list(admins),
+            "names": names,
+        }, f)
+    logging.info(f"Gazetteer index built: {len(records)} places, {len(keys)} keys -> {out_dir}")
+
+
+def _index_is_stale(source: str, index_dir: str) -> bool:
+    paths = [os.path.join(index_dir, name) for name in _INDEX_FILES]
+    if not all(os.path.exists(p) for p in paths):
+        return True
+    if not os.path.exists(source):
+        return False
+    return os.path.getmtime(source) > min(os.path.getmtime(p) for p in paths)
+
+
+# --------------------------
+# Lookup
+# --------------------------
+class Gazetteer:
+    """Read-only place index backed by memory-mapped numpy arrays."""
+
+    def __init__(self, index_dir: str):
+        self.keys = np.load(os.path.join(index_dir, "keys.npy"), mmap_mode="r")
+        self.key_records = np.load(os.path.join(index_dir, "key_records.npy"), mmap_mode="r")
+        self.records = np.load(os.path.join(index_dir, "records.npy"), mmap_mode="r")
+        with open(os.path.join(index_dir, "meta.json"), encoding="utf-8") as f:
+            meta = json.load(f)
+        self.timezones: List[str] = meta["timezones"]
+        self.names: List[str] = meta["names"]
+        self.admins = [normalize_place(a) for a in meta["admins"]]
+        self.countries = [(normalize_place(code), normalize_place(name)) for code, name in meta["countries"]]
+        self.qualifiers = {q for pair in self.countries for q in pair if q} | {a for a in self.admins if a}
+
+    def __len__(self) -> int:
+        return len(self.records)
+
+    def _exact(self, key: bytes) -> np.ndarray:
+        lo = np.searchsorted(self.keys, key, side="left")
+        hi = np.searchsorted(self.keys, key, side="right")
+        return self.key_records[lo:hi]
+
+    def _prefix(self, key: bytes) -> np.ndarray:
+        # whole leading words only: "new york" finds "new york city", "pari" does not find "paris"
+        lo = np.searchsorted(self.keys, key + b" ", side="left")
+        hi = np.searchsorted(self.keys, key + b" \xff", side="left")
+        return self.key_records[lo:hi]
+
+    def _fuzzy(self, key: bytes) -> np.ndarray:
+        # only compare against keys sharing the first letter to keep the scan small
+        lo = np.searchsorted(self.keys, key[:1], side="left")
+        hi = np.searchsorted(self.keys, key[:1] + b"\xff", side="left")
+        block = [k.decode("ascii") for k in self.keys[lo:hi]]
+        close = difflib.get_close_matches(key.decode("ascii"), block, n=5, cutoff=0.8)
+        if not close:
+            return self.key_records[0:0]
+        return np.concatenate([self._exact(c.encode("ascii")) for c in close])
+
+    def _matches_qualifiers(self, rec_idx: int, qualifiers: List[str]) -> bool:
+        rec = self.records[rec_idx]
+        code, country = self.countries[rec["country"]]
+        admin = self.admins[rec["admin"]]
+        return any(q in (code, country, admin) for q in qualifiers)
+
+    def _best(self, candidates: np.ndarray, qualifiers: List[str]) -> Optional[int]:
+        if len(candidates) == 0:
+            return None
+        candidates = np.unique(candidates)
+        if qualifiers:
+            candidates = np.array([c for c in candidates if self._matches_qualifiers(c, qualifiers)], dtype=np.int64)
+            if len(candidates) == 0:
+                return None
+        return int(candidates[np.argmax(self.records["population"][candidates])])
+
+    @staticmethod
+    def _unique(candidates: np.ndarray) -> Optional[int]:
+        candidates = np.unique(candidates)
+        return int(candidates[0]) if len(candidates) == 1 else None
+
+    def _split_query(self, place: str) -> Tuple[str, List[str]]:
+        parts = [normalize_place(p) for p in place.split(",")]
+        parts = [p for p in parts if p]
+        if not parts:
+            return "", []
+        name, qualifiers = parts[0], parts[1:]
+        if len(parts) == 1 and len(self._exact(name.encode("ascii"))) == 0:
+            # "Delhi India": peel trailing words that name a known country/admin area
+            words = name.split()
+            while len(words) > 1 and words[-1] in self.qualifiers:
+                qualifiers.insert(0, words.pop())
+            name = " ".join(words)
+        return name, qualifiers
+
+    def lookup(self, place: str) -> Optional[Tuple[float, float, str]]:
+        """Return (lat, lon, timezone) for the best match, or None.
+
+        None (so the caller falls back to Nominatim) whenever the index cannot be sure: a
+        qualifier it does not know ("Salem, Oregon", postcodes), or a prefix/fuzzy match that
+        is not a single unambiguous place. Prefix and fuzzy matching only apply to bare names.
+        """
+        name, qualifiers = self._split_query(place)
+        if not name or any(q not in self.qualifiers for q in qualifiers):
+            return None
+        key = name.encode("ascii")
+        rec_idx = self._best(self._exact(key), qualifiers)
+        if rec_idx is None and not qualifiers:
+            rec_idx = self._unique(self._prefix(key))
+            if rec_idx is None and len(key) >= 5:
+                rec_idx = self._unique(self._fuzzy(key))
+        if rec_idx is None:
+            return None
+        rec = self.records[rec_idx]
+        return float(rec["latitude"]), float(rec["longitude"]), self.timezones[rec["timezone"]]
+
+
+_GAZETTEER: Optional[Gazetteer] = None
+_GAZETTEER_LOCK = Lock()
+
+
+def get_gazetteer() -> Gazetteer:
+    """Load (building first if needed) the shared gazetteer index."""
+    global _GAZETTEER
+    with _GAZETTEER_LOCK:
+        if _GAZETTEER is None:
+            if _index_is_stale(GAZETTEER_CSV, GAZETTEER_INDEX_DIR):
+                build_index(_read_csv(GAZETTEER_CSV), GAZETTEER_INDEX_DIR)
+            _GAZETTEER = Gazetteer(GAZETTEER_INDEX_DIR)
+        return _GAZETTEER
+
+
+def _main() -> None:
+    parser = argparse.ArgumentParser(description="Build the offline gazetteer index.")
+    parser.add_argument("command", choices=["build"])
+    parser.add_argument("--csv", default=GAZETTEER_CSV, help="Bundled place CSV")
+    parser.add_argument("--geonames", help="GeoNames cities dump to index instead of the CSV")
+    parser.add_argument("--out", default=GAZETTEER_INDEX_DIR)
+    args = parser.parse_args()
+    rows = _read_geonames(args.geonames) if args.geonames else _read_csv(args.csv)
+    build_index(rows, args.out)
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    _main()
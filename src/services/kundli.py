@@ -1,4 +1,6 @@
 from datetime import datetime
+import hashlib
+import numpy as np
 import swisseph as swe
 import pytz
 import time
@@ -6,13 +8,41 @@ from geopy.exc import GeocoderTimedOut, GeocoderUnavailable
 from timezonefinderL import TimezoneFinder
 from geopy.geocoders import Nominatim
 import logging
-from typing import Dict
-from src.models.kundli_model import KundliChart, Planet, House, Aspect
+from typing import Dict, Optional, Sequence
+from src.models.kundli_model import KundliChart, Planet, House, Aspect, AspectOptions, VargaPlacement
+from src.services.aspects import AspectEngine, DEFAULT_ENGINE
+from src.services.ephemeris_table import get_ephemeris_table
+from src.services.gazetteer import get_gazetteer, normalize_place
+from src.services.varga import get_ayanamsa, varga_signs
+from src.utils.cache import LRUCache, SQLiteCache, TieredCache
+from config import (
+    GEOCODE_NOMINATIM_FALLBACK,
+    GEOCODE_CACHE_SIZE,
+    GEOCODE_CACHE_TTL_SECONDS,
+    GEOCODE_CACHE_PATH,
+    GEOCODE_CACHE_MAX_ENTRIES,
+    ASPECT_DEFAULT_ORB,
+    USE_EPHEMERIS_TABLE,
+    CHART_CACHE_SIZE,
+    CHART_CACHE_PATH,
+    CHART_CACHE_MAX_ENTRIES,
+)
 
 
 # Init helpers
 geolocator = Nominatim(user_agent="kundli_backend")
 tzfinder = TimezoneFinder(in_memory=True)
+geocode_cache = TieredCache(
+    "geocode",
+    LRUCache(GEOCODE_CACHE_SIZE, ttl=GEOCODE_CACHE_TTL_SECONDS),
+    SQLiteCache(GEOCODE_CACHE_PATH, ttl=GEOCODE_CACHE_TTL_SECONDS, max_entries=GEOCODE_CACHE_MAX_ENTRIES)
+    if GEOCODE_CACHE_PATH else None,
+)
+chart_cache = TieredCache(
+    "chart",
+    LRUCache(CHART_CACHE_SIZE),
+    SQLiteCache(CHART_CACHE_PATH, max_entries=CHART_CACHE_MAX_ENTRIES) if CHART_CACHE_PATH else None,
+)
 
 PLANETS = {
     'Sun': swe.SUN,
@@ -45,7 +75,39 @@ NAKSHATRAS = [
 
 
 
+def lookup_gazetteer(place: str):
+    try:
+        return get_gazetteer().lookup(place)
+    except Exception as e:
+        logging.error(f"Gazetteer lookup failed for {place!r}: {e}")
+        return None
+
+
+def geocode_place_offline(place: str):
+    """Cache, then offline gazetteer. Returns None when neither knows the place."""
+    key = normalize_place(place)
+    cached = geocode_cache.get(key)
+    if cached:
+        return tuple(cached)
+    match = lookup_gazetteer(place)
+    if match:
+        geocode_cache.set(key, list(match))
+    return match
+
+
 def geocode_place(place: str):
+    """Resolve a place to (lat, lon, timezone), cached on the canonicalized place string."""
+    match = geocode_place_offline(place)
+    if match:
+        return match
+    if not GEOCODE_NOMINATIM_FALLBACK:
+        raise ValueError(f"Could not geocode place: {place}")
+    result = geocode_place_nominatim(place)
+    geocode_cache.set(normalize_place(place), list(result))
+    return result
+
+
+def geocode_place_nominatim(place: str):
     for attempt in range(2):  # Try twice
         try:
             loc = geolocator.geocode(place, timeout=5)
@@ -94,94 +156,301 @@ def get_nakshatra(longitude: float):
     return NAKSHATRAS[nakshatra_index], pada
 
 
-def get_aspects(planets: Dict[str, Planet]):
-    """Basic aspects (Conjunction, Sextile, Square, Trine, Opposition)."""
+def aspect_engine_for(options: Optional[AspectOptions]) -> AspectEngine:
+    if options is None:
+        return DEFAULT_ENGINE
+    return AspectEngine(
+        aspect_set=options.aspect_set,
+        orbs=options.orbs,
+        planet_orbs=options.planet_orbs,
+        default_orb=ASPECT_DEFAULT_ORB,
+    )
+
+
+def aspects_from_arrays(
+    names: Sequence[str],
+    longitudes,
+    speeds=None,
+    options: Optional[AspectOptions] = None,
+):
+    hits = aspect_engine_for(options).match(longitudes, speed_a=speeds, names_a=names)
     aspects = []
-    aspect_types = {
-        "Conjunction": 0,
-        "Sextile": 60,
-        "Square": 90,
-        "Trine": 120,
-        "Opposition": 180
-    }
-    planet_names = list(planets.keys())
-    for i in range(len(planet_names)):
-        for j in range(i + 1, len(planet_names)):
-            p1 = planets[planet_names[i]]
-            p2 = planets[planet_names[j]]
-            diff = abs(p1.longitude - p2.longitude) % 360
-            for name, angle in aspect_types.items():
-                if abs(diff - angle) <= 5:  # orb of 5 degrees
-                    aspects.append(Aspect(
-                        between=[p1.name, p2.name],
-                        type=name,
-                        angle=diff
-                    ))
+    for n in range(len(hits)):
+        aspects.append(Aspect(
+            between=[names[hits.i[n]], names[hits.j[n]]],
+            type=hits.names[hits.aspect[n]],
+            angle=float(hits.separation[n]),
+            orb=float(hits.orb[n]),
+            applying=bool(hits.applying[n]) if hits.applying is not None else None,
+        ))
     return aspects
 
 
+def get_aspects(planets: Dict[str, Planet], options: Optional[AspectOptions] = None):
+    """Aspects between all planet pairs (major set with a 5 degree orb unless configured)."""
+    names = list(planets.keys())
+    lons = [planets[n].longitude for n in names]
+    speeds = [planets[n].speed for n in names]
+    has_speeds = all(v is not None for v in speeds)
+    return aspects_from_arrays(names, lons, speeds if has_speeds else None, options)
+
+
 # --------------------------
-# Core Computation
+# Compact chart core
 # --------------------------
-def compute_kundli(birth_date: str, birth_time: str, place: str , gender : str) -> KundliChart:
-    try: 
-        lat, lon, tz = geocode_place(place)
-        dt = parse_birth_datetime(birth_date, birth_time)
-        jd_ut = datetime_to_jd(dt, tz)
+PLANET_NAMES = tuple(PLANETS)
+
+PLANET_DTYPE = np.dtype([
+    ("longitude", "f8"),
+    ("speed", "f8"),      # degrees/day, negative when retrograde
+    ("sign", "i1"),       # index into SIGNS
+    ("nakshatra", "i1"),  # index into NAKSHATRAS
+    ("pada", "i1"),       # 1-4
+    ("house", "i1"),      # 1-12
+])
+
+
+def assign_houses(longitudes, cusps) -> np.ndarray:
+    """House number (1-12) for each longitude, by bisecting the cusps rotated to start at house 1."""
+    cusps = np.asarray(cusps, dtype=float)
+    offsets = (cusps - cusps[0]) % 360
+    positions = (np.asarray(longitudes, dtype=float) - cusps[0]) % 360
+    return np.searchsorted(offsets, positions, side="right")
+
+
+class ChartCore:
+    """Array-backed chart: what `compute_kundli` computes, without pydantic objects.
+
+    `planets` is a PLANET_DTYPE structured array ordered like PLANET_NAMES.
+    Convert with `to_kundli_chart` only at the API boundary. `ayanamsa` is
+    set on sidereal charts (see `sidereal`) and None for tropical ones.
+    """
+    __slots__ = ("julian_day", "planets", "cusps", "ascendant", "mc", "ayanamsa")
+
+    names = PLANET_NAMES
+
+    def __init__(
+        self,
+        julian_day: float,
+        planets: np.ndarray,
+        cusps: np.ndarray,
+        ascendant: float,
+        mc: float,
+        ayanamsa: Optional[float] = None,
+    ):
+        self.julian_day = julian_day
+        self.planets = planets
+        self.cusps = cusps
+        self.ascendant = ascendant
+        self.mc = mc
+        self.ayanamsa = ayanamsa
+
+    @classmethod
+    def from_positions(cls, julian_day: float, longitudes, speeds, cusps, ascendant: float, mc: float) -> "ChartCore":
+        """Derive sign/nakshatra/pada/house indices from raw positions."""
+        lons = np.asarray(longitudes, dtype=float) % 360
+        cusps = np.asarray(cusps, dtype=float)
+        planets = np.zeros(len(lons), dtype=PLANET_DTYPE)
+        planets["longitude"] = lons
+        planets["speed"] = speeds
+        planets["sign"] = lons // 30
+        planets["nakshatra"] = lons // (360 / 27)
+        planets["pada"] = (lons % (360 / 27)) // (360 / 108) + 1
+        planets["house"] = assign_houses(lons, cusps)
+        return cls(julian_day, planets, cusps, ascendant, mc)
+
+    def sidereal(self, ayanamsa: float) -> "ChartCore":
+        """The same chart with every longitude shifted back by `ayanamsa` degrees."""
+        core = ChartCore.from_positions(
+            self.julian_day,
+            self.planets["longitude"] - ayanamsa,
+            self.planets["speed"],
+            (self.cusps - ayanamsa) % 360,
+            (self.ascendant - ayanamsa) % 360,
+            (self.mc - ayanamsa) % 360,
+        )
+        core.ayanamsa = ayanamsa
+        return core
+
+    def vargas(self, names: Sequence[str]) -> Dict[str, Dict[str, VargaPlacement]]:
+        """Divisional charts from this chart's longitudes (planets + ascendant), no ephemeris calls."""
+        lons = np.append(self.planets["longitude"], self.ascendant)
+        labels = self.names + ("Ascendant",)
+        out = {}
+        for varga, signs in varga_signs(lons, names).items():
+            lagna = int(signs[-1])
+            out[varga] = {
+                label: VargaPlacement(sign=SIGNS[sign], house=(sign - lagna) % 12 + 1)
+                for label, sign in zip(labels, signs.tolist())
+            }
+        return out
 
-        # houses
-        cusps, asc_mc = swe.houses(jd_ut, lat, lon)
+    def to_dict(self) -> dict:
+        """JSON-friendly raw positions; `from_dict` re-derives everything else."""
+        return {
+            "julian_day": self.julian_day,
+            "longitudes": self.planets["longitude"].tolist(),
+            "speeds": self.planets["speed"].tolist(),
+            "cusps": self.cusps.tolist(),
+            "ascendant": self.ascendant,
+            "mc": self.mc,
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "ChartCore":
+        return cls.from_positions(
+            data["julian_day"], data["longitudes"], data["speeds"], data["cusps"], data["ascendant"], data["mc"]
+        )
+
+    def to_kundli_chart(
+        self,
+        place: str,
+        tz: str,
+        aspect_options: Optional[AspectOptions] = None,
+        vargas: Optional[Sequence[str]] = None,
+    ) -> KundliChart:
         houses: Dict[int, House] = {}
-        for i, cusp in enumerate(cusps, start=1):
-            sign_idx = int(cusp // 30)
+        for i, cusp in enumerate(self.cusps.tolist(), start=1):
             houses[i] = House(
                 number=i,
                 longitude=cusp,
-                sign=SIGNS[sign_idx],
+                sign=SIGNS[int(cusp // 30)],
                 degree=cusp % 30
             )
 
-        # planets
         planets: Dict[str, Planet] = {}
-        for name, pid in PLANETS.items():
-            xx, ret = swe.calc_ut(jd_ut, pid)
-            lon_deg, latp, dist, speed = xx[:4]
-            sign_idx = int(lon_deg // 30)
-            nakshatra, pada = get_nakshatra(lon_deg)
-            # map planet to house
-            planet_house = None
-            for i in range(1, 13):
-                start = houses[i].longitude
-                end = houses[1].longitude if i == 12 else houses[i + 1].longitude
-                if start <= lon_deg < end or (i == 12 and lon_deg >= start):
-                    planet_house = i
-                    break
+        for name, row in zip(self.names, self.planets.tolist()):
+            lon_deg, speed, sign_idx, nak_idx, pada, house = row
             planets[name] = Planet(
                 name=name,
                 longitude=lon_deg,
                 sign=SIGNS[sign_idx],
                 degree=lon_deg % 30,
                 retrograde=speed < 0,
-                house=planet_house,
-                nakshatra=nakshatra,
-                pada=pada
+                house=house,
+                nakshatra=NAKSHATRAS[nak_idx],
+                pada=pada,
+                speed=speed
             )
 
-        # aspects
-        aspects = get_aspects(planets)
+        aspects = aspects_from_arrays(self.names, self.planets["longitude"], self.planets["speed"], aspect_options)
 
         return KundliChart(
             place=place,
             timezone=tz,
-            julian_day=jd_ut,
-            ascendant=asc_mc[0],
-            mc=asc_mc[1],
+            julian_day=self.julian_day,
+            ascendant=self.ascendant,
+            mc=self.mc,
             planets=planets,
             houses=houses,
-            aspects=aspects
+            aspects=aspects,
+            zodiac="tropical" if self.ayanamsa is None else "sidereal",
+            ayanamsa=self.ayanamsa,
+            vargas=self.vargas(vargas) if vargas else None,
         )
 
 
+def planet_positions(jds, names: Optional[Sequence[str]] = None):
+    """Longitudes and speeds, shape (T, B), at Julian days `jds` (UT) for `names` (default: all PLANETS).
+
+    Served from the precomputed ephemeris table when USE_EPHEMERIS_TABLE is
+    set and the table covers every date, otherwise from `swe.calc_ut`.
+    """
+    jds = np.atleast_1d(np.asarray(jds, dtype=float))
+    names = list(PLANET_NAMES if names is None else names)
+    table = get_ephemeris_table() if USE_EPHEMERIS_TABLE else None
+    if table is not None and set(names) <= set(table.bodies) and table.covers(jds.min(), jds.max()):
+        return table.interpolate(jds, names)
+
+    longitudes = np.empty((len(jds), len(names)))
+    speeds = np.empty((len(jds), len(names)))
+    for t, jd in enumerate(jds.tolist()):
+        for n, name in enumerate(names):
+            xx, ret = swe.calc_ut(jd, PLANETS[name])
+            longitudes[t, n], speeds[t, n] = xx[0], xx[3]
+    return longitudes, speeds
+
+
+def compute_chart_core(jd_ut: float, lat: float, lon: float) -> ChartCore:
+    """One ephemeris pass (houses + PLANETS) into a ChartCore."""
+    cusps, asc_mc = swe.houses(jd_ut, lat, lon)
+    longitudes, speeds = planet_positions(jd_ut)
+    return ChartCore.from_positions(jd_ut, longitudes[0], speeds[0], cusps, asc_mc[0], asc_mc[1])
+
+
+def canonical_chart_inputs(jd_ut: float, lat: float, lon: float):
+    """Round to ~1 second of time and ~10 m of position: closer inputs share one chart."""
+    return round(jd_ut, 5), round(lat, 4), round(lon, 4)
+
+
+def position_source(jd_ut: float) -> str:
+    """Where `planet_positions(jd_ut)` comes from: "swe", or "table:<identity>" of the table in use."""
+    table = get_ephemeris_table() if USE_EPHEMERIS_TABLE else None
+    if table is not None and set(PLANET_NAMES) <= set(table.bodies) and table.covers(jd_ut, jd_ut):
+        return f"table:{table.identity}"
+    return "swe"
+
+
+def chart_cache_key(jd_ut: float, lat: float, lon: float) -> str:
+    jd_ut, lat, lon = canonical_chart_inputs(jd_ut, lat, lon)
+    source = position_source(jd_ut)
+    return hashlib.sha1(f"chart:v1:{source}:{jd_ut:.5f}:{lat:.4f}:{lon:.4f}".encode()).hexdigest()
+
+
+def get_chart_core(jd_ut: float, lat: float, lon: float) -> ChartCore:
+    """`compute_chart_core` on the canonical inputs, memoized in the shared chart cache."""
+    key = chart_cache_key(jd_ut, lat, lon)
+    cached = chart_cache.get(key)
+    if cached is not None:
+        return ChartCore.from_dict(cached)
+    core = compute_chart_core(*canonical_chart_inputs(jd_ut, lat, lon))
+    chart_cache.set(key, core.to_dict())
+    return core
+
+
+# --------------------------
+# Core Computation
+# --------------------------
+def compute_kundli(
+    birth_date: str,
+    birth_time: str,
+    place: str,
+    gender: str,
+    aspect_options: Optional[AspectOptions] = None,
+    zodiac: str = "tropical",
+    ayanamsa: str = "lahiri",
+    vargas: Optional[Sequence[str]] = None,
+) -> KundliChart:
+    try: 
+        lat, lon, tz = geocode_place(place)
+        dt = parse_birth_datetime(birth_date, birth_time)
+        jd_ut = datetime_to_jd(dt, tz)
+        return compute_kundli_at(jd_ut, lat, lon, place, tz, aspect_options, zodiac, ayanamsa, vargas)
+
     except Exception as e:
         logging.error(f"Error computing kundli: {e}")
-        raise ValueError(f"Error computing kundli: {e}")
\ No newline at end of file
+        raise ValueError(f"Error computing kundli: {e}")
+
+
+def compute_kundli_at(
+    jd_ut: float,
+    lat: float,
+    lon: float,
+    place: str,
+    tz: str,
+    aspect_options: Optional[AspectOptions] = None,
+    zodiac: str = "tropical",
+    ayanamsa: str = "lahiri",
+    vargas: Optional[Sequence[str]] = None,
+) -> KundliChart:
+    """Ephemeris part of `compute_kundli`: no geocoding, and cached on (JD, lat, lon) only.
+
+    The cached chart is tropical; sidereal charts and vargas are derived from
+    its longitudes without further ephemeris calls.
+    """
+    core = get_chart_core(jd_ut, lat, lon)
+    if zodiac == "sidereal":
+        core = core.sidereal(get_ayanamsa(core.julian_day, ayanamsa))
+    elif zodiac != "tropical":
+        raise ValueError(f"Unknown zodiac: {zodiac}")
+    return core.to_kundli_chart(place, tz, aspect_options, vargas)
@@ -0,0 +1,147 @@
+# src/services/kundli_async.py
+import asyncio
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, Sequence, Tuple
+
+import httpx
+
+from config import (
+    GEOCODE_MAX_CONCURRENCY,
+    GEOCODE_NOMINATIM_FALLBACK,
+    GEOCODE_TIMEOUT_SECONDS,
+    KUNDLI_DEADLINE_SECONDS,
+    KUNDLI_EXECUTOR_WORKERS,
+    KUNDLI_MAX_CONCURRENCY,
+    NOMINATIM_URL,
+)
+from src.models.kundli_model import AspectOptions, KundliChart
+from src.services.gazetteer import normalize_place
+from src.services.kundli import (
+    compute_kundli_at,
+    datetime_to_jd,
+    geocode_cache,
+    geocode_place_offline,
+    parse_birth_datetime,
+    tzfinder,
+)
+
+
+# Dedicated, bounded executor for Swiss Ephemeris work (kept off the default loop executor)
+ephemeris_executor = ThreadPoolExecutor(max_workers=max(1, KUNDLI_EXECUTOR_WORKERS), thread_name_prefix="ephemeris")
+
+_geocode_semaphore = asyncio.Semaphore(max(1, GEOCODE_MAX_CONCURRENCY))
+_kundli_semaphore = asyncio.Semaphore(max(1, KUNDLI_MAX_CONCURRENCY))
+_http_client: Optional[httpx.AsyncClient] = None
+
+
+def _get_http_client() -> httpx.AsyncClient:
+    global _http_client
+    if _http_client is None:
+        _http_client = httpx.AsyncClient(
+            timeout=GEOCODE_TIMEOUT_SECONDS,
+            headers={"User-Agent": "kundli_backend"},
+            limits=httpx.Limits(max_connections=max(1, GEOCODE_MAX_CONCURRENCY)),
+        )
+    return _http_client
+
+
+async def close_http_client() -> None:
+    global _http_client
+    if _http_client is not None:
+        await _http_client.aclose()
+        _http_client = None
+
+
+async def geocode_place_nominatim_async(place: str) -> Tuple[float, float, str]:
+    for attempt in range(2):  # Try twice
+        try:
+            async with _geocode_semaphore:
+                resp = await _get_http_client().get(
+                    NOMINATIM_URL, params={"q": place, "format": "json", "limit": 1}
+                )
+            if resp.status_code == 429 or resp.status_code >= 500:
+                raise httpx.HTTPStatusError(f"Nominatim returned {resp.status_code}", request=resp.request, response=resp)
+            resp.raise_for_status()
+            results = resp.json()
+            if not results:
+                raise ValueError(f"Could not geocode place: {place}")
+            lat, lon = float(results[0]["lat"]), float(results[0]["lon"])
+            tz = tzfinder.timezone_at(lat=lat, lng=lon)
+            return lat, lon, tz or "UTC"
+        except (httpx.TransportError, httpx.HTTPStatusError) as e:
+            if attempt == 0:
+                await asyncio.sleep(1)  # wait 1 second before retrying
+            else:
+                raise e
+
+
+async def geocode_place_async(place: str) -> Tuple[float, float, str]:
+    """Async twin of `geocode_place`: cache and gazetteer in a worker thread (SQLite reads and
+    writes, and the first call may build the gazetteer index), Nominatim over httpx."""
+    match = await asyncio.to_thread(geocode_place_offline, place)
+    if match:
+        return match
+    if not GEOCODE_NOMINATIM_FALLBACK:
+        raise ValueError(f"Could not geocode place: {place}")
+    result = await geocode_place_nominatim_async(place)
+    await geocode_cache.aset_many({normalize_place(place): list(result)})
+    return result
+
+
+async def run_ephemeris(func, *args):
+    """Run a CPU-bound ephemeris function on the dedicated executor."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(ephemeris_executor, func, *args)
+
+
+async def locate_birth_async(birth_date: str, birth_time: str, place: str) -> Tuple[float, float, float, str]:
+    """Geocode + parse: (jd_ut, lat, lon, tz) for a birth, without computing the chart."""
+    lat, lon, tz = await geocode_place_async(place)
+    dt = parse_birth_datetime(birth_date, birth_time)
+    return datetime_to_jd(dt, tz), lat, lon, tz
+
+
+async def _compute_kundli_async(
+    birth_date: str,
+    birth_time: str,
+    place: str,
+    aspect_options: Optional[AspectOptions],
+    zodiac: str,
+    ayanamsa: str,
+    vargas: Optional[Sequence[str]],
+) -> KundliChart:
+    async with _kundli_semaphore:
+        jd_ut, lat, lon, tz = await locate_birth_async(birth_date, birth_time, place)
+        return await run_ephemeris(
+            compute_kundli_at, jd_ut, lat, lon, place, tz, aspect_options, zodiac, ayanamsa, vargas
+        )
+
+
+async def compute_kundli_async(
+    birth_date: str,
+    birth_time: str,
+    place: str,
+    gender: str,
+    aspect_options: Optional[AspectOptions] = None,
+    zodiac: str = "tropical",
+    ayanamsa: str = "lahiri",
+    vargas: Optional[Sequence[str]] = None,
+    deadline: Optional[float] = KUNDLI_DEADLINE_SECONDS,
+) -> KundliChart:
+    """Non-blocking `compute_kundli`.
+
+    Raises asyncio.TimeoutError when the chart is not ready within `deadline`
+    seconds, and ValueError (like `compute_kundli`) for any other failure.
+    """
+    try:
+        return await asyncio.wait_for(
+            _compute_kundli_async(birth_date, birth_time, place, aspect_options, zodiac, ayanamsa, vargas),
+            timeout=deadline,
+        )
+    except asyncio.TimeoutError:
+        logging.error(f"Kundli computation for {place!r} exceeded {deadline}s deadline")
+        raise
+    except Exception as e:
+        logging.error(f"Error computing kundli: {e}")
+        raise ValueError(f"Error computing kundli: {e}")
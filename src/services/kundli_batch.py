@@ -0,0 +1,94 @@
+# src/services/kundli_batch.py
+import asyncio
+import logging
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from threading import Lock
+from typing import AsyncIterator, List, Optional
+
+from config import KUNDLI_BATCH_WORKERS
+from src.models.kundli_model import KundliBatchItem, KundliRequest, KundliResponse
+from src.services.kundli import compute_kundli
+
+
+# --------------------------
+# Shared process pool
+# --------------------------
+_POOL: Optional[ProcessPoolExecutor] = None
+_POOL_LOCK = Lock()
+
+
+def get_process_pool() -> ProcessPoolExecutor:
+    """Return the process pool used for CPU-bound ephemeris work (created lazily)."""
+    global _POOL
+    with _POOL_LOCK:
+        if _POOL is None:
+            # spawn: the server process runs threads, which do not mix well with fork
+            _POOL = ProcessPoolExecutor(
+                max_workers=max(1, KUNDLI_BATCH_WORKERS),
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        return _POOL
+
+
+def shutdown_process_pool() -> None:
+    global _POOL
+    with _POOL_LOCK:
+        if _POOL is not None:
+            _POOL.shutdown(wait=False, cancel_futures=True)
+            _POOL = None
+
+
+def _reset_broken_pool(pool: ProcessPoolExecutor) -> None:
+    global _POOL
+    with _POOL_LOCK:
+        if _POOL is pool:
+            _POOL = None
+    pool.shutdown(wait=False, cancel_futures=True)
+
+
+# --------------------------
+# Batch generation
+# --------------------------
+def _generate_one(index: int, payload: dict) -> str:
+    """Worker entry point: compute one chart and return it as a single NDJSON record."""
+    try:
+        req = KundliRequest(**payload)
+        chart = compute_kundli(
+            req.birth_date, req.birth_time, req.place, req.gender, req.aspects, req.zodiac, req.ayanamsa, req.vargas
+        )
+        response = KundliResponse(
+            name=req.name,
+            birth_date=req.birth_date,
+            birth_time=req.birth_time,
+            place=req.place,
+            gender=req.gender,
+            chart=chart,
+        )
+        return KundliBatchItem(index=index, result=response).model_dump_json()
+    except Exception as e:
+        return KundliBatchItem(index=index, error=str(e)).model_dump_json()
+
+
+async def stream_kundli_batch(items: List[KundliRequest]) -> AsyncIterator[str]:
+    """Fan the batch out over the process pool and yield NDJSON lines in request order."""
+    loop = asyncio.get_running_loop()
+    pool = get_process_pool()
+    futures = [
+        loop.run_in_executor(pool, _generate_one, i, item.model_dump())
+        for i, item in enumerate(items)
+    ]
+    try:
+        for i, fut in enumerate(futures):
+            try:
+                line = await fut
+            except Exception as e:
+                # a crashed worker breaks the whole pool; report inline and start a fresh one next time
+                logging.error(f"Batch kundli worker failed on item {i}: {e}")
+                _reset_broken_pool(pool)
+                line = KundliBatchItem(index=i, error=f"Worker failure: {e}").model_dump_json()
+            yield line + "\n"
+    finally:
+        # client went away or the stream finished: drop anything still queued
+        for fut in futures:
+            fut.cancel()
@@ -0,0 +1,255 @@
+# src/services/muhurta.py
+"""Muhurta (auspicious time) search.
+
+Each constraint is a signal from `events` (a longitude or longitude
+difference) plus a test on its value: tithi on Moon - Sun, nakshatra on
+the Moon, lagna on the ascendant, malefic aspects on Moon/ascendant minus
+Mars, Saturn or the node. The constraint's state can only change where
+the signal crosses one of its levels, so instead of testing every minute
+the search brackets and refines those crossings and tests one point per
+piece in between.
+
+Constraints are applied slowest-changing first (tithi, nakshatra and the
+Moon's aspects move about 12 degrees a day, the ascendant 360), and each
+one is only evaluated inside the intervals the previous ones allowed, so
+whole days that fail the tithi never see an ascendant computation. Days
+are searched in parallel on the process pool and windows are streamed in
+time order as soon as the days before them are done.
+"""
+import asyncio
+import math
+from datetime import date, datetime, timedelta
+from typing import AsyncIterator, Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+import pytz
+import swisseph as swe
+
+from config import MUHURTA_MAX_DAYS
+from src.models.muhurta_model import MuhurtaRequest, MuhurtaWindow
+from src.services.events import Signal, body_signal, find_crossings, find_stations, pair_signal, unwrap
+from src.services.kundli import NAKSHATRAS, SIGNS, datetime_to_jd
+from src.services.kundli_async import geocode_place_async
+from src.services.kundli_batch import get_process_pool
+from src.services.transits import jd_to_utc
+from src.services.varga import get_ayanamsa
+
+_PAKSHA_TITHIS = (
+    "Pratipada", "Dwitiya", "Tritiya", "Chaturthi", "Panchami", "Shashthi", "Saptami", "Ashtami",
+    "Navami", "Dashami", "Ekadashi", "Dwadashi", "Trayodashi", "Chaturdashi",
+)
+TITHIS = (
+    [f"Shukla {name}" for name in _PAKSHA_TITHIS] + ["Purnima"]
+    + [f"Krishna {name}" for name in _PAKSHA_TITHIS] + ["Amavasya"]
+)
+TITHI_SPAN = 12.0
+NAKSHATRA_SPAN = 360.0 / 27
+MALEFICS = ("Mars", "Saturn", "TrueNode")    # Ketu is covered by the node's opposition
+
+# Coarse sampling steps (days): Moon-based signals move < 16 degrees a day,
+# the ascendant a full circle, so it is sampled every half hour.
+_MOON_STEP = 0.5
+_LAGNA_STEP = 1.0 / 48
+_RATE_DT = 1.0 / 1440
+
+# (signal, coarse step, level sets (offset, spacing), allowed(value))
+Constraint = Tuple[Signal, float, List[Tuple[float, float]], Callable[[float], bool]]
+
+
+def _wrap180(x: float) -> float:
+    return (x + 180.0) % 360.0 - 180.0
+
+
+def ascendant_signal(lat: float, lon: float) -> Signal:
+    def signal(jd: float) -> Tuple[float, float]:
+        a = swe.houses(jd, lat, lon)[1][0]
+        b = swe.houses(jd + _RATE_DT, lat, lon)[1][0]
+        return a, _wrap180(b - a) / _RATE_DT
+    return signal
+
+
+def minus_signal(a: Signal, b: Signal) -> Signal:
+    def signal(jd: float) -> Tuple[float, float]:
+        (va, ra), (vb, rb) = a(jd), b(jd)
+        return (va - vb) % 360.0, ra - rb
+    return signal
+
+
+def _far_from_hard_aspects(orb: float) -> Callable[[float], bool]:
+    def allowed(value: float) -> bool:
+        d = abs(_wrap180(value))
+        return min(d, abs(d - 90.0), 180.0 - d) >= orb
+    return allowed
+
+
+def build_constraints(spec: Dict, lat: float, lon: float) -> List[Constraint]:
+    """Constraints for a request spec (see `MuhurtaQuery.spec`), slowest-changing first."""
+    ayanamsa = spec["ayanamsa"]
+    out: List[Constraint] = []
+    if spec["tithis"]:
+        tithis = set(spec["tithis"])
+        out.append((pair_signal("Moon", "Sun"), _MOON_STEP, [(0.0, TITHI_SPAN)],
+                    lambda v: int((v % 360) // TITHI_SPAN) + 1 in tithis))
+    if spec["nakshatras"]:
+        nakshatras = set(spec["nakshatras"])
+        out.append((body_signal("Moon"), _MOON_STEP, [(ayanamsa, NAKSHATRA_SPAN)],
+                    lambda v: int(((v - ayanamsa) % 360) // NAKSHATRA_SPAN) in nakshatras))
+    if spec["malefic_orb"] is not None:
+        orb = spec["malefic_orb"]
+        levels = [(-orb, 90.0), (orb, 90.0)]
+        if "moon" in spec["malefic_targets"]:
+            for name in MALEFICS:
+                out.append((pair_signal("Moon", name), _MOON_STEP, levels, _far_from_hard_aspects(orb)))
+        if "lagna" in spec["malefic_targets"]:
+            for name in MALEFICS:
+                signal = minus_signal(ascendant_signal(lat, lon), body_signal(name))
+                out.append((signal, _LAGNA_STEP, levels, _far_from_hard_aspects(orb)))
+    if spec["lagnas"]:
+        lagnas = set(spec["lagnas"])
+        out.append((ascendant_signal(lat, lon), _LAGNA_STEP, [(ayanamsa, 30.0)],
+                    lambda v: int(((v - ayanamsa) % 360) // 30) in lagnas))
+    return sorted(out, key=lambda c: -c[1])
+
+
+def allowed_intervals(constraint: Constraint, intervals: List[Tuple[float, float]]) -> List[Tuple[float, float]]:
+    """Sub-intervals of `intervals` where the constraint holds.
+
+    The signal is sampled at the constraint's coarse step, its level
+    crossings refined, and the state tested once per piece between them.
+    """
+    signal, step, levels, allowed = constraint
+    out: List[Tuple[float, float]] = []
+    for a, b in intervals:
+        jds = np.linspace(a, b, max(1, math.ceil((b - a) / step)) + 1)
+        samples = np.array([signal(t) for t in jds.tolist()])
+        values, rates = unwrap(samples[:, 0]), samples[:, 1]
+        stations = find_stations(signal, jds, rates)
+        cuts = sorted(
+            jd for offset, spacing in levels
+            for jd, _, _ in find_crossings(signal, jds, values, stations, offset, spacing)
+        )
+        edges = [a] + [t for t in cuts if a < t < b] + [b]
+        for x, y in zip(edges, edges[1:]):
+            if y > x and allowed(signal((x + y) / 2)[0]):
+                if out and out[-1][1] == x:
+                    out[-1] = (out[-1][0], y)
+                else:
+                    out.append((x, y))
+    return out
+
+
+def describe_moment(jd: float, lat: float, lon: float, ayanamsa: float) -> Dict[str, str]:
+    moon, sun = body_signal("Moon")(jd)[0], body_signal("Sun")(jd)[0]
+    asc = swe.houses(jd, lat, lon)[1][0]
+    return {
+        "tithi": TITHIS[int(((moon - sun) % 360) // TITHI_SPAN)],
+        "nakshatra": NAKSHATRAS[int(((moon - ayanamsa) % 360) // NAKSHATRA_SPAN)],
+        "lagna": SIGNS[int(((asc - ayanamsa) % 360) // 30)],
+    }
+
+
+def search_day(start_jd: float, end_jd: float, lat: float, lon: float, spec: Dict) -> List[Dict]:
+    """Worker entry point: windows in [start_jd, end_jd] where every constraint holds."""
+    intervals = [(start_jd, end_jd)]
+    for constraint in build_constraints(spec, lat, lon):
+        intervals = allowed_intervals(constraint, intervals)
+        if not intervals:
+            break
+    return [
+        {"start": a, "end": b, **describe_moment(a, lat, lon, spec["ayanamsa"])}
+        for a, b in intervals
+    ]
+
+
+# --------------------------
+# Request handling
+# --------------------------
+def _parse_date(value: str) -> date:
+    try:
+        return date.fromisoformat(value)
+    except ValueError:
+        raise ValueError(f"Invalid date {value!r}. Use YYYY-MM-DD")
+
+
+class MuhurtaQuery:
+    """Validated request; `locate` resolves the place and the local day boundaries."""
+
+    def __init__(self, req: MuhurtaRequest):
+        self.req = req
+        self.first_day = _parse_date(req.start_date)
+        self.days = (_parse_date(req.end_date) - self.first_day).days + 1
+        if self.days < 1:
+            raise ValueError("end_date must not be before start_date")
+        if self.days > MUHURTA_MAX_DAYS:
+            raise ValueError(f"Range has {self.days} days (max {MUHURTA_MAX_DAYS})")
+        bad = [t for t in req.tithis or [] if not 1 <= t <= 30]
+        bad += [n for n in req.nakshatras or [] if n not in NAKSHATRAS]
+        bad += [s for s in req.lagnas or [] if s not in SIGNS]
+        if bad:
+            raise ValueError(f"Unknown tithis/nakshatras/lagnas: {', '.join(map(str, bad))}")
+        if not (req.tithis or req.nakshatras or req.lagnas or req.avoid_malefic_aspects):
+            raise ValueError("Give at least one constraint")
+        self.lat = self.lon = None
+        self.tz: Optional[str] = None
+        self.day_jds: List[float] = []
+        self.spec: Dict = {}
+
+    async def locate(self) -> None:
+        self.lat, self.lon, self.tz = await geocode_place_async(self.req.place)
+        midnight = datetime.combine(self.first_day, datetime.min.time())
+        self.day_jds = [datetime_to_jd(midnight + timedelta(days=d), self.tz) for d in range(self.days + 1)]
+        req = self.req
+        self.spec = {
+            "ayanamsa": get_ayanamsa(self.day_jds[0], req.ayanamsa),
+            "tithis": req.tithis,
+            "nakshatras": [NAKSHATRAS.index(n) for n in req.nakshatras or []],
+            "lagnas": [SIGNS.index(s) for s in req.lagnas or []],
+            "malefic_orb": req.malefic_orb if req.avoid_malefic_aspects else None,
+            "malefic_targets": list(req.malefic_targets),
+        }
+
+    def local(self, jd: float) -> str:
+        utc = pytz.UTC.localize(jd_to_utc(jd))
+        return utc.astimezone(pytz.timezone(self.tz)).strftime("%Y-%m-%d %H:%M:%S")
+
+    def window(self, found: Dict) -> Optional[MuhurtaWindow]:
+        minutes = (found["end"] - found["start"]) * 1440
+        if minutes < self.req.min_duration_minutes:
+            return None
+        return MuhurtaWindow(
+            start=self.local(found["start"]),
+            end=self.local(found["end"]),
+            duration_minutes=round(minutes, 2),
+            tithi=found["tithi"],
+            nakshatra=found["nakshatra"],
+            lagna=found["lagna"],
+        )
+
+
+async def stream_muhurta(q: MuhurtaQuery) -> AsyncIterator[str]:
+    """Search every day on the process pool; yield NDJSON windows in time order.
+
+    A window still open at midnight is held back and joined with one
+    starting at the next day's first instant.
+    """
+    loop = asyncio.get_running_loop()
+    pool = get_process_pool()
+    futures = [
+        loop.run_in_executor(pool, search_day, q.day_jds[d], q.day_jds[d + 1], q.lat, q.lon, q.spec)
+        for d in range(q.days)
+    ]
+    pending: Optional[Dict] = None
+    try:
+        for fut in futures:
+            for found in await fut:
+                if pending is not None and pending["end"] == found["start"]:
+                    pending["end"] = found["end"]
+                    continue
+                if pending is not None and (window := q.window(pending)):
+                    yield window.model_dump_json() + "\n"
+                pending = found
+        if pending is not None and (window := q.window(pending)):
+            yield window.model_dump_json() + "\n"
+    finally:
+        for fut in futures:
+            fut.cancel()
@@ -0,0 +1,308 @@
+# src/services/panchang.py
+"""Daily panchang: vara, tithi, nakshatra, yoga and karana at sunrise, the
+end time of each, and the sunrise-based periods (Rahu kalam, Yamaganda,
+Gulika kalam, Abhijit muhurta).
+
+Everything for one (place, date) reduces to a fixed-width record of Julian
+days and small integers. A nightly job computes those records for a grid
+of cities (PANCHANG_CITIES) over PANCHANG_HORIZON_DAYS into one `.npy`
+array of shape (cities, days) with a JSON index of city rows, so a lookup
+is a dict hit plus an array read. Places outside the grid, dates beyond
+the horizon or another ayanamsa are computed on the fly (a few dozen
+ephemeris calls) and memoized in an LRU.
+
+Build (cron, nightly):
+    python -m src.services.panchang build [--cities "Delhi,Mumbai"] [--days 400] [--start 2025-01-01]
+"""
+import argparse
+import json
+import logging
+import os
+from datetime import date, datetime, time, timedelta
+from threading import Lock
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pytz
+import swisseph as swe
+
+from config import (
+    PANCHANG_AYANAMSA,
+    PANCHANG_CACHE_SIZE,
+    PANCHANG_CITIES,
+    PANCHANG_HORIZON_DAYS,
+    PANCHANG_TABLE_DIR,
+)
+from src.models.panchang_model import PanchangElement, PanchangResponse, TimeSpan
+from src.services.events import body_signal, pair_signal, refine_root
+from src.services.gazetteer import normalize_place
+from src.services.kundli import NAKSHATRAS, datetime_to_jd, geocode_place
+from src.services.kundli_async import geocode_place_async, run_ephemeris
+from src.services.muhurta import NAKSHATRA_SPAN, TITHI_SPAN, TITHIS
+from src.services.transits import jd_to_utc
+from src.services.varga import get_ayanamsa
+from src.utils.cache import LRUCache, TieredCache
+
+YOGAS = (
+    "Vishkambha", "Priti", "Ayushman", "Saubhagya", "Shobhana", "Atiganda", "Sukarma", "Dhriti", "Shula",
+    "Ganda", "Vriddhi", "Dhruva", "Vyaghata", "Harshana", "Vajra", "Siddhi", "Vyatipata", "Variyana",
+    "Parigha", "Shiva", "Siddha", "Sadhya", "Shubha", "Shukla", "Brahma", "Indra", "Vaidhriti",
+)
+_MOVABLE_KARANAS = ("Bava", "Balava", "Kaulava", "Taitila", "Gara", "Vanija", "Vishti")
+# KARANAS[h]: karana of the h-th half tithi (0-59) of the lunar month
+KARANAS = ("Kimstughna",) + tuple(_MOVABLE_KARANAS[h % 7] for h in range(56)) + ("Shakuni", "Chatushpada", "Naga")
+VARAS = ("Somavara", "Mangalavara", "Budhavara", "Guruvara", "Shukravara", "Shanivara", "Ravivara")  # by date.weekday()
+
+# Eighth of the daytime (0 = first after sunrise) for each weekday, Monday first
+RAHU_KALAM = (1, 6, 4, 5, 3, 2, 7)
+YAMAGANDA = (3, 2, 1, 0, 6, 5, 4)
+GULIKA_KALAM = (5, 4, 3, 2, 1, 0, 6)
+
+RECORD_DTYPE = np.dtype([
+    ("sunrise", "f8"), ("sunset", "f8"),
+    ("tithi", "i1"), ("tithi_end", "f8"),
+    ("nakshatra", "i1"), ("pada", "i1"), ("nakshatra_end", "f8"),
+    ("yoga", "i1"), ("yoga_end", "f8"),
+    ("karana", "i1"),
+])
+
+panchang_cache = TieredCache("panchang", LRUCache(PANCHANG_CACHE_SIZE))
+
+
+# --------------------------
+# Computation
+# --------------------------
+def _yoga_signal(jd: float) -> Tuple[float, float]:
+    (sun, sun_speed), (moon, moon_speed) = body_signal("Sun")(jd), body_signal("Moon")(jd)
+    return (sun + moon) % 360.0, sun_speed + moon_speed
+
+
+def _rise_set(jd: float, which: int, lat: float, lon: float) -> float:
+    res, tret = swe.rise_trans(jd, swe.SUN, which, (lon, lat, 0.0))
+    if res != 0:
+        raise ValueError("The Sun does not rise or set at this place on that date")
+    return tret[0]
+
+
+def _next_level(signal, start_jd: float, level: float) -> float:
+    """First time after `start_jd` the (increasing) signal reaches `level`."""
+    def f(t: float) -> float:
+        return (signal(t)[0] - level + 180.0) % 360.0 - 180.0
+    a, fa = start_jd, f(start_jd)
+    for _ in range(12):
+        b = a + 0.25
+        fb = f(b)
+        if fb >= 0 > fa:
+            return refine_root(f, a, fa, b, fb)
+        a, fa = b, fb
+    raise ValueError("No boundary found within three days")
+
+
+def compute_record(day: date, lat: float, lon: float, tz: str, ayanamsa: str) -> np.void:
+    """The panchang record of `day` (local date) at a place."""
+    midnight = datetime_to_jd(datetime.combine(day, time()), tz)
+    sunrise = _rise_set(midnight, swe.CALC_RISE, lat, lon)
+    sunset = _rise_set(sunrise, swe.CALC_SET, lat, lon)
+    ayan = get_ayanamsa(sunrise, ayanamsa)
+
+    elongation = pair_signal("Moon", "Sun")(sunrise)[0]
+    moon = (body_signal("Moon")(sunrise)[0] - ayan) % 360
+    yoga_lon = (_yoga_signal(sunrise)[0] - 2 * ayan) % 360
+    tithi = int(elongation // TITHI_SPAN)
+    nakshatra = int(moon // NAKSHATRA_SPAN)
+    yoga = int(yoga_lon // NAKSHATRA_SPAN)
+
+    record = np.zeros((), dtype=RECORD_DTYPE)
+    record["sunrise"], record["sunset"] = sunrise, sunset
+    record["tithi"] = tithi
+    record["tithi_end"] = _next_level(pair_signal("Moon", "Sun"), sunrise, (tithi + 1) * TITHI_SPAN)
+    record["nakshatra"] = nakshatra
+    record["pada"] = int((moon % NAKSHATRA_SPAN) // (NAKSHATRA_SPAN / 4)) + 1
+    record["nakshatra_end"] = _next_level(body_signal("Moon"), sunrise, ayan + (nakshatra + 1) * NAKSHATRA_SPAN)
+    record["yoga"] = yoga
+    record["yoga_end"] = _next_level(_yoga_signal, sunrise, 2 * ayan + (yoga + 1) * NAKSHATRA_SPAN)
+    record["karana"] = int(elongation // (TITHI_SPAN / 2))
+    return record[()]
+
+
+def _span(sunrise: float, sunset: float, first: float, last: float, tz: str) -> TimeSpan:
+    length = sunset - sunrise
+    return TimeSpan(start=_local(sunrise + first * length, tz, "%H:%M:%S"), end=_local(sunrise + last * length, tz, "%H:%M:%S"))
+
+
+def _local(jd: float, tz: str, fmt: str = "%Y-%m-%d %H:%M:%S") -> str:
+    return pytz.UTC.localize(jd_to_utc(jd)).astimezone(pytz.timezone(tz)).strftime(fmt)
+
+
+def describe(record, place: str, day: date, tz: str, ayanamsa: str, source: str) -> PanchangResponse:
+    sunrise, sunset = float(record["sunrise"]), float(record["sunset"])
+    weekday = day.weekday()
+    tithi = int(record["tithi"])
+    return PanchangResponse(
+        place=place,
+        date=day.isoformat(),
+        timezone=tz,
+        ayanamsa=ayanamsa,
+        vara=VARAS[weekday],
+        sunrise=_local(sunrise, tz, "%H:%M:%S"),
+        sunset=_local(sunset, tz, "%H:%M:%S"),
+        paksha="Shukla" if tithi < 15 else "Krishna",
+        tithi=PanchangElement(number=tithi + 1, name=TITHIS[tithi], ends=_local(float(record["tithi_end"]), tz)),
+        nakshatra=PanchangElement(
+            number=int(record["nakshatra"]) + 1,
+            name=NAKSHATRAS[int(record["nakshatra"])],
+            pada=int(record["pada"]),
+            ends=_local(float(record["nakshatra_end"]), tz),
+        ),
+        yoga=PanchangElement(number=int(record["yoga"]) + 1, name=YOGAS[int(record["yoga"])], ends=_local(float(record["yoga_end"]), tz)),
+        karana=KARANAS[int(record["karana"])],
+        rahu_kalam=_span(sunrise, sunset, RAHU_KALAM[weekday] / 8, (RAHU_KALAM[weekday] + 1) / 8, tz),
+        yamaganda=_span(sunrise, sunset, YAMAGANDA[weekday] / 8, (YAMAGANDA[weekday] + 1) / 8, tz),
+        gulika_kalam=_span(sunrise, sunset, GULIKA_KALAM[weekday] / 8, (GULIKA_KALAM[weekday] + 1) / 8, tz),
+        abhijit_muhurta=_span(sunrise, sunset, 7 / 15, 8 / 15, tz),
+        source=source,
+    )
+
+
+# --------------------------
+# Precomputed city grid
+# --------------------------
+def _table_paths(directory: str) -> Tuple[str, str]:
+    return os.path.join(directory, "panchang.npy"), os.path.join(directory, "panchang.json")
+
+
+def build_panchang_table(cities: Sequence[str], start: date, days: int, ayanamsa: str, directory: str) -> None:
+    """Compute records for every city x day and write the table + index (atomically replaced)."""
+    located = []
+    for city in cities:
+        try:
+            located.append((city, *geocode_place(city)))
+        except Exception as e:
+            logging.error(f"Panchang grid: skipping {city!r}: {e}")
+    data = np.zeros((len(located), days), dtype=RECORD_DTYPE)
+    for row, (city, lat, lon, tz) in enumerate(located):
+        for d in range(days):
+            try:
+                data[row, d] = compute_record(start + timedelta(days=d), lat, lon, tz, ayanamsa)
+            except ValueError:
+                data[row, d]["sunrise"] = np.nan   # polar day/night: computed (and rejected) on request
+    npy_path, index_path = _table_paths(directory)
+    os.makedirs(directory, exist_ok=True)
+    np.save(npy_path + ".tmp.npy", data)
+    with open(index_path + ".tmp", "w", encoding="utf-8") as f:
+        json.dump({
+            "start_date": start.isoformat(),
+            "days": days,
+            "ayanamsa": ayanamsa,
+            "cities": {
+                normalize_place(city): {"row": row, "name": city, "lat": lat, "lon": lon, "tz": tz}
+                for row, (city, lat, lon, tz) in enumerate(located)
+            },
+        }, f)
+    os.replace(npy_path + ".tmp.npy", npy_path)
+    os.replace(index_path + ".tmp", index_path)
+    logging.info(f"Panchang table built: {len(located)} cities x {days} days from {start} -> {npy_path}")
+
+
+class PanchangTable:
+    """Read-only, memory-mapped view of a built table."""
+
+    def __init__(self, directory: str):
+        npy_path, index_path = _table_paths(directory)
+        with open(index_path, encoding="utf-8") as f:
+            index = json.load(f)
+        self.mtime = os.path.getmtime(index_path)
+        self.data = np.load(npy_path, mmap_mode="r")
+        self.start = date.fromisoformat(index["start_date"])
+        self.days: int = index["days"]
+        self.ayanamsa: str = index["ayanamsa"]
+        self.cities: Dict[str, dict] = index["cities"]
+
+    def city(self, place: str) -> Optional[dict]:
+        return self.cities.get(normalize_place(place))
+
+    def record(self, city: dict, day: date, ayanamsa: str) -> Optional[np.void]:
+        offset = (day - self.start).days
+        if ayanamsa != self.ayanamsa or not 0 <= offset < self.days:
+            return None
+        record = self.data[city["row"], offset]
+        return None if np.isnan(record["sunrise"]) else record
+
+
+_TABLE: Optional[PanchangTable] = None
+_TABLE_LOCK = Lock()
+
+
+def get_panchang_table() -> Optional[PanchangTable]:
+    """The current table, reloaded when the nightly build has replaced it; None if never built."""
+    global _TABLE
+    _, index_path = _table_paths(PANCHANG_TABLE_DIR)
+    try:
+        mtime = os.path.getmtime(index_path)
+    except OSError:
+        return None
+    with _TABLE_LOCK:
+        if _TABLE is None or _TABLE.mtime != mtime:
+            _TABLE = PanchangTable(PANCHANG_TABLE_DIR)
+        return _TABLE
+
+
+# --------------------------
+# Request handling
+# --------------------------
+def _today(tz: str) -> date:
+    return datetime.now(pytz.timezone(tz)).date()
+
+
+def _parse_day(value: Optional[str], tz: str) -> date:
+    if not value:
+        return _today(tz)
+    try:
+        return date.fromisoformat(value)
+    except ValueError:
+        raise ValueError(f"Invalid date {value!r}. Use YYYY-MM-DD")
+
+
+def _computed(day: date, lat: float, lon: float, tz: str, ayanamsa: str) -> np.void:
+    key = f"{day.isoformat()}|{round(lat, 4)}|{round(lon, 4)}|{tz}|{ayanamsa}"
+    record = panchang_cache.get(key)
+    if record is None:
+        record = compute_record(day, lat, lon, tz, ayanamsa)
+        panchang_cache.set(key, record)
+    return record
+
+
+async def get_panchang(place: str, day: Optional[str] = None, ayanamsa: Optional[str] = None) -> PanchangResponse:
+    """Panchang for a place and local date (default today there): grid lookup, else computed."""
+    ayanamsa = ayanamsa or PANCHANG_AYANAMSA
+    table = get_panchang_table()
+    city = table.city(place) if table is not None else None
+    if city is not None:
+        target = _parse_day(day, city["tz"])
+        record = table.record(city, target, ayanamsa)
+        if record is not None:
+            return describe(record, place, target, city["tz"], ayanamsa, "precomputed")
+    lat, lon, tz = await geocode_place_async(place)
+    target = _parse_day(day, tz)
+    record = await run_ephemeris(_computed, target, lat, lon, tz, ayanamsa)
+    return describe(record, place, target, tz, ayanamsa, "computed")
+
+
+def _main() -> None:
+    parser = argparse.ArgumentParser(description="Precompute the daily panchang table for the city grid.")
+    parser.add_argument("command", choices=["build"])
+    parser.add_argument("--cities", default=PANCHANG_CITIES, help="Comma-separated places")
+    parser.add_argument("--start", default=None, help="First date (YYYY-MM-DD); default yesterday")
+    parser.add_argument("--days", type=int, default=PANCHANG_HORIZON_DAYS)
+    parser.add_argument("--ayanamsa", default=PANCHANG_AYANAMSA)
+    parser.add_argument("--out", default=PANCHANG_TABLE_DIR)
+    args = parser.parse_args()
+    # start a day early so the grid covers "today" in timezones behind UTC
+    start = date.fromisoformat(args.start) if args.start else date.today() - timedelta(days=1)
+    cities: List[str] = [c.strip() for c in args.cities.split(",") if c.strip()]
+    build_panchang_table(cities, start, args.days, args.ayanamsa, args.out)
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    _main()
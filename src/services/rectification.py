@@ -0,0 +1,324 @@
+# src/services/rectification.py
+"""Birth-time rectification.
+
+The place is geocoded once and the uncertain time window is sampled at
+`resolution_minutes`. Every sample is scored against the known life
+events: slow transits (Mars, Jupiter, Saturn, the nodes) contacting the
+cusps of the houses an event belongs to, plus the running maha/antardasha
+lord ruling one of those houses. Between samples the exact moments where
+the ascendant or a house cusp changes sign are found by bisection; those
+boundaries cut the window into candidate windows whose signs are
+constant, and the windows are ranked by their best sample.
+
+Sampling runs in chunks on the shared process pool. Requests run as
+background jobs whose state lives in a SQLite file, so any server worker
+can answer the status poll.
+"""
+import asyncio
+import logging
+import os
+import time
+import uuid
+from datetime import timedelta
+from typing import Dict, List, Optional, Sequence, Set, Tuple
+
+import numpy as np
+import pytz
+import swisseph as swe
+
+from config import (
+    KUNDLI_BATCH_WORKERS,
+    RECTIFY_HEARTBEAT_SECONDS,
+    RECTIFY_JOB_TTL_SECONDS,
+    RECTIFY_JOBS_PATH,
+    RECTIFY_MAX_SAMPLES,
+    RECTIFY_ORB,
+)
+from src.models.rectify_model import LifeEvent, RectifyJob, RectifyRequest, RectifyResult, RectifyWindow
+from src.services.compatibility import SIGN_LORDS
+from src.services.dasha import DASHA_LORDS, dasha_at, dasha_start
+from src.services.events import TOLERANCE_DAYS
+from src.services.kundli import SIGNS, datetime_to_jd, parse_birth_datetime, planet_positions
+from src.services.kundli_async import geocode_place_async, run_ephemeris
+from src.services.kundli_batch import get_process_pool
+from src.services.transits import jd_to_utc, parse_utc, utc_to_jd
+from src.services.varga import get_ayanamsa
+from src.utils.cache import LRUCache, SQLiteCache
+
+# Houses signified by each kind of life event (1-based)
+EVENT_HOUSES = {
+    "marriage": (7, 1, 2),
+    "relationship": (7, 5),
+    "career": (10, 6),
+    "promotion": (10, 11),
+    "childbirth": (5, 9),
+    "education": (4, 5, 9),
+    "relocation": (4, 3, 12),
+    "property": (4, 2),
+    "health": (1, 6, 8),
+    "accident": (8, 6, 1),
+    "bereavement": (8, 4, 10),
+    "travel": (9, 3, 12),
+    "finance": (2, 11),
+}
+
+TRANSIT_BODIES = ("Mars", "Jupiter", "Saturn", "TrueNode")   # + Ketu, derived from the node
+ASPECT_ANGLES = (0.0, 90.0, 180.0)
+DASHA_WEIGHTS = np.array([1.0, 0.5])                        # maha, antar
+
+# SIGN_RULERS[s]: index into DASHA_LORDS of the lord of sign s
+SIGN_RULERS = np.array([DASHA_LORDS.index(lord) for lord in SIGN_LORDS])
+
+
+# --------------------------
+# Scoring (runs in pool workers)
+# --------------------------
+def cusp_signs(jd_ut: float, lat: float, lon: float, ayanamsa: float) -> Tuple[int, ...]:
+    """Sidereal sign (0-11) of the 12 house cusps; cusp 1 is the ascendant."""
+    cusps, _ = swe.houses(jd_ut, lat, lon)
+    return tuple(int(((c - ayanamsa) % 360) // 30) for c in cusps[:12])
+
+
+def sign_boundaries(t0: float, s0: tuple, t1: float, s1: tuple, lat: float, lon: float, ayanamsa: float) -> List[float]:
+    """Every moment in (t0, t1) where a cusp changes sign, by bisection to TOLERANCE_DAYS."""
+    if s0 == s1:
+        return []
+    if t1 - t0 <= TOLERANCE_DAYS:
+        return [(t0 + t1) / 2]
+    mid = (t0 + t1) / 2
+    s_mid = cusp_signs(mid, lat, lon, ayanamsa)
+    return (
+        sign_boundaries(t0, s0, mid, s_mid, lat, lon, ayanamsa)
+        + sign_boundaries(mid, s_mid, t1, s1, lat, lon, ayanamsa)
+    )
+
+
+def score_times(jds, lat: float, lon: float, ayanamsa: float, context: Dict) -> Tuple[np.ndarray, np.ndarray]:
+    """Sidereal cusp signs (T, 12) and scores (T,) for candidate birth moments `jds`.
+
+    `context` holds the events: `jds` (E,), `transits` (E, 5) tropical
+    longitudes, `houses` (E lists of 1-based houses) and `weights` (E,).
+    """
+    jds = np.atleast_1d(np.asarray(jds, dtype=float))
+    cusps = np.array([swe.houses(jd, lat, lon)[0][:12] for jd in jds.tolist()])
+    signs = (((cusps - ayanamsa) % 360) // 30).astype(np.intp)
+    moons, _ = planet_positions(jds, ["Moon"])
+    first_lords, cycle_starts, _ = dasha_start(moons[:, 0] - ayanamsa, jds)
+
+    scores = np.zeros(len(jds))
+    for event_jd, transits, houses, weight in zip(context["jds"], context["transits"], context["houses"], context["weights"]):
+        idx = np.asarray(houses, dtype=np.intp) - 1
+        # transit contacts: (T, bodies, houses) angular distance to the nearest hard aspect
+        sep = np.abs((np.asarray(transits)[None, :, None] - cusps[:, None, idx] + 180) % 360 - 180)
+        deviation = np.min([np.abs(sep - a) for a in ASPECT_ANGLES], axis=0)
+        contact = np.clip(1 - deviation / RECTIFY_ORB, 0, None).sum(axis=(1, 2))
+        # dasha: running maha/antar lord rules one of the event's houses
+        lords, _, _ = dasha_at(first_lords, cycle_starts, event_jd, levels=2)
+        rules = (lords[:, :, None] == SIGN_RULERS[signs[:, idx]][:, None, :]).any(axis=2)
+        scores += weight * (contact + rules @ DASHA_WEIGHTS)
+    return signs, scores
+
+
+def _scan_chunk(jds: np.ndarray, lat: float, lon: float, ayanamsa: float, context: Dict):
+    """Worker entry point: score a run of samples and bisect the sign changes between them."""
+    signs, scores = score_times(jds, lat, lon, ayanamsa, context)
+    states = [tuple(row) for row in signs.tolist()]
+    boundaries = []
+    for k in range(len(jds) - 1):
+        boundaries += sign_boundaries(jds[k], states[k], jds[k + 1], states[k + 1], lat, lon, ayanamsa)
+    return signs, scores, boundaries
+
+
+# --------------------------
+# Search
+# --------------------------
+def _event_context(events: Sequence[LifeEvent], jd: float, ayanamsa_name: str) -> Tuple[float, Dict]:
+    """Ayanamsa for the window and the per-event inputs of `score_times` (transits computed once)."""
+    event_jds = np.array([utc_to_jd(parse_utc(e.date)) + 0.5 for e in events])
+    longitudes, _ = planet_positions(event_jds, TRANSIT_BODIES)
+    transits = np.concatenate([longitudes, (longitudes[:, -1:] + 180) % 360], axis=1)
+    return get_ayanamsa(jd, ayanamsa_name), {
+        "jds": event_jds,
+        "transits": transits,
+        "houses": [EVENT_HOUSES[e.kind] for e in events],
+        "weights": np.array([e.weight for e in events]),
+    }
+
+
+def _window_jds(req: RectifyRequest, tz: str) -> Tuple[float, float]:
+    start = datetime_to_jd(parse_birth_datetime(req.birth_date, req.window_start), tz)
+    end = datetime_to_jd(parse_birth_datetime(req.birth_date, req.window_end), tz)
+    if end <= start:
+        end += 1.0   # window crosses midnight
+    return start, end
+
+
+def _sample_count(start_jd: float, end_jd: float, resolution_minutes: float) -> int:
+    count = int((end_jd - start_jd) * 1440 / resolution_minutes + 1e-6) + 1
+    if count > RECTIFY_MAX_SAMPLES:
+        raise ValueError(f"Window needs {count} samples (max {RECTIFY_MAX_SAMPLES}); use a coarser resolution")
+    return count
+
+
+def _local(jd: float, tz: str) -> str:
+    utc = pytz.UTC.localize(jd_to_utc(jd))
+    return utc.astimezone(pytz.timezone(tz)).strftime("%Y-%m-%d %H:%M:%S")
+
+
+async def _scan(jds: np.ndarray, lat: float, lon: float, ayanamsa: float, context: Dict):
+    """Split the samples over the process pool; chunks share their edge sample so no gap goes unbisected."""
+    pool = get_process_pool()
+    chunks = max(1, min(KUNDLI_BATCH_WORKERS, len(jds) // 32))
+    edges = np.linspace(0, len(jds) - 1, chunks + 1).round().astype(int)
+    loop = asyncio.get_running_loop()
+    parts = await asyncio.gather(*(
+        loop.run_in_executor(pool, _scan_chunk, jds[a:b + 1], lat, lon, ayanamsa, context)
+        for a, b in zip(edges[:-1], edges[1:])
+    ))
+    signs = np.concatenate([parts[0][0]] + [p[0][1:] for p in parts[1:]])
+    scores = np.concatenate([parts[0][1]] + [p[1][1:] for p in parts[1:]])
+    boundaries = sorted(b for p in parts for b in p[2])
+    return signs, scores, boundaries
+
+
+async def rectify(req: RectifyRequest) -> RectifyResult:
+    lat, lon, tz = await geocode_place_async(req.place)
+    start_jd, end_jd = _window_jds(req, tz)
+    count = _sample_count(start_jd, end_jd, req.resolution_minutes)
+    jds = start_jd + np.arange(count) * (req.resolution_minutes / 1440)
+    ayanamsa, context = await run_ephemeris(_event_context, req.life_events, start_jd, req.ayanamsa)
+
+    signs, scores, boundaries = await _scan(jds, lat, lon, ayanamsa, context)
+
+    # candidate windows: spans between consecutive boundaries; the best sample inside
+    # each, or its midpoint when the span is narrower than the resolution
+    edges = np.array([start_jd] + boundaries + [jds[-1] + TOLERANCE_DAYS])
+    first = np.searchsorted(jds, edges[:-1], side="left")
+    last = np.searchsorted(jds, edges[1:], side="left")
+    empty = np.flatnonzero(last <= first)
+    if len(empty):
+        mids = (edges[empty] + edges[empty + 1]) / 2
+        mid_signs, mid_scores = await run_ephemeris(score_times, mids, lat, lon, ayanamsa, context)
+    best_jd = np.empty(len(first))
+    best_score = np.empty(len(first))
+    best_signs = np.empty((len(first), 12), dtype=np.intp)
+    for w, (a, b) in enumerate(zip(first.tolist(), last.tolist())):
+        if b > a:
+            k = a + int(np.argmax(scores[a:b]))
+            best_jd[w], best_score[w], best_signs[w] = jds[k], scores[k], signs[k]
+    if len(empty):
+        best_jd[empty], best_score[empty], best_signs[empty] = mids, mid_scores, mid_signs
+
+    order = np.argsort(-best_score, kind="stable")[:req.top_k]
+    candidates = [
+        RectifyWindow(
+            start=_local(edges[w], tz),
+            end=_local(min(edges[w + 1], end_jd), tz),
+            best_time=_local(best_jd[w], tz),
+            score=round(float(best_score[w]), 3),
+            ascendant_sign=SIGNS[best_signs[w, 0]],
+            cusp_signs=[SIGNS[s] for s in best_signs[w]],
+        )
+        for w in order.tolist()
+    ]
+    return RectifyResult(timezone=tz, samples=count, boundaries=len(boundaries), candidates=candidates)
+
+
+# --------------------------
+# Jobs
+# --------------------------
+# Records are {"job": RectifyJob, "owner_pid", "heartbeat_at"}. The store is shared by every
+# worker (SQLite), so it is only touched from worker threads: a busy lock held by another
+# worker must not stall the event loop.
+job_store = (
+    SQLiteCache(RECTIFY_JOBS_PATH, ttl=RECTIFY_JOB_TTL_SECONDS, table="rectify_jobs")
+    if RECTIFY_JOBS_PATH else LRUCache(1024, ttl=RECTIFY_JOB_TTL_SECONDS)
+)
+_running: Set[asyncio.Task] = set()
+_live_jobs: Set[str] = set()      # ids of the jobs this process is running
+
+_WORKER_GONE = "The worker running this job stopped before it finished; please resubmit."
+
+
+def _record(job: RectifyJob) -> Dict:
+    return {"job": job.model_dump(), "owner_pid": os.getpid(), "heartbeat_at": time.time()}
+
+
+async def _save(job: RectifyJob) -> None:
+    await asyncio.to_thread(job_store.set, job.job_id, _record(job))
+
+
+def _is_orphaned(record: Dict) -> bool:
+    """A queued/running job whose worker is gone: its id is not live in this process although
+    this process owns it (restarted with the same pid), or its heartbeat went silent."""
+    if record["job"]["status"] not in ("queued", "running"):
+        return False
+    if record.get("owner_pid") == os.getpid():
+        return record["job"]["job_id"] not in _live_jobs
+    return time.time() - record.get("heartbeat_at", 0.0) > 3 * RECTIFY_HEARTBEAT_SECONDS
+
+
+async def get_rectification_job(job_id: str) -> Optional[RectifyJob]:
+    record = await asyncio.to_thread(job_store.get, job_id)
+    if record is None:
+        return None
+    job = RectifyJob(**record["job"])
+    if _is_orphaned(record):
+        job.status, job.error = "failed", _WORKER_GONE
+    return job
+
+
+async def _heartbeat(job: RectifyJob, stop: asyncio.Event) -> None:
+    while not stop.is_set():
+        try:
+            await asyncio.wait_for(stop.wait(), RECTIFY_HEARTBEAT_SECONDS)
+        except asyncio.TimeoutError:
+            await _save(job)
+
+
+async def _run_job(job: RectifyJob, req: RectifyRequest) -> None:
+    _live_jobs.add(job.job_id)
+    stop = asyncio.Event()
+    beat = asyncio.create_task(_heartbeat(job, stop))
+    try:
+        job.status = "running"
+        await _save(job)
+        try:
+            job.result = await rectify(req)
+            job.status = "done"
+        except Exception as e:
+            logging.error(f"Rectification job {job.job_id} failed: {e}")
+            job.status, job.error = "failed", str(e)
+        # let an in-flight heartbeat land first so it cannot overwrite the final status
+        stop.set()
+        await beat
+        await _save(job)
+    except asyncio.CancelledError:
+        # worker shutting down: leave a terminal status rather than "running" until the TTL
+        beat.cancel()
+        job.status, job.error = "failed", _WORKER_GONE
+        job_store.set(job.job_id, _record(job))
+        raise
+    finally:
+        _live_jobs.discard(job.job_id)
+
+
+async def submit_rectification(req: RectifyRequest) -> RectifyJob:
+    """Validate the request, queue it as a background job and return the job record."""
+    parse_birth_datetime(req.birth_date, req.window_start)
+    parse_birth_datetime(req.birth_date, req.window_end)
+    for event in req.life_events:
+        parse_utc(event.date)
+    # window size in local time; the exact JD range is fixed once the place is known
+    span = parse_birth_datetime(req.birth_date, req.window_end) - parse_birth_datetime(req.birth_date, req.window_start)
+    if span <= timedelta(0):
+        span += timedelta(days=1)
+    _sample_count(0.0, span.total_seconds() / 86400, req.resolution_minutes)
+
+    job = RectifyJob(job_id=uuid.uuid4().hex, status="queued", created_at=time.time())
+    _live_jobs.add(job.job_id)
+    await _save(job)
+    task = asyncio.create_task(_run_job(job, req))
+    _running.add(task)
+    task.add_done_callback(_running.discard)
+    return job
@@ -0,0 +1,163 @@
+# src/services/transits.py
+"""Planetary time series, computed and streamed chunk by chunk.
+
+Pipeline (all generators, so memory stays flat for decade-long ranges):
+    _time_grid -> _positions -> _records -> NDJSON lines
+"""
+import re
+from datetime import datetime, timedelta, timezone
+from typing import Iterator, List, Optional, Tuple
+
+import numpy as np
+import swisseph as swe
+
+from config import TRANSIT_MAX_STEPS
+from src.models.transit_model import (
+    TransitAspect,
+    TransitEvent,
+    TransitPosition,
+    TransitRecord,
+    TransitRequest,
+)
+from src.services.kundli import PLANETS, SIGNS, aspect_engine_for, get_nakshatra, planet_positions
+
+_CHUNK = 512
+_STEP_RE = re.compile(r"^\s*(\d+(?:\.\d+)?)\s*([dhm])\s*$")
+_JD_EPOCH, _JD_EPOCH_JD = datetime(2000, 1, 1), 2451544.5
+_STEP_UNITS = {"d": timedelta(days=1), "h": timedelta(hours=1), "m": timedelta(minutes=1)}
+
+
+def parse_step(step: str) -> timedelta:
+    match = _STEP_RE.match(step or "")
+    if not match:
+        raise ValueError(f"Invalid step {step!r}. Use e.g. '1d', '6h' or '30m'")
+    value = float(match.group(1)) * _STEP_UNITS[match.group(2)]
+    if value <= timedelta(0):
+        raise ValueError("Step must be positive")
+    return value
+
+
+def parse_utc(value: str) -> datetime:
+    try:
+        dt = datetime.fromisoformat(value)
+    except ValueError:
+        raise ValueError(f"Invalid datetime {value!r}. Use ISO format, e.g. 2025-01-01T00:00")
+    if dt.tzinfo is not None:
+        dt = dt.astimezone(timezone.utc).replace(tzinfo=None)
+    return dt
+
+
+def utc_to_jd(dt: datetime) -> float:
+    hour = dt.hour + dt.minute / 60 + dt.second / 3600 + dt.microsecond / 3.6e9
+    return swe.julday(dt.year, dt.month, dt.day, hour)
+
+
+def jd_to_utc(jd: float) -> datetime:
+    """Naive UTC datetime for a Julian day, rounded to the second."""
+    return _JD_EPOCH + timedelta(seconds=round((jd - _JD_EPOCH_JD) * 86400))
+
+
+class TransitQuery:
+    """Validated request: time grid, bodies and the optional natal aspect setup."""
+
+    def __init__(self, req: TransitRequest):
+        self.start = parse_utc(req.start)
+        self.end = parse_utc(req.end)
+        self.step = parse_step(req.step)
+        if self.end < self.start:
+            raise ValueError("end must not be before start")
+        self.n_steps = int((self.end - self.start) / self.step) + 1
+        if self.n_steps > TRANSIT_MAX_STEPS:
+            raise ValueError(f"Range has {self.n_steps} steps (max {TRANSIT_MAX_STEPS}); use a larger step")
+
+        self.bodies = list(req.bodies or PLANETS)
+        unknown = [b for b in self.bodies if b not in PLANETS]
+        if unknown:
+            raise ValueError(f"Unknown bodies: {', '.join(unknown)}")
+
+        self.natal_names = list(req.natal or {})
+        self.natal_lons = np.array([req.natal[n] for n in self.natal_names]) if req.natal else None
+        self.engine = aspect_engine_for(req.aspects) if req.natal else None
+        self.events_only = req.events_only
+        self.jd_start = utc_to_jd(self.start)
+        self.step_days = self.step / timedelta(days=1)
+
+
+def _time_grid(q: TransitQuery) -> Iterator[Tuple[int, np.ndarray]]:
+    for first in range(0, q.n_steps, _CHUNK):
+        k = np.arange(first, min(first + _CHUNK, q.n_steps))
+        yield first, q.jd_start + k * q.step_days
+
+
+def _positions(q: TransitQuery, grid) -> Iterator[Tuple[int, np.ndarray, np.ndarray, np.ndarray]]:
+    for first, jds in grid:
+        lons, speeds = planet_positions(jds, q.bodies)
+        yield first, jds, lons, speeds
+
+
+def _aspects_by_step(q: TransitQuery, lons: np.ndarray, speeds: np.ndarray) -> List[List[TransitAspect]]:
+    out: List[List[TransitAspect]] = [[] for _ in range(len(lons))]
+    if q.engine is None:
+        return out
+    hits = q.engine.match(
+        lons,
+        q.natal_lons,
+        speed_a=speeds,
+        speed_b=np.zeros(len(q.natal_names)),
+        names_a=q.bodies,
+        names_b=q.natal_names,
+    )
+    for n in range(len(hits)):
+        out[hits.batch[n]].append(TransitAspect(
+            transit=q.bodies[hits.i[n]],
+            natal=q.natal_names[hits.j[n]],
+            type=hits.names[hits.aspect[n]],
+            angle=float(hits.separation[n]),
+            orb=float(hits.orb[n]),
+            applying=bool(hits.applying[n]),
+        ))
+    return out
+
+
+def _records(q: TransitQuery, chunks) -> Iterator[TransitRecord]:
+    prev_sign: List[Optional[int]] = [None] * len(q.bodies)
+    prev_retro: List[Optional[bool]] = [None] * len(q.bodies)
+    for first, jds, lons, speeds in chunks:
+        aspects = _aspects_by_step(q, lons, speeds)
+        for t in range(len(jds)):
+            events: List[TransitEvent] = []
+            positions = {}
+            for b, body in enumerate(q.bodies):
+                lon, speed = float(lons[t, b]), float(speeds[t, b])
+                sign_idx, retro = int(lon // 30), speed < 0
+                if prev_sign[b] is not None and sign_idx != prev_sign[b]:
+                    events.append(TransitEvent(body=body, event="sign_change", previous=SIGNS[prev_sign[b]], current=SIGNS[sign_idx]))
+                if prev_retro[b] is not None and retro != prev_retro[b]:
+                    events.append(TransitEvent(body=body, event="retrograde" if retro else "direct"))
+                prev_sign[b], prev_retro[b] = sign_idx, retro
+                if not q.events_only:
+                    nakshatra, pada = get_nakshatra(lon)
+                    positions[body] = TransitPosition(
+                        longitude=lon,
+                        sign=SIGNS[sign_idx],
+                        degree=lon % 30,
+                        nakshatra=nakshatra,
+                        pada=pada,
+                        retrograde=retro,
+                        speed=speed,
+                    )
+            if q.events_only and not events:
+                continue
+            yield TransitRecord(
+                time=(q.start + (first + t) * q.step).isoformat(),
+                julian_day=float(jds[t]),
+                positions=positions,
+                events=events,
+                aspects=[] if q.events_only else aspects[t],
+            )
+
+
+def stream_transits(q: TransitQuery) -> Iterator[str]:
+    """NDJSON lines, one per timestamp (or per timestamp with events when `events_only`)."""
+    for record in _records(q, _positions(q, _time_grid(q))):
+        yield record.model_dump_json() + "\n"
@@ -0,0 +1,114 @@
+# src/services/varga.py
+"""Divisional (varga) charts and sidereal conversion.
+
+Every varga is a (12, n) lookup table: the sign a longitude falls in for
+each D1 sign and each of its n parts. Sign placements for any number of
+vargas come from the chart's base longitudes with one fancy-indexing
+step per varga, no extra ephemeris calls. D30 has unequal parts on whole
+degrees, so its table uses 30 one-degree parts.
+
+Sign numbering: 0 = Aries ... 11 = Pisces, as in `SIGNS`.
+"""
+from threading import Lock
+from typing import Dict, Iterable, List
+
+import numpy as np
+import swisseph as swe
+
+
+def _table(n: int, start) -> np.ndarray:
+    """(12, n) table where part k of sign s falls in sign start(s) + k."""
+    table = np.empty((12, n), dtype=np.int8)
+    for sign in range(12):
+        table[sign] = (start(sign) + np.arange(n)) % 12
+    return table
+
+
+def _odd(sign: int) -> bool:
+    # Aries, Gemini, ... are the odd signs (index 0, 2, ...)
+    return sign % 2 == 0
+
+
+def _modality(sign: int, movable: int, fixed: int, dual: int) -> int:
+    return (movable, fixed, dual)[sign % 3]
+
+
+def _element(sign: int, fire: int, earth: int, air: int, water: int) -> int:
+    return (fire, earth, air, water)[sign % 4]
+
+
+def _hora() -> np.ndarray:
+    table = np.empty((12, 2), dtype=np.int8)
+    for sign in range(12):
+        table[sign] = (4, 3) if _odd(sign) else (3, 4)  # Leo (Sun) / Cancer (Moon)
+    return table
+
+
+def _trimsamsa() -> np.ndarray:
+    # (degrees, sign) runs: Mars, Saturn, Jupiter, Mercury, Venus in odd signs, reversed in even
+    odd = [(5, 0), (5, 10), (8, 8), (7, 2), (5, 6)]
+    even = [(5, 1), (7, 5), (8, 11), (5, 9), (5, 7)]
+    table = np.empty((12, 30), dtype=np.int8)
+    for sign in range(12):
+        runs = odd if _odd(sign) else even
+        table[sign] = np.repeat([s for _, s in runs], [d for d, _ in runs])
+    return table
+
+
+VARGAS: Dict[str, np.ndarray] = {
+    "D1": _table(1, lambda s: s),
+    "D2": _hora(),
+    "D3": np.array([[(s + 4 * k) % 12 for k in range(3)] for s in range(12)], dtype=np.int8),
+    "D4": np.array([[(s + 3 * k) % 12 for k in range(4)] for s in range(12)], dtype=np.int8),
+    "D7": _table(7, lambda s: s if _odd(s) else s + 6),
+    "D9": _table(9, lambda s: _element(s, 0, 9, 6, 3)),
+    "D10": _table(10, lambda s: s if _odd(s) else s + 8),
+    "D12": _table(12, lambda s: s),
+    "D16": _table(16, lambda s: _modality(s, 0, 4, 8)),
+    "D20": _table(20, lambda s: _modality(s, 0, 8, 4)),
+    "D24": _table(24, lambda s: 4 if _odd(s) else 3),
+    "D27": _table(27, lambda s: _element(s, 0, 3, 6, 9)),
+    "D30": _trimsamsa(),
+    "D40": _table(40, lambda s: 0 if _odd(s) else 6),
+    "D45": _table(45, lambda s: _modality(s, 0, 4, 8)),
+    "D60": _table(60, lambda s: s),
+}
+
+AYANAMSAS = {
+    "lahiri": swe.SIDM_LAHIRI,
+    "raman": swe.SIDM_RAMAN,
+    "krishnamurti": swe.SIDM_KRISHNAMURTI,
+}
+
+# swe.set_sid_mode is process-global state
+_SID_LOCK = Lock()
+
+
+def validate_vargas(names: Iterable[str]) -> List[str]:
+    names = [n.upper() for n in names]
+    unknown = [n for n in names if n not in VARGAS]
+    if unknown:
+        raise ValueError(f"Unknown varga(s): {', '.join(unknown)}. Supported: {', '.join(VARGAS)}")
+    return list(dict.fromkeys(names))
+
+
+def get_ayanamsa(jd_ut: float, name: str = "lahiri") -> float:
+    """Ayanamsa in degrees at `jd_ut`, to subtract from tropical longitudes."""
+    if name not in AYANAMSAS:
+        raise ValueError(f"Unknown ayanamsa: {name}. Supported: {', '.join(AYANAMSAS)}")
+    with _SID_LOCK:
+        swe.set_sid_mode(AYANAMSAS[name], 0, 0)
+        return swe.get_ayanamsa_ut(jd_ut)
+
+
+def varga_signs(longitudes, names: Iterable[str]) -> Dict[str, np.ndarray]:
+    """Sign index per longitude for each varga in `names`; works on any array shape."""
+    lons = np.asarray(longitudes, dtype=float) % 360
+    sign = (lons // 30).astype(np.intp)
+    within = lons % 30
+    out = {}
+    for name in validate_vargas(names):
+        table = VARGAS[name]
+        part = np.minimum((within * table.shape[1] // 30).astype(np.intp), table.shape[1] - 1)
+        out[name] = table[sign, part]
+    return out
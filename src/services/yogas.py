@@ -0,0 +1,279 @@
+# src/services/yogas.py
+"""Declarative yoga / dosha rules, compiled to NumPy predicates.
+
+Rules are plain data (see RULES). `compile_rule` turns a rule tree into a
+function of a ChartArrays batch returning one bool per chart, so a rule
+costs a handful of array operations whatever the number of charts.
+`screen` packs every rule's result into one uint64 bitmask per chart.
+
+Rule language (bodies: PLANET_NAMES, "Rahu", "Ketu", "Ascendant"):
+    {"all": [rule, ...]}, {"any": [rule, ...]}, {"not": rule}
+    {"house_from": {"planet": P, "from": Q, "houses": [..]}}   sign count from Q (Q's sign = 1)
+    {"in_house": {"planet": P, "houses": [..]}}                 house from the chart's cusps
+    {"same_sign": [P, Q, ...]}
+    {"hemmed": {"axis": [A, B], "planets": [..]}}              all planets on one side of the A-B axis
+    {"empty_from": {"from": Q, "houses": [..], "planets": [..]}}  none of the planets there
+    {"retrograde": P}
+    {"transit_house_from": {"planet": P, "from": Q, "houses": [..]}}  transiting P from natal Q
+"""
+import asyncio
+from datetime import datetime, timezone
+from typing import Callable, Dict, List, Optional, Sequence
+
+import numpy as np
+
+from config import KUNDLI_BATCH_MAX_ITEMS
+from src.models.kundli_model import BirthDetails
+from src.models.yoga_model import YogaHit, YogaRequest, YogaResult
+from src.services.kundli import PLANET_NAMES, ChartCore, get_chart_core, planet_positions
+from src.services.kundli_async import locate_birth_async, run_ephemeris
+from src.services.transits import parse_utc, utc_to_jd
+from src.services.varga import get_ayanamsa
+
+BODIES = PLANET_NAMES + ("Rahu", "Ketu", "Ascendant")
+_INDEX = {name: i for i, name in enumerate(BODIES)}
+_INDEX["TrueNode"] = _INDEX["Rahu"]
+_RAHU = PLANET_NAMES.index("TrueNode")
+
+SEVEN_PLANETS = ["Sun", "Moon", "Mars", "Mercury", "Jupiter", "Venus", "Saturn"]
+
+RULES: Dict[str, dict] = {
+    "manglik": {
+        "label": "Manglik (Kuja) Dosha",
+        "kind": "dosha",
+        "description": "Mars in the 1st, 2nd, 4th, 7th, 8th or 12th from the Ascendant or the Moon.",
+        "when": {"any": [
+            {"house_from": {"planet": "Mars", "from": "Ascendant", "houses": [1, 2, 4, 7, 8, 12]}},
+            {"house_from": {"planet": "Mars", "from": "Moon", "houses": [1, 2, 4, 7, 8, 12]}},
+        ]},
+    },
+    "kaal_sarp": {
+        "label": "Kaal Sarp Dosha",
+        "kind": "dosha",
+        "description": "All seven planets hemmed on one side of the Rahu-Ketu axis.",
+        "when": {"hemmed": {"axis": ["Rahu", "Ketu"], "planets": SEVEN_PLANETS}},
+    },
+    "sade_sati": {
+        "label": "Sade Sati",
+        "kind": "dosha",
+        "description": "Transiting Saturn in the 12th, 1st or 2nd from the natal Moon.",
+        "when": {"transit_house_from": {"planet": "Saturn", "from": "Moon", "houses": [12, 1, 2]}},
+    },
+    "kemadruma": {
+        "label": "Kemadruma Yoga",
+        "kind": "dosha",
+        "description": "No planet other than the Sun and nodes in the 2nd or 12th from the Moon.",
+        "when": {"empty_from": {"from": "Moon", "houses": [2, 12], "planets": ["Mars", "Mercury", "Jupiter", "Venus", "Saturn"]}},
+    },
+    "guru_chandala": {
+        "label": "Guru Chandala Yoga",
+        "kind": "dosha",
+        "description": "Jupiter conjunct Rahu or Ketu in one sign.",
+        "when": {"any": [{"same_sign": ["Jupiter", "Rahu"]}, {"same_sign": ["Jupiter", "Ketu"]}]},
+    },
+    "gaja_kesari": {
+        "label": "Gaja Kesari Yoga",
+        "kind": "yoga",
+        "description": "Jupiter in a kendra (1st, 4th, 7th, 10th) from the Moon.",
+        "when": {"house_from": {"planet": "Jupiter", "from": "Moon", "houses": [1, 4, 7, 10]}},
+    },
+    "budha_aditya": {
+        "label": "Budha Aditya Yoga",
+        "kind": "yoga",
+        "description": "Sun and Mercury in the same sign.",
+        "when": {"same_sign": ["Sun", "Mercury"]},
+    },
+    "chandra_mangala": {
+        "label": "Chandra Mangala Yoga",
+        "kind": "yoga",
+        "description": "Moon and Mars in the same sign.",
+        "when": {"same_sign": ["Moon", "Mars"]},
+    },
+}
+
+
+class ChartArrays:
+    """Longitudes / signs / houses of BODIES for N charts, plus optional transit longitudes."""
+
+    def __init__(self, longitudes: np.ndarray, speeds: np.ndarray, houses: np.ndarray, transit: Optional[np.ndarray] = None):
+        self.longitudes = longitudes            # (N, len(BODIES))
+        self.speeds = speeds
+        self.signs = (longitudes // 30).astype(np.int8)
+        self.houses = houses
+        self.transit = transit                  # (N or 1, len(BODIES)), or None
+
+    def __len__(self) -> int:
+        return len(self.longitudes)
+
+    @classmethod
+    def from_positions(cls, longitudes, speeds, cusps, ascendants, transit_longitudes=None) -> "ChartArrays":
+        """Build from PLANET_NAMES-ordered arrays: longitudes/speeds (N, P), cusps (N, 12), ascendants (N,)."""
+        lons = np.asarray(longitudes, dtype=float) % 360
+        speeds = np.asarray(speeds, dtype=float)
+        ketu = (lons[:, _RAHU] + 180) % 360
+        all_lons = np.column_stack([lons, lons[:, _RAHU], ketu, np.asarray(ascendants, dtype=float) % 360])
+        all_speeds = np.column_stack([speeds, speeds[:, _RAHU], speeds[:, _RAHU], np.zeros(len(lons))])
+
+        cusps = np.asarray(cusps, dtype=float)
+        offsets = (cusps - cusps[:, :1]) % 360
+        positions = (all_lons - cusps[:, :1]) % 360
+        houses = (positions[:, :, None] >= offsets[:, None, :]).sum(-1).astype(np.int8)
+
+        transit = None
+        if transit_longitudes is not None:
+            t = np.atleast_2d(np.asarray(transit_longitudes, dtype=float)) % 360
+            transit = np.column_stack([t, t[:, _RAHU], (t[:, _RAHU] + 180) % 360, np.full(len(t), np.nan)])
+        return cls(all_lons, all_speeds, houses, transit)
+
+    @classmethod
+    def from_cores(cls, cores: Sequence[ChartCore], transit_longitudes=None) -> "ChartArrays":
+        return cls.from_positions(
+            np.stack([c.planets["longitude"] for c in cores]),
+            np.stack([c.planets["speed"] for c in cores]),
+            np.stack([c.cusps for c in cores]),
+            np.array([c.ascendant for c in cores]),
+            transit_longitudes,
+        )
+
+
+Predicate = Callable[[ChartArrays], np.ndarray]
+
+
+def _body(name: str) -> int:
+    if name not in _INDEX:
+        raise ValueError(f"Unknown body in rule: {name}")
+    return _INDEX[name]
+
+
+def _houses_mask(houses: Sequence[int]) -> np.ndarray:
+    mask = np.zeros(13, dtype=bool)
+    mask[list(houses)] = True
+    return mask
+
+
+def compile_rule(node: dict) -> Predicate:
+    """Compile a rule tree to a predicate over ChartArrays. Raises ValueError for bad rules."""
+    if len(node) != 1:
+        raise ValueError(f"Rule node must have exactly one operator: {node}")
+    (op, arg), = node.items()
+
+    if op in ("all", "any"):
+        parts = [compile_rule(n) for n in arg]
+        combine = np.logical_and.reduce if op == "all" else np.logical_or.reduce
+        return lambda c: combine([p(c) for p in parts])
+    if op == "not":
+        inner = compile_rule(arg)
+        return lambda c: ~inner(c)
+    if op == "house_from":
+        p, q, mask = _body(arg["planet"]), _body(arg["from"]), _houses_mask(arg["houses"])
+        return lambda c: mask[(c.signs[:, p] - c.signs[:, q]) % 12 + 1]
+    if op == "in_house":
+        p, mask = _body(arg["planet"]), _houses_mask(arg["houses"])
+        return lambda c: mask[c.houses[:, p]]
+    if op == "same_sign":
+        idx = [_body(n) for n in arg]
+        return lambda c: (c.signs[:, idx] == c.signs[:, idx[:1]]).all(axis=1)
+    if op == "hemmed":
+        a, b = _body(arg["axis"][0]), _body(arg["axis"][1])
+        idx = [_body(n) for n in arg["planets"]]
+
+        def hemmed(c: ChartArrays) -> np.ndarray:
+            span = (c.longitudes[:, b] - c.longitudes[:, a]) % 360
+            rel = (c.longitudes[:, idx] - c.longitudes[:, a, None]) % 360
+            inside = rel < span[:, None]
+            return inside.all(axis=1) | (~inside).all(axis=1)
+        return hemmed
+    if op == "empty_from":
+        q, mask = _body(arg["from"]), _houses_mask(arg["houses"])
+        idx = [_body(n) for n in arg["planets"]]
+        return lambda c: ~mask[(c.signs[:, idx] - c.signs[:, q, None]) % 12 + 1].any(axis=1)
+    if op == "retrograde":
+        p = _body(arg)
+        return lambda c: c.speeds[:, p] < 0
+    if op == "transit_house_from":
+        p, q, mask = _body(arg["planet"]), _body(arg["from"]), _houses_mask(arg["houses"])
+
+        def transit(c: ChartArrays) -> np.ndarray:
+            if c.transit is None:
+                return np.zeros(len(c), dtype=bool)
+            signs = (c.transit[:, p] // 30).astype(np.int8)
+            return mask[(signs - c.signs[:, q]) % 12 + 1]
+        return transit
+    raise ValueError(f"Unknown rule operator: {op}")
+
+
+_COMPILED: Dict[str, Predicate] = {name: compile_rule(rule["when"]) for name, rule in RULES.items()}
+RULE_BITS = {name: 1 << i for i, name in enumerate(RULES)}
+
+
+def validate_rules(names: Optional[Sequence[str]]) -> List[str]:
+    if not names:
+        return list(RULES)
+    unknown = [n for n in names if n not in RULES]
+    if unknown:
+        raise ValueError(f"Unknown rule(s): {', '.join(unknown)}. Supported: {', '.join(RULES)}")
+    return list(dict.fromkeys(names))
+
+
+def evaluate(charts: ChartArrays, names: Optional[Sequence[str]] = None) -> Dict[str, np.ndarray]:
+    """Bool array (N,) per rule name."""
+    return {name: _COMPILED[name](charts) for name in validate_rules(names)}
+
+
+def screen(charts: ChartArrays, names: Optional[Sequence[str]] = None) -> np.ndarray:
+    """One uint64 per chart with bit RULE_BITS[name] set for every rule that holds."""
+    mask = np.zeros(len(charts), dtype=np.uint64)
+    for name, hit in evaluate(charts, names).items():
+        mask |= np.where(hit, np.uint64(RULE_BITS[name]), np.uint64(0))
+    return mask
+
+
+def present_rules(charts: ChartArrays, names: Optional[Sequence[str]] = None) -> List[List[str]]:
+    """Names of the rules that hold, per chart."""
+    results = evaluate(charts, names)
+    return [[name for name, hit in results.items() if hit[n]] for n in range(len(charts))]
+
+
+# --------------------------
+# Request handling
+# --------------------------
+def sidereal_chart(jd_ut: float, lat: float, lon: float, ayanamsa: str = "lahiri") -> ChartCore:
+    core = get_chart_core(jd_ut, lat, lon)
+    return core.sidereal(get_ayanamsa(core.julian_day, ayanamsa))
+
+
+def transit_longitudes(at_jd: float, ayanamsa: str = "lahiri") -> np.ndarray:
+    """Sidereal PLANET_NAMES longitudes at `at_jd`, shape (1, P)."""
+    lons, _ = planet_positions([at_jd])
+    return (lons - get_ayanamsa(at_jd, ayanamsa)) % 360
+
+
+def describe_hits(names: Sequence[str]) -> List[YogaHit]:
+    return [YogaHit(name=n, label=RULES[n]["label"], kind=RULES[n]["kind"], description=RULES[n]["description"]) for n in names]
+
+
+def detect_for_cores(cores: Sequence[ChartCore], at_jd: float, ayanamsa: str, rules: Optional[Sequence[str]] = None) -> List[List[str]]:
+    """Rule names present per (sidereal) chart, with transits at `at_jd`."""
+    charts = ChartArrays.from_cores(cores, transit_longitudes(at_jd, ayanamsa))
+    return present_rules(charts, rules)
+
+
+async def sidereal_chart_for_birth(birth: BirthDetails, ayanamsa: str = "lahiri") -> ChartCore:
+    jd_ut, lat, lon, _ = await locate_birth_async(birth.birth_date, birth.birth_time, birth.place)
+    return await run_ephemeris(sidereal_chart, jd_ut, lat, lon, ayanamsa)
+
+
+async def detect_yogas_async(req: YogaRequest) -> List[YogaResult]:
+    """Resolve every birth concurrently, then evaluate all rules over the whole batch at once."""
+    if len(req.items) > KUNDLI_BATCH_MAX_ITEMS:
+        raise ValueError(f"Too many items: {len(req.items)} (max {KUNDLI_BATCH_MAX_ITEMS})")
+    rules = validate_rules(req.rules)
+    at_jd = utc_to_jd(parse_utc(req.at) if req.at else datetime.now(timezone.utc).replace(tzinfo=None))
+
+    resolved = await asyncio.gather(*(sidereal_chart_for_birth(b, req.ayanamsa) for b in req.items), return_exceptions=True)
+    ok = [i for i, r in enumerate(resolved) if not isinstance(r, BaseException)]
+    results = [YogaResult(index=i, error=str(r)) for i, r in enumerate(resolved) if isinstance(r, BaseException)]
+    if ok:
+        present = await run_ephemeris(detect_for_cores, [resolved[i] for i in ok], at_jd, req.ayanamsa, rules)
+        results += [YogaResult(index=i, present=describe_hits(names)) for i, names in zip(ok, present)]
+    return sorted(results, key=lambda r: r.index)
@@ -0,0 +1,345 @@
+"""Small caching primitives shared by the services.
+
+- LRUCache:    in-process, thread-safe, bounded, optional TTL.
+- SQLiteCache: file-backed key/value store that several uvicorn workers can
+               share (WAL mode), with TTL expiry and bounded size.
+- TieredCache: LRU in front of SQLite, the usual way to use the two
+               (`aget_many`/`aset_many` keep the SQLite tier off the event loop).
+
+Every cache registers itself by name so hit/miss counters can be exposed
+through `cache_stats()`.
+"""
+import asyncio
+import json
+import logging
+import os
+import sqlite3
+import time
+from collections import OrderedDict
+from threading import Lock
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+_MISSING = object()
+_DISK_ERRORS = (sqlite3.Error, OSError)
+
+_REGISTRY: Dict[str, Any] = {}
+_REGISTRY_LOCK = Lock()
+
+
+def register_cache(name: str, cache: Any) -> None:
+    with _REGISTRY_LOCK:
+        _REGISTRY[name] = cache
+
+
+def cache_stats() -> Dict[str, Dict[str, Any]]:
+    """Return counters for every registered cache, keyed by cache name."""
+    with _REGISTRY_LOCK:
+        caches = dict(_REGISTRY)
+    return {name: cache.stats() for name, cache in caches.items()}
+
+
+def _hit_rate(hits: int, misses: int) -> float:
+    total = hits + misses
+    return round(hits / total, 4) if total else 0.0
+
+
+class LRUCache:
+    """Thread-safe in-memory LRU with optional per-entry TTL (seconds)."""
+
+    def __init__(self, maxsize: int = 1024, ttl: Optional[float] = None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def get(self, key: str, default: Any = None) -> Any:
+        with self._lock:
+            item = self._data.get(key)
+            if item is not None:
+                value, expires_at = item
+                if expires_at is None or expires_at > time.time():
+                    self._data.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._data[key]
+            self.misses += 1
+            return default
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        ttl = self.ttl if ttl is None else ttl
+        expires_at = time.time() + ttl if ttl else None
+        with self._lock:
+            self._data[key] = (value, expires_at)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def get_many(self, keys: Iterable[str]) -> Dict[str, Any]:
+        out = {}
+        for key in keys:
+            value = self.get(key, _MISSING)
+            if value is not _MISSING:
+                out[key] = value
+        return out
+
+    def set_many(self, items: Dict[str, Any], ttl: Optional[float] = None) -> None:
+        for key, value in items.items():
+            self.set(key, value, ttl)
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "size": len(self._data),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": _hit_rate(self.hits, self.misses),
+            "evictions": self.evictions,
+        }
+
+
+class SQLiteCache:
+    """Key/value cache in a SQLite file, safe to share between worker processes.
+
+    Values are serialized with `dumps`/`loads` (JSON by default). Entries
+    expire after `ttl` seconds; when `max_entries` is set the least recently
+    read entries are pruned periodically.
+    """
+
+    _PRUNE_EVERY = 256
+
+    def __init__(
+        self,
+        path: str,
+        ttl: Optional[float] = None,
+        max_entries: Optional[int] = None,
+        dumps: Callable[[Any], Any] = json.dumps,
+        loads: Callable[[Any], Any] = json.loads,
+        table: str = "cache",
+    ):
+        self.path = path
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.dumps = dumps
+        self.loads = loads
+        self.table = table
+        self._conn: Optional[sqlite3.Connection] = None
+        self._pid: Optional[int] = None
+        self._lock = Lock()
+        self._writes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.errors = 0
+
+    def _connection(self) -> sqlite3.Connection:
+        # connect lazily, and again after a fork: sqlite handles must not cross processes
+        if self._conn is None or self._pid != os.getpid():
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=5, check_same_thread=False, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(
+                f"CREATE TABLE IF NOT EXISTS {self.table} ("
+                "key TEXT PRIMARY KEY, value BLOB NOT NULL, expires_at REAL, accessed_at REAL NOT NULL)"
+            )
+            conn.execute(f"CREATE INDEX IF NOT EXISTS {self.table}_accessed ON {self.table}(accessed_at)")
+            self._conn, self._pid = conn, os.getpid()
+        return self._conn
+
+    def get_many(self, keys: Iterable[str]) -> Dict[str, Any]:
+        keys = list(keys)
+        if not keys:
+            return {}
+        now = time.time()
+        out: Dict[str, Any] = {}
+        with self._lock:
+            conn = self._connection()
+            for start in range(0, len(keys), 500):
+                chunk = keys[start:start + 500]
+                marks = ",".join("?" * len(chunk))
+                rows = conn.execute(
+                    f"SELECT key, value, expires_at FROM {self.table} WHERE key IN ({marks})", chunk
+                ).fetchall()
+                for key, value, expires_at in rows:
+                    if expires_at is None or expires_at > now:
+                        out[key] = self.loads(value)
+                found = [k for k in chunk if k in out]
+                if found:
+                    marks = ",".join("?" * len(found))
+                    conn.execute(f"UPDATE {self.table} SET accessed_at = ? WHERE key IN ({marks})", [now, *found])
+            self.hits += len(out)
+            self.misses += len(keys) - len(out)
+        return out
+
+    def get(self, key: str, default: Any = None) -> Any:
+        return self.get_many([key]).get(key, default)
+
+    def set_many(self, items: Dict[str, Any], ttl: Optional[float] = None) -> None:
+        if not items:
+            return
+        ttl = self.ttl if ttl is None else ttl
+        now = time.time()
+        expires_at = now + ttl if ttl else None
+        rows = [(key, self.dumps(value), expires_at, now) for key, value in items.items()]
+        with self._lock:
+            conn = self._connection()
+            conn.executemany(f"INSERT OR REPLACE INTO {self.table} VALUES (?, ?, ?, ?)", rows)
+            self._writes += len(rows)
+            if self._writes >= self._PRUNE_EVERY:
+                self._writes = 0
+                self._prune(conn, now)
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        self.set_many({key: value}, ttl)
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._connection().execute(f"DELETE FROM {self.table} WHERE key = ?", (key,))
+
+    def _prune(self, conn: sqlite3.Connection, now: float) -> None:
+        removed = conn.execute(f"DELETE FROM {self.table} WHERE expires_at IS NOT NULL AND expires_at <= ?", (now,)).rowcount
+        if self.max_entries:
+            (count,) = conn.execute(f"SELECT COUNT(*) FROM {self.table}").fetchone()
+            if count > self.max_entries:
+                removed += conn.execute(
+                    f"DELETE FROM {self.table} WHERE key IN "
+                    f"(SELECT key FROM {self.table} ORDER BY accessed_at ASC LIMIT ?)",
+                    (count - self.max_entries,),
+                ).rowcount
+        self.evictions += max(removed, 0)
+
+    def prune(self) -> None:
+        """Drop expired entries and trim to `max_entries` now."""
+        with self._lock:
+            self._prune(self._connection(), time.time())
+
+    def size(self) -> int:
+        with self._lock:
+            (count,) = self._connection().execute(f"SELECT COUNT(*) FROM {self.table}").fetchone()
+        return count
+
+    def stats(self) -> Dict[str, Any]:
+        try:
+            size = self.size()
+        except _DISK_ERRORS:
+            size = None
+        return {
+            "path": self.path,
+            "size": size,
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": _hit_rate(self.hits, self.misses),
+            "evictions": self.evictions,
+            "errors": self.errors,
+        }
+
+
+class TieredCache:
+    """In-process LRU in front of a shared SQLiteCache.
+
+    SQLite failures (locked file, read-only disk, ...) are logged and
+    counted but never raised: a broken cache only costs a recomputation.
+    """
+
+    def __init__(self, name: str, memory: LRUCache, disk: Optional[SQLiteCache] = None):
+        self.name = name
+        self.memory = memory
+        self.disk = disk
+        register_cache(name, self)
+
+    def get(self, key: str, default: Any = None) -> Any:
+        return self.get_many([key]).get(key, default)
+
+    def _disk_get_many(self, keys: List[str]) -> Dict[str, Any]:
+        try:
+            return self.disk.get_many(keys)
+        except _DISK_ERRORS as e:
+            self.disk.errors += 1
+            logging.error(f"{self.name} cache read failed: {e}")
+            return {}
+
+    def _disk_set_many(self, items: Dict[str, Any]) -> None:
+        try:
+            self.disk.set_many(items)
+        except _DISK_ERRORS as e:
+            self.disk.errors += 1
+            logging.error(f"{self.name} cache write failed: {e}")
+
+    def get_many(self, keys: Iterable[str]) -> Dict[str, Any]:
+        keys = list(keys)
+        out = self.memory.get_many(keys)
+        missing = [k for k in keys if k not in out]
+        if missing and self.disk is not None:
+            found = self._disk_get_many(missing)
+            if found:
+                self.memory.set_many(found)
+                out.update(found)
+        return out
+
+    async def aget_many(self, keys: Iterable[str]) -> Dict[str, Any]:
+        """get_many for coroutines: the LRU is read inline, SQLite (which can wait up to its
+        busy timeout on another worker's lock) in a worker thread."""
+        keys = list(keys)
+        out = self.memory.get_many(keys)
+        missing = [k for k in keys if k not in out]
+        if missing and self.disk is not None:
+            found = await asyncio.to_thread(self._disk_get_many, missing)
+            if found:
+                self.memory.set_many(found)
+                out.update(found)
+        return out
+
+    def set(self, key: str, value: Any) -> None:
+        self.set_many({key: value})
+
+    def set_many(self, items: Dict[str, Any]) -> None:
+        self.memory.set_many(items)
+        if self.disk is not None:
+            self._disk_set_many(items)
+
+    async def aset_many(self, items: Dict[str, Any]) -> None:
+        """set_many for coroutines, with the SQLite write in a worker thread."""
+        self.memory.set_many(items)
+        if self.disk is not None:
+            await asyncio.to_thread(self._disk_set_many, items)
+
+    def delete(self, key: str) -> None:
+        self.memory.delete(key)
+        if self.disk is not None:
+            try:
+                self.disk.delete(key)
+            except _DISK_ERRORS as e:
+                self.disk.errors += 1
+                logging.error(f"{self.name} cache delete failed: {e}")
+
+    def stats(self) -> Dict[str, Any]:
+        memory = self.memory.stats()
+        disk = self.disk.stats() if self.disk is not None else None
+        # a lookup only misses overall when it misses every tier
+        misses = disk["misses"] if disk is not None else memory["misses"]
+        hits = memory["hits"] + (disk["hits"] if disk is not None else 0)
+        return {
+            "hits": hits,
+            "misses": misses,
+            "hit_rate": _hit_rate(hits, misses),
+            "memory": memory,
+            "disk": disk,
+        }
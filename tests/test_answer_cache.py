@@ -0,0 +1,47 @@
+import os
+import time
+
+import numpy as np
+
+os.environ.setdefault("OPENAI_API_KEY", "test")
+os.environ.setdefault("MY_API_KEY", "test")
+
+from src.services.answer_cache import SemanticAnswerCache  # noqa: E402
+
+
+def _cache(**kwargs):
+    return SemanticAnswerCache("test-answers", **{"threshold": 0.95, "max_entries": 4, "ttl": 60, **kwargs})
+
+
+def test_null_religion_is_treated_as_secular():
+    cache = _cache()
+    assert cache.lookup(None, [1.0, 0.0]) is None
+    cache.store(None, [1.0, 0.0], {"answer": "a"})
+    assert cache.lookup(None, [1.0, 0.0]) == {"answer": "a"}
+    assert cache.lookup("Secular", [1.0, 0.0]) == {"answer": "a"}
+
+
+def test_religion_partitions_are_case_insensitive_and_separate():
+    cache = _cache()
+    cache.store("Hindu", [1.0, 0.0], {"answer": "a"})
+    assert cache.lookup("hindu", [1.0, 0.0]) == {"answer": "a"}
+    assert cache.lookup("muslim", [1.0, 0.0]) is None
+
+
+def test_threshold_hit_and_miss():
+    cache = _cache()
+    cache.store("hindu", [1.0, 0.0], {"answer": "a"})
+    close = [np.cos(0.1), np.sin(0.1)]   # cosine ~0.995
+    far = [np.cos(0.5), np.sin(0.5)]     # cosine ~0.878
+    assert cache.lookup("hindu", close) == {"answer": "a"}
+    assert cache.lookup("hindu", far) is None
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_entries_expire_after_ttl():
+    cache = _cache(ttl=0.05)
+    cache.store("hindu", [1.0, 0.0], {"answer": "a"})
+    assert cache.lookup("hindu", [1.0, 0.0]) is not None
+    time.sleep(0.1)
+    assert cache.lookup("hindu", [1.0, 0.0]) is None
+    assert cache.stats()["size"] == 0
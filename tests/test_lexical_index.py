@@ -0,0 +1,38 @@
+import os
+
+import numpy as np
+
+os.environ.setdefault("OPENAI_API_KEY", "test")
+os.environ.setdefault("MY_API_KEY", "test")
+
+from src.database.lexical_index import BM25Index  # noqa: E402
+
+
+def _index():
+    return BM25Index(
+        ids=["d0", "d1", "d2", "d3"],
+        documents=[
+            "Rahu in the 7th house delays marriage.",
+            "Rahu brings sudden change.",
+            "Venus governs marriage and love.",
+            "Saturn teaches patience.",
+        ],
+        metadatas=[
+            {"title": "Rahu 7th", "religion": "hindu"},
+            {"title": "Rahu", "religion": "hindu"},
+            {"title": "Venus", "religion": "muslim"},
+            {"title": "Saturn", "religion": "hindu"},
+        ],
+    )
+
+
+def test_unfiltered_search_keeps_docs_matching_any_term():
+    hits = [h["id"] for h in _index().search("rahu marriage", 10)]
+    assert hits[0] == "d0"
+    assert set(hits) == {"d0", "d1", "d2"}
+
+
+def test_filtered_search_stays_inside_partition():
+    hindu_rows = np.array([0, 1, 3])
+    hits = [h["id"] for h in _index().search("rahu marriage", 10, hindu_rows)]
+    assert set(hits) == {"d0", "d1"}